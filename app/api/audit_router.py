@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.services.audit_service import AuditService
+from app.services.audit_export import ENCODERS, MEDIA_TYPES, iter_chunks
+from app.services.audit_retention import CleanupInProgress, audit_retention
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
@@ -31,17 +34,25 @@ class AuditLogResponse(BaseModel):
 
 @router.get("/logs", response_model=List[AuditLogResponse])
 def get_logs(
+    response: Response,
     product_id: Optional[int] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     user_id: Optional[str] = Query(None),
     limit: int = Query(100, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    logs = AuditService.get_audit_logs(
-        db, product_id, start_date, end_date, user_id, limit, offset
-    )
+    try:
+        logs = AuditService.get_audit_logs(
+            db, product_id, start_date, end_date, user_id, limit, offset, cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    # A full page may have more after it; pass the header back as `cursor`
+    if logs and len(logs) == limit:
+        response.headers["X-Next-Cursor"] = AuditService.encode_cursor(logs[-1])
     return logs
 
 @router.get("/logs/{log_id}", response_model=AuditLogResponse)
@@ -56,15 +67,49 @@ def get_statistics(
     product_id: Optional[int] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    group_by: Optional[str] = Query(None, pattern="^(product|currency|day|promotion)$"),
     db: Session = Depends(get_db)
 ):
-    stats = AuditService.get_audit_statistics(db, product_id, start_date, end_date)
+    stats = AuditService.get_audit_statistics(db, product_id, start_date, end_date, group_by)
     return stats
 
+@router.get("/export")
+def export_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    product_id: Optional[int] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    user_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Stream every matching audit log, oldest first, as NDJSON or CSV"""
+    chunks = iter_chunks(db, product_id, start_date, end_date, user_id)
+    return StreamingResponse(
+        ENCODERS[format](chunks),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="audit_logs.{format}"'}
+    )
+
 @router.delete("/cleanup")
 def cleanup_logs(
     days: int = Query(90, ge=1, le=365),
+    background: bool = Query(True),
     db: Session = Depends(get_db)
 ):
-    deleted = AuditService.cleanup_old_logs(db, days)
-    return {"message": f"Deleted {deleted} old audit logs", "deleted_count": deleted}
+    """Start deleting logs older than `days` in small batches; background=false waits for the result"""
+    try:
+        if background:
+            audit_retention.trigger(days)
+            return JSONResponse(status_code=202, content={
+                "message": f"Started deleting audit logs older than {days} days"
+            })
+        result = audit_retention.purge(db, days)
+    except CleanupInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    deleted = result["deleted_count"]
+    return {"message": f"Deleted {deleted} old audit logs", "deleted_count": deleted, "archive": result["archive"]}
+
+@router.get("/cleanup")
+def cleanup_status():
+    """Whether a cleanup is running, and the outcome of the last one"""
+    return {"running": audit_retention.busy, "last_run": audit_retention.last_run}
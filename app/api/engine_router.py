@@ -1,20 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.schemas.engine import PriceRequest
-from app.services.engine_service import calculate_price_with_explanation
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.schemas.engine import PriceRequest, BatchPriceRequest, CartPriceRequest
+from app.services.engine_service import calculate_price_with_explanation_async, calculate_prices_batch_async
+from app.services.cart_service import calculate_cart_price_async
 from app.core.cache import CacheService
 import uuid
 
 router = APIRouter(prefix="/engine", tags=["Price Engine"])
 
 @router.post("/compute")
-def compute(data: PriceRequest, request: Request, db: Session = Depends(get_db)):
+async def compute(data: PriceRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Price a product quantity from its cached rule plan.
+
+    `cached` is true when the product's rule plan came from the cache, even
+    for a quantity or currency that was never priced before.
+    """
     request_id = str(uuid.uuid4())
     client_host = request.client.host if request.client else None
     user_agent = request.headers.get("user-agent")
 
-    result = calculate_price_with_explanation(
+    result = await calculate_price_with_explanation_async(
         db,
         data.product_id,
         data.quantity,
@@ -24,33 +31,86 @@ def compute(data: PriceRequest, request: Request, db: Session = Depends(get_db))
         enable_audit=True,
         ip_address=client_host,
         user_agent=user_agent,
-        request_id=request_id
+        request_id=request_id,
+        detail=data.detail
     )
     if not result:
         raise HTTPException(status_code=404, detail="Product not found")
     return result
 
+@router.post("/compute/batch")
+async def compute_batch(data: BatchPriceRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Price many product/quantity lines in one call; `cached` per line as in /compute"""
+    request_id = str(uuid.uuid4())
+    client_host = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+
+    lines = [line.model_dump() for line in data.lines]
+    results = await calculate_prices_batch_async(
+        db,
+        lines,
+        enable_audit=True,
+        ip_address=client_host,
+        user_agent=user_agent,
+        request_id=request_id
+    )
+
+    items = []
+    for line, result in zip(lines, results):
+        if result is None:
+            items.append({
+                "product_id": line["product_id"],
+                "quantity": line["quantity"],
+                "error": "Product not found"
+            })
+        else:
+            items.append({"product_id": line["product_id"], "quantity": line["quantity"], **result})
+
+    return {
+        "request_id": request_id,
+        "count": len(items),
+        "errors": sum(1 for result in results if result is None),
+        "results": items
+    }
+
+@router.post("/cart")
+async def compute_cart(data: CartPriceRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Price a whole cart, applying category thresholds across all lines"""
+    request_id = str(uuid.uuid4())
+    client_host = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+
+    result = await calculate_cart_price_async(
+        db,
+        [item.model_dump() for item in data.items],
+        target_currency=data.target_currency,
+        include_tax=data.include_tax,
+        rounding_strategy=data.rounding_strategy,
+        enable_audit=True,
+        ip_address=client_host,
+        user_agent=user_agent,
+        request_id=request_id
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return result
+
+@router.get("/cache/stats")
+def cache_stats():
+    """Hit ratios, latencies, memory tier size and Redis status of the cache"""
+    return CacheService.stats()
+
 @router.delete("/cache/product/{product_id}")
 def clear_product_cache(product_id: int):
     """Clear cache for a specific product"""
-    count = CacheService.invalidate_product(product_id)
-    return {"message": f"Cache cleared for product {product_id}", "keys_deleted": count}
+    generation = CacheService.invalidate_product(product_id)
+    return {"message": f"Cache cleared for product {product_id}", "generation": generation}
 
 @router.delete("/cache/all")
 def clear_all_cache():
     """Clear all price computation cache"""
-    from app.core.cache import REDIS_AVAILABLE, redis_client, _memory_cache
     try:
-        if REDIS_AVAILABLE:
-            count = 0
-            for key in redis_client.scan_iter(match="price:*"):
-                redis_client.delete(key)
-                count += 1
-            return {"message": "All cache cleared", "keys_deleted": count}
-        else:
-            keys = [k for k in _memory_cache.keys() if k.startswith("price:")]
-            for key in keys:
-                _memory_cache.pop(key, None)
-            return {"message": "All cache cleared", "keys_deleted": len(keys)}
+        generation = CacheService.clear_all()
+        return {"message": "All cache cleared", "generation": generation}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing cache: {str(e)}")
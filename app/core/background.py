@@ -0,0 +1,42 @@
+"""
+Base class of the worker threads started and stopped with the application.
+"""
+from typing import Optional
+import threading
+
+
+class BackgroundWorker:
+    """
+    A daemon thread running `_run` between start() and stop().
+
+    Subclasses implement _run and return from it once `_stopping` is set;
+    start() does nothing unless `enabled`, so tests and configuration can
+    keep a worker off.
+    """
+
+    thread_name = "background-worker"
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self) -> None:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join(timeout=timeout)
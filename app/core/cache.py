@@ -1,26 +1,230 @@
 import redis
-from typing import Any, Optional
-import json
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+import asyncio
+import functools
+import os
+import time
+import uuid
 
-# Try to connect to Redis, fall back to in-memory cache
-REDIS_AVAILABLE = False
-redis_client = None
+from app.core.cache_metrics import MEMORY_TIER, REDIS_TIER, CacheMetrics, key_prefix
+from app.core.generations import GenerationCounters
+from app.core.invalidation_bus import RedisInvalidationBus
+from app.core.memory_cache import MemoryCache, freeze
+from app.core.redis_backend import RedisBackend
+from app.core.serialization import decode, get_serializer
+from app.core.single_flight import AsyncSingleFlight, SingleFlight
 
-try:
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-    redis_client.ping()
-    REDIS_AVAILABLE = True
-except (redis.ConnectionError, redis.exceptions.ConnectionError):
-    # Redis not available, use in-memory cache
-    REDIS_AVAILABLE = False
-    redis_client = None
+# Default TTL (seconds) of cached values
+CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+# TTL (seconds) of negative entries, e.g. for product IDs that do not exist
+CACHE_NEGATIVE_TTL = int(os.getenv("CACHE_NEGATIVE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Upper bound on how long a worker serves an L1 entry while Redis is the source of truth
+CACHE_L1_TTL = int(os.getenv("CACHE_L1_TTL", "30"))
+# How long the previous value of a key may be served while it is recomputed
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "300"))
+# Coordinate recomputation across workers with a Redis lock
+CACHE_DISTRIBUTED_LOCK = os.getenv("CACHE_DISTRIBUTED_LOCK", "false").lower() == "true"
+# Seconds to wait on another computation of the same key before computing anyway
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
 
-# In-memory cache fallback
-_memory_cache = {}
+# Shared tier, connected on first use; calls fall back to memory while it is down
+_redis = RedisBackend()
+
+# Per-process tier: near-cache in front of Redis, or the only tier without it.
+# Bounded by entry count and size with LRU eviction.
+_memory_cache = MemoryCache(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES)
+
+# Encodes values written to Redis; any tagged format can be read back
+_serializer = get_serializer()
+
+# Identifies this worker on the invalidation bus so it skips its own messages
+INSTANCE_ID = uuid.uuid4().hex
+
+_bus = RedisInvalidationBus(_redis)
+
+# Generation counters embedded in price keys; bumping one invalidates its keys
+_generations = GenerationCounters(_redis, refresh_after=CACHE_L1_TTL, max_entries=CACHE_MAX_ENTRIES)
+# Bumps made during an outage were local only; re-read the shared counters
+_redis.on_recovery(_generations.expire_local)
+
+# In-flight computations, so concurrent misses on a key compute it once
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+# Hit/miss counters and latency histograms, see CacheService.stats
+_metrics = CacheMetrics()
+
+
+def _timed(operation: str):
+    """Record the latency of a cache operation (sync or async)"""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _metrics.timed(operation):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _metrics.timed(operation):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _counted(key: str, value: Optional[Any], tier: str) -> Optional[Any]:
+    if value is None:
+        _metrics.record_misses([key])
+    else:
+        _metrics.record_hits([key], tier)
+    return value
+
+
+def _count_many(keys: List[str], found: Dict[str, Any], memory_keys: Iterable[str]) -> None:
+    memory_keys = set(memory_keys)
+    _metrics.record_hits((key for key in found if key in memory_keys), MEMORY_TIER)
+    _metrics.record_hits((key for key in found if key not in memory_keys), REDIS_TIER)
+    _metrics.record_misses(key for key in keys if key not in found)
+
+
+def apply_invalidation(cache: MemoryCache, generations: GenerationCounters, message: Dict[str, Any]) -> None:
+    """
+    Apply an invalidation message to a worker's local state.
+
+    Args:
+        cache: Memory tier of the worker
+        generations: Generation counters of the worker
+        message: {"op": "key", "key": ...}, {"op": "keys", "keys": [...]} or
+            {"op": "generation", "name": ..., "value": ...}
+    """
+    op = message.get("op")
+    if op == "key":
+        cache.pop(message["key"])
+    elif op == "keys":
+        cache.delete_many(message["keys"])
+    elif op == "generation":
+        generations.observe(message["name"], int(message["value"]))
+
+
+_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def add_invalidation_listener(handler: Callable[[Dict[str, Any]], None]) -> None:
+    """Register a handler for invalidation messages sent by other workers"""
+    _listeners.append(handler)
+
+
+_generation_hooks: List[Callable[[str], None]] = []
+
+
+def add_generation_hook(handler: Callable[[str], None]) -> None:
+    """Register a handler called with the counter name ("all", "product:42", ...) after this worker bumps it"""
+    _generation_hooks.append(handler)
+
+
+def _on_invalidation(message: Dict[str, Any]) -> None:
+    if message.get("origin") == INSTANCE_ID:
+        return
+    apply_invalidation(_memory_cache, _generations, message)
+    for handler in list(_listeners):
+        handler(message)
+
+
+_bus.subscribe(_on_invalidation)
+
+
+def _broadcast(message: Dict[str, Any]) -> None:
+    _bus.publish({**message, "origin": INSTANCE_ID})
+
+
+# Marks an entry stored together with the generations it depends on
+_DEPENDS_FIELD = "__depends_on__"
+
+
+def _wrap(value: Any, depends_on: Optional[Dict[str, int]]) -> Any:
+    return {_DEPENDS_FIELD: depends_on, "value": value} if depends_on else value
+
+
+def _dependencies(entry: Any) -> Optional[Dict[str, int]]:
+    if not isinstance(entry, Mapping) or _DEPENDS_FIELD not in entry:
+        return None
+    return entry[_DEPENDS_FIELD]
+
+
+def _resolve(key: str, entry: Any, depends_on: Dict[str, int], current: Dict[str, int]) -> Optional[Any]:
+    if any(current[name] != generation for name, generation in depends_on.items()):
+        _memory_cache.pop(key)
+        return None
+    return entry["value"]
+
+
+def _unwrap(key: str, entry: Any) -> Optional[Any]:
+    depends_on = _dependencies(entry)
+    if depends_on is None:
+        return entry
+    return _resolve(key, entry, depends_on, _generations.get_many(depends_on))
+
+
+async def _unwrap_async(key: str, entry: Any) -> Optional[Any]:
+    depends_on = _dependencies(entry)
+    if depends_on is None:
+        return entry
+    return _resolve(key, entry, depends_on, await _generations.get_many_async(depends_on))
+
+
+def _decode_entries(raws: Dict[str, Optional[bytes]]) -> Dict[str, Any]:
+    """Decode values read from Redis and keep them in the memory tier"""
+    entries = {}
+    sizes = {}
+    for key, raw in raws.items():
+        if not raw:
+            continue
+        try:
+            entries[key] = freeze(decode(raw))
+        except ValueError:
+            continue
+        sizes[key] = len(raw)
+    if entries:
+        _memory_cache.set_many(entries, ttl=CACHE_L1_TTL, sizes=sizes)
+    return entries
+
+
+def _acquire_distributed_lock(key: str):
+    """Redis lock for recomputing key, None when not used, False when held elsewhere"""
+    client = _redis.client() if CACHE_DISTRIBUTED_LOCK else None
+    if client is None:
+        return None
+    try:
+        lock = client.lock(f"lock:{key}", timeout=CACHE_LOCK_TIMEOUT, blocking=False)
+        acquired = lock.acquire()
+        _redis.record_success()
+        return lock if acquired else False
+    except redis.RedisError as exc:
+        _redis.record_failure(exc)
+        return None
+
+
+def _wait_for_peer(key: str, stale_key: Optional[str]) -> Optional[Any]:
+    """Wait for another worker to store key, serving the stale value if there is one"""
+    if stale_key:
+        stale = _memory_cache.get(stale_key)
+        if stale is not None:
+            return stale
+
+    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = CacheService.get(key)
+        if value is not None:
+            return value
+    return None
 
 
 class CacheService:
-    """Cache service with Redis primary and in-memory fallback"""
+    """Two-tier cache: per-process L1 in front of Redis, with in-memory fallback"""
 
     @staticmethod
     def _get_key(*args) -> str:
@@ -28,85 +232,556 @@ class CacheService:
         return ":".join(str(arg) for arg in args)
 
     @staticmethod
+    @_timed("get")
     def get(key: str) -> Optional[Any]:
-        """Get value from cache"""
-        if REDIS_AVAILABLE and redis_client:
+        """
+        Get value from cache, checking the process-local tier first.
+
+        Returns:
+            A read-only snapshot (mappings are MappingProxyType, lists are
+            tuples) shared with other readers; copy it before modifying
+        """
+        entry = _memory_cache.get(key)
+        if entry is not None:
+            return _counted(key, _unwrap(key, entry), MEMORY_TIER)
+
+        client = _redis.client()
+        if client is not None:
             try:
-                value = redis_client.get(key)
-                if value:
-                    return json.loads(value)
-            except Exception:
-                pass
+                raw = client.get(key)
+                _redis.record_success()
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
+                raw = None
+            entry = _decode_entries({key: raw}).get(key)
+            if entry is not None:
+                return _counted(key, _unwrap(key, entry), REDIS_TIER)
+
+        return _counted(key, None, MEMORY_TIER)
+
+    @staticmethod
+    @_timed("set")
+    def set(key: str, value: Any, ttl: Optional[int] = None, depends_on: Optional[Dict[str, int]] = None) -> bool:
+        """
+        Set value in cache with TTL (seconds, defaults to CACHE_TTL).
+
+        Args:
+            depends_on: Generations (from CacheService.generations) the value was
+                computed under; the entry is treated as a miss once any of them
+                advances. Use for dependencies not known when the key is built.
+        """
+        value = _wrap(value, depends_on)
+        ttl = ttl or CACHE_TTL
+        payload = _serializer.dumps(value)
+
+        client = _redis.client()
+        if client is not None:
+            try:
+                client.setex(key, ttl, payload)
+                _redis.record_success()
+                _memory_cache.set(key, value, ttl=min(ttl, CACHE_L1_TTL), size=len(payload))
+                return True
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
 
         # Fallback to memory cache
-        return _memory_cache.get(key)
+        _memory_cache.set(key, value, ttl=ttl, size=len(payload))
+        return True
 
     @staticmethod
-    def set(key: str, value: Any, ttl: int = 3600) -> bool:
-        """Set value in cache with TTL (seconds)"""
-        if REDIS_AVAILABLE and redis_client:
+    @_timed("get_many")
+    def get_many(keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several values with one memory-tier pass and one MGET for the rest.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of key to read-only value, for the keys that were found
+        """
+        keys = list(dict.fromkeys(keys))
+        entries = _memory_cache.get_many(keys)
+        memory_keys = list(entries)
+        missing = [key for key in keys if key not in entries]
+
+        client = _redis.client() if missing else None
+        if client is not None:
+            try:
+                raws = client.mget(missing)
+                _redis.record_success()
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
+                raws = []
+            entries.update(_decode_entries(dict(zip(missing, raws))))
+
+        found = {}
+        for key, entry in entries.items():
+            value = _unwrap(key, entry)
+            if value is not None:
+                found[key] = value
+        _count_many(keys, found, memory_keys)
+        return found
+
+    @staticmethod
+    @_timed("set_many")
+    def set_many(
+        values: Dict[str, Any],
+        ttl: Optional[int] = None,
+        depends_on: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> bool:
+        """
+        Set several values with the same TTL (defaults to CACHE_TTL) in one
+        pipelined round trip.
+
+        Args:
+            values: Mapping of key to value
+            depends_on: Optional mapping of key to the generations that value
+                depends on (see set)
+        """
+        if not values:
+            return True
+        if depends_on:
+            values = {key: _wrap(value, depends_on.get(key)) for key, value in values.items()}
+        ttl = ttl or CACHE_TTL
+        payloads = {key: _serializer.dumps(value) for key, value in values.items()}
+        sizes = {key: len(payload) for key, payload in payloads.items()}
+
+        client = _redis.client()
+        if client is not None:
             try:
-                redis_client.setex(key, ttl, json.dumps(value))
+                pipeline = client.pipeline(transaction=False)
+                for key, payload in payloads.items():
+                    pipeline.setex(key, ttl, payload)
+                pipeline.execute()
+                _redis.record_success()
+                _memory_cache.set_many(values, ttl=min(ttl, CACHE_L1_TTL), sizes=sizes)
                 return True
-            except Exception:
-                pass
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
 
-        # Fallback to memory cache (note: TTL not enforced in memory)
-        _memory_cache[key] = value
+        _memory_cache.set_many(values, ttl=ttl, sizes=sizes)
         return True
 
     @staticmethod
+    def get_or_compute(
+        key: str,
+        compute: Callable[[], Optional[Any]],
+        stale_key: Optional[str] = None
+    ) -> Tuple[Optional[Any], bool]:
+        """
+        Get a value, computing it at most once per key on a miss.
+
+        Concurrent misses in this worker wait for a single computation; with
+        CACHE_DISTRIBUTED_LOCK, workers also coordinate through a Redis lock.
+        While a key is being recomputed, callers that would otherwise wait are
+        served the previous value kept under stale_key, if any.
+
+        Args:
+            key: Cache key
+            compute: Computes the value and stores it under key; returns
+                None when there is nothing to cache
+            stale_key: Generation-independent key for the previous value
+
+        Returns:
+            (value, computed) where computed is True only for the caller that
+            ran compute
+        """
+        value = CacheService.get(key)
+        if value is not None:
+            return value, False
+
+        if stale_key and _flights.in_flight(key):
+            stale = _memory_cache.get(stale_key)
+            if stale is not None:
+                return stale, False
+
+        def run() -> Tuple[Optional[Any], bool]:
+            value = CacheService.get(key)
+            if value is not None:
+                return value, False
+
+            lock = _acquire_distributed_lock(key)
+            if lock is False:
+                value = _wait_for_peer(key, stale_key)
+                if value is not None:
+                    return value, False
+
+            try:
+                value = compute()
+            finally:
+                if lock:
+                    try:
+                        lock.release()
+                    except redis.RedisError:
+                        pass
+
+            if value is not None and stale_key:
+                _memory_cache.set(stale_key, value, ttl=CACHE_STALE_TTL)
+            return value, True
+
+        (value, computed), leader = _flights.do(key, run, timeout=CACHE_LOCK_TIMEOUT)
+        return value, computed and leader
+
+    @staticmethod
+    @_timed("delete")
     def delete(key: str) -> bool:
         """Delete key from cache"""
-        if REDIS_AVAILABLE and redis_client:
+        client = _redis.client()
+        if client is not None:
             try:
-                redis_client.delete(key)
-            except Exception:
-                pass
+                client.delete(key)
+                _redis.record_success()
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
 
         # Also delete from memory cache
         _memory_cache.pop(key, None)
+        _broadcast({"op": "key", "key": key})
         return True
 
     @staticmethod
-    def invalidate_product(product_id: int) -> int:
-        """Invalidate all cache entries for a product"""
-        count = 0
-        pattern = f"price:{product_id}:*"
+    @_timed("delete_many")
+    def delete_many(keys: Iterable[str]) -> bool:
+        """Delete several keys with one DEL and one broadcast"""
+        keys = list(keys)
+        if not keys:
+            return True
 
-        if REDIS_AVAILABLE and redis_client:
+        client = _redis.client()
+        if client is not None:
             try:
-                for key in redis_client.scan_iter(match=pattern):
-                    redis_client.delete(key)
-                    count += 1
-            except Exception:
-                pass
+                client.delete(*keys)
+                _redis.record_success()
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
 
-        # Also clear from memory cache
-        keys_to_delete = [k for k in _memory_cache.keys() if k.startswith(f"price:{product_id}:")]
-        for key in keys_to_delete:
-            _memory_cache.pop(key, None)
-            count += 1
+        _memory_cache.delete_many(keys)
+        _broadcast({"op": "keys", "keys": keys})
+        return True
+
+    @staticmethod
+    def generation_tags(product_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Generation tags to embed in the cache keys of the given products.
 
-        return count
+        Args:
+            product_ids: Products whose keys are being built
+
+        Returns:
+            Mapping of product ID to a tag like "g3.7" (global.product)
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        values = _generations.get_many(["all"] + [f"product:{pid}" for pid in product_ids])
+        return {pid: f"g{values['all']}.{values[f'product:{pid}']}" for pid in product_ids}
+
+    @staticmethod
+    def generation_tag(product_id: int) -> str:
+        """Generation tag for a single product's cache keys"""
+        return CacheService.generation_tags([product_id])[product_id]
+
+    @staticmethod
+    def generations(names: Iterable[str]) -> Dict[str, int]:
+        """Current values of the named generation counters"""
+        return _generations.get_many(names)
+
+    @staticmethod
+    def _bump(name: str) -> int:
+        value = _generations.bump(name)
+        _broadcast({"op": "generation", "name": name, "value": value})
+        for handler in list(_generation_hooks):
+            handler(name)
+        return value
+
+    @staticmethod
+    def invalidate_product(product_id: int) -> int:
+        """
+        Invalidate all cache entries for a product.
+
+        Returns:
+            The product's new cache generation
+        """
+        return CacheService._bump(f"product:{product_id}")
+
+    @staticmethod
+    def invalidate_category(category: str) -> int:
+        """
+        Invalidate cached prices of every product in a category.
+
+        Returns:
+            The category's new cache generation
+        """
+        return CacheService._bump(f"category:{category}")
+
+    @staticmethod
+    def notify(op: str) -> None:
+        """Broadcast an application event to the listeners of other workers"""
+        _broadcast({"op": op})
 
     @staticmethod
     def clear_all() -> int:
-        """Clear all cache entries"""
-        count = 0
+        """
+        Invalidate all price cache entries.
+
+        Returns:
+            The new global cache generation
+        """
+        return CacheService._bump("all")
+
+    @staticmethod
+    def memory_stats() -> Dict[str, Any]:
+        """Size and hit/miss/eviction counters of the in-memory tier"""
+        return _memory_cache.stats()
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """
+        Observability snapshot of the cache layer.
+
+        Returns:
+            "metrics": hits/misses by key prefix and tier, hit ratios and
+            operation latency histograms; "memory": in-memory tier size,
+            evictions and entries per key prefix; "redis": backend status
+            and error counts
+        """
+        keys_by_prefix: Dict[str, int] = {}
+        for key in _memory_cache.keys():
+            prefix = key_prefix(key)
+            keys_by_prefix[prefix] = keys_by_prefix.get(prefix, 0) + 1
+
+        return {
+            "metrics": _metrics.snapshot(),
+            "memory": {**_memory_cache.stats(), "keys_by_prefix": keys_by_prefix},
+            "redis": _redis.status()
+        }
+
+    @staticmethod
+    def backend_status() -> Dict[str, Any]:
+        """Whether Redis is configured and currently in use"""
+        return _redis.status()
+
+    @staticmethod
+    def start_invalidation_listener() -> None:
+        """Start receiving invalidations broadcast by other workers"""
+        _bus.start()
+
+    @staticmethod
+    def stop_invalidation_listener() -> None:
+        """Stop the invalidation listener"""
+        _bus.stop()
+
+
+async def _acquire_distributed_lock_async(key: str):
+    """_acquire_distributed_lock for coroutines"""
+    client = _redis.async_client() if CACHE_DISTRIBUTED_LOCK else None
+    if client is None:
+        return None
+    try:
+        lock = client.lock(f"lock:{key}", timeout=CACHE_LOCK_TIMEOUT, blocking=False)
+        acquired = await lock.acquire()
+        _redis.record_success()
+        return lock if acquired else False
+    except redis.RedisError as exc:
+        _redis.record_failure(exc)
+        return None
+
+
+async def _wait_for_peer_async(key: str, stale_key: Optional[str]) -> Optional[Any]:
+    """_wait_for_peer for coroutines"""
+    if stale_key:
+        stale = _memory_cache.get(stale_key)
+        if stale is not None:
+            return stale
+
+    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        value = await AsyncCacheService.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+class AsyncCacheService:
+    """
+    CacheService for coroutines: the same tiers and keys, with Redis reached
+    through redis.asyncio so lookups never block the event loop.
+
+    Invalidation stays on CacheService, which broadcasts to every worker.
+    """
+
+    @staticmethod
+    @_timed("get")
+    async def get(key: str) -> Optional[Any]:
+        """Get a read-only value from cache (see CacheService.get)"""
+        entry = _memory_cache.get(key)
+        if entry is not None:
+            return _counted(key, await _unwrap_async(key, entry), MEMORY_TIER)
+
+        client = _redis.async_client()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+                _redis.record_success()
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
+                raw = None
+            entry = _decode_entries({key: raw}).get(key)
+            if entry is not None:
+                return _counted(key, await _unwrap_async(key, entry), REDIS_TIER)
+
+        return _counted(key, None, MEMORY_TIER)
+
+    @staticmethod
+    @_timed("set")
+    async def set(key: str, value: Any, ttl: Optional[int] = None, depends_on: Optional[Dict[str, int]] = None) -> bool:
+        """Set value in cache (see CacheService.set)"""
+        value = _wrap(value, depends_on)
+        ttl = ttl or CACHE_TTL
+        payload = _serializer.dumps(value)
+
+        client = _redis.async_client()
+        if client is not None:
+            try:
+                await client.setex(key, ttl, payload)
+                _redis.record_success()
+                _memory_cache.set(key, value, ttl=min(ttl, CACHE_L1_TTL), size=len(payload))
+                return True
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
+
+        _memory_cache.set(key, value, ttl=ttl, size=len(payload))
+        return True
+
+    @staticmethod
+    @_timed("get_many")
+    async def get_many(keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several values with one memory-tier pass and one MGET (see CacheService.get_many)"""
+        keys = list(dict.fromkeys(keys))
+        entries = _memory_cache.get_many(keys)
+        memory_keys = list(entries)
+        missing = [key for key in keys if key not in entries]
+
+        client = _redis.async_client() if missing else None
+        if client is not None:
+            try:
+                raws = await client.mget(missing)
+                _redis.record_success()
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
+                raws = []
+            entries.update(_decode_entries(dict(zip(missing, raws))))
+
+        found = {}
+        for key, entry in entries.items():
+            value = await _unwrap_async(key, entry)
+            if value is not None:
+                found[key] = value
+        _count_many(keys, found, memory_keys)
+        return found
+
+    @staticmethod
+    @_timed("set_many")
+    async def set_many(
+        values: Dict[str, Any],
+        ttl: Optional[int] = None,
+        depends_on: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> bool:
+        """Set several values in one pipelined round trip (see CacheService.set_many)"""
+        if not values:
+            return True
+        if depends_on:
+            values = {key: _wrap(value, depends_on.get(key)) for key, value in values.items()}
+        ttl = ttl or CACHE_TTL
+        payloads = {key: _serializer.dumps(value) for key, value in values.items()}
+        sizes = {key: len(payload) for key, payload in payloads.items()}
+
+        client = _redis.async_client()
+        if client is not None:
+            try:
+                pipeline = client.pipeline(transaction=False)
+                for key, payload in payloads.items():
+                    pipeline.setex(key, ttl, payload)
+                await pipeline.execute()
+                _redis.record_success()
+                _memory_cache.set_many(values, ttl=min(ttl, CACHE_L1_TTL), sizes=sizes)
+                return True
+            except redis.RedisError as exc:
+                _redis.record_failure(exc)
+
+        _memory_cache.set_many(values, ttl=ttl, sizes=sizes)
+        return True
+
+    @staticmethod
+    async def get_or_compute(
+        key: str,
+        compute: Callable[[], Awaitable[Optional[Any]]],
+        stale_key: Optional[str] = None
+    ) -> Tuple[Optional[Any], bool]:
+        """
+        Get a value, awaiting compute at most once per key on a miss.
+
+        Concurrent misses on this event loop share one computation; otherwise
+        behaves like CacheService.get_or_compute.
+
+        Returns:
+            (value, computed) where computed is True only for the caller that
+            ran compute
+        """
+        value = await AsyncCacheService.get(key)
+        if value is not None:
+            return value, False
+
+        if stale_key and _async_flights.in_flight(key):
+            stale = _memory_cache.get(stale_key)
+            if stale is not None:
+                return stale, False
+
+        async def run() -> Tuple[Optional[Any], bool]:
+            value = await AsyncCacheService.get(key)
+            if value is not None:
+                return value, False
+
+            lock = await _acquire_distributed_lock_async(key)
+            if lock is False:
+                value = await _wait_for_peer_async(key, stale_key)
+                if value is not None:
+                    return value, False
 
-        if REDIS_AVAILABLE and redis_client:
             try:
-                for key in redis_client.scan_iter(match="price:*"):
-                    redis_client.delete(key)
-                    count += 1
-            except Exception:
-                pass
-
-        # Clear memory cache
-        keys = [k for k in _memory_cache.keys() if k.startswith("price:")]
-        for key in keys:
-            _memory_cache.pop(key, None)
-            count += 1
-
-        return count
+                value = await compute()
+            finally:
+                if lock:
+                    try:
+                        await lock.release()
+                    except redis.RedisError:
+                        pass
+
+            if value is not None and stale_key:
+                _memory_cache.set(stale_key, value, ttl=CACHE_STALE_TTL)
+            return value, True
+
+        (value, computed), leader = await _async_flights.do(key, run, timeout=CACHE_LOCK_TIMEOUT)
+        return value, computed and leader
+
+    @staticmethod
+    async def generation_tags(product_ids: Iterable[int]) -> Dict[int, str]:
+        """Generation tags for product cache keys (see CacheService.generation_tags)"""
+        product_ids = list(dict.fromkeys(product_ids))
+        values = await _generations.get_many_async(["all"] + [f"product:{pid}" for pid in product_ids])
+        return {pid: f"g{values['all']}.{values[f'product:{pid}']}" for pid in product_ids}
+
+    @staticmethod
+    async def generation_tag(product_id: int) -> str:
+        """Generation tag for a single product's cache keys"""
+        return (await AsyncCacheService.generation_tags([product_id]))[product_id]
+
+    @staticmethod
+    async def generations(names: Iterable[str]) -> Dict[str, int]:
+        """Current values of the named generation counters"""
+        return await _generations.get_many_async(names)
+
+    @staticmethod
+    async def close() -> None:
+        """Release the event loop's Redis connections"""
+        await _redis.close_async_client()
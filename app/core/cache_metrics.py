@@ -0,0 +1,202 @@
+"""
+Instrumentation of the cache layer.
+
+Counts hits (by key prefix and tier) and misses (by key prefix), and keeps
+latency histograms of cache operations. Everything is process-local and
+cheap enough to record on every call; render_prometheus() formats a stats
+snapshot in the Prometheus text exposition format.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import bisect
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+MEMORY_TIER = "memory"
+REDIS_TIER = "redis"
+
+
+def key_prefix(key: str) -> str:
+    """Metric label of a cache key: its first segment ("plan:42:g1.0" -> "plan")"""
+    return key.split(":", 1)[0]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "buckets": cumulative
+        }
+
+
+class CacheMetrics:
+    """Hit/miss counters and operation latency histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits: Dict[Tuple[str, str], int] = {}
+        self._misses: Dict[str, int] = {}
+        self._latency: Dict[str, Histogram] = {}
+
+    def record_hits(self, keys: Iterable[str], tier: str) -> None:
+        with self._lock:
+            for key in keys:
+                label = (key_prefix(key), tier)
+                self._hits[label] = self._hits.get(label, 0) + 1
+
+    def record_misses(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                prefix = key_prefix(key)
+                self._misses[prefix] = self._misses.get(prefix, 0) + 1
+
+    def observe(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._latency.get(operation)
+            if histogram is None:
+                histogram = self._latency[operation] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, operation: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, time.perf_counter() - started)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hits = {}
+            self._misses = {}
+            self._latency = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Counters and histograms recorded so far.
+
+        Returns:
+            {"prefixes": {prefix: {"hits": {tier: n}, "misses": n, "hit_ratio": r}},
+            "hit_ratio": r, "latency": {operation: histogram}}
+        """
+        with self._lock:
+            hits = dict(self._hits)
+            misses = dict(self._misses)
+            latency = {operation: histogram.snapshot() for operation, histogram in self._latency.items()}
+
+        prefixes: Dict[str, Dict[str, Any]] = {}
+        for (prefix, tier), count in hits.items():
+            prefixes.setdefault(prefix, {"hits": {}, "misses": 0})["hits"][tier] = count
+        for prefix, count in misses.items():
+            prefixes.setdefault(prefix, {"hits": {}, "misses": 0})["misses"] = count
+
+        total_hits = sum(hits.values())
+        total_misses = sum(misses.values())
+        for stats in prefixes.values():
+            lookups = sum(stats["hits"].values()) + stats["misses"]
+            stats["hit_ratio"] = sum(stats["hits"].values()) / lookups if lookups else 0.0
+
+        return {
+            "prefixes": prefixes,
+            "hits": total_hits,
+            "misses": total_misses,
+            "hit_ratio": total_hits / (total_hits + total_misses) if total_hits + total_misses else 0.0,
+            "latency": latency
+        }
+
+
+def _labels(**labels: Any) -> str:
+    if not labels:
+        return ""
+    rendered = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+    return "{" + rendered + "}"
+
+
+def render_prometheus(stats: Dict[str, Any]) -> str:
+    """
+    Format the output of CacheService.stats() for a Prometheus scrape.
+
+    Args:
+        stats: Stats snapshot with "metrics", "memory" and "redis" sections
+
+    Returns:
+        Text exposition format (version 0.0.4)
+    """
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], Any]]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(**labels)} {value}")
+
+    metrics = stats["metrics"]
+    memory = stats["memory"]
+    redis_stats = stats["redis"]
+
+    metric("price_cache_hits_total", "counter", "Cache hits by key prefix and tier", [
+        ({"prefix": prefix, "tier": tier}, count)
+        for prefix, prefix_stats in sorted(metrics["prefixes"].items())
+        for tier, count in sorted(prefix_stats["hits"].items())
+    ])
+    metric("price_cache_misses_total", "counter", "Cache misses by key prefix", [
+        ({"prefix": prefix}, prefix_stats["misses"])
+        for prefix, prefix_stats in sorted(metrics["prefixes"].items())
+    ])
+
+    name = "price_cache_operation_seconds"
+    lines.append(f"# HELP {name} Latency of cache operations")
+    lines.append(f"# TYPE {name} histogram")
+    for operation, histogram in sorted(metrics["latency"].items()):
+        for bound, count in histogram["buckets"]:
+            lines.append(f"{name}_bucket{_labels(operation=operation, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(operation=operation, le='+Inf')} {histogram['count']}")
+        lines.append(f"{name}_sum{_labels(operation=operation)} {histogram['sum']}")
+        lines.append(f"{name}_count{_labels(operation=operation)} {histogram['count']}")
+
+    metric("price_cache_memory_entries", "gauge", "Entries in the in-memory tier", [({}, memory["entries"])])
+    metric("price_cache_memory_bytes", "gauge", "Approximate size of the in-memory tier", [({}, memory["bytes"])])
+    metric("price_cache_memory_evictions_total", "counter", "LRU evictions from the in-memory tier", [
+        ({}, memory["evictions"])
+    ])
+    metric("price_cache_memory_expirations_total", "counter", "TTL expirations in the in-memory tier", [
+        ({}, memory["expirations"])
+    ])
+    metric("price_cache_memory_keys", "gauge", "In-memory tier entries by key prefix", [
+        ({"prefix": prefix}, count) for prefix, count in sorted(memory["keys_by_prefix"].items())
+    ])
+
+    metric("price_cache_redis_available", "gauge", "1 while Redis is in use", [
+        ({}, int(redis_stats["available"]))
+    ])
+    metric("price_cache_redis_errors_total", "counter", "Failed Redis calls by error type", [
+        ({"error": error}, count) for error, count in sorted(redis_stats["errors"].items())
+    ])
+
+    return "\n".join(lines) + "\n"
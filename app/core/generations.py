@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+import redis
+
+from app.core.redis_backend import RedisBackend
+
+GENERATION_PREFIX = "cache:gen:"
+
+
+class GenerationCounters:
+    """
+    Process-local view of the cache generation counters.
+
+    Cache keys embed the current generation of everything they depend on;
+    invalidating is a single INCR that makes older keys unreachable, leaving
+    them to expire through their TTL. With Redis the counters live there and
+    local copies are refreshed after refresh_after seconds (or immediately
+    when a broadcast announces a newer value); without Redis they are plain
+    in-process counters.
+
+    Only counters that were bumped are held without Redis; a name missing
+    from the table is at generation 0, so looking up products that never
+    changed (or do not exist) stores nothing. With Redis the local copies
+    are bounded to max_entries, dropping the least recently refreshed: a
+    dropped counter is simply read from Redis again.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[RedisBackend] = None,
+        refresh_after: float = 30,
+        max_entries: int = 10000
+    ):
+        self._backend = backend if backend is not None and backend.enabled else None
+        self.refresh_after = refresh_after
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # name -> (value, fetched_at), least recently refreshed first
+        self._values: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _is_fresh(self, name: str, now: float) -> bool:
+        if self._backend is None:
+            return True
+        entry = self._values.get(name)
+        return entry is not None and now - entry[1] < self.refresh_after
+
+    def _store(self, name: str, value: int, now: float) -> None:
+        """Record a counter value; the caller holds _lock"""
+        self._values[name] = (value, now)
+        self._values.move_to_end(name)
+        # Without Redis the table is the only copy of the bumped counters and
+        # holds nothing else, so it is never trimmed
+        if self._backend is not None:
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def _stale(self, names: List[str], now: float) -> List[str]:
+        with self._lock:
+            return [name for name in names if not self._is_fresh(name, now)]
+
+    def _refresh(self, stale: List[str], fetched: List[Optional[bytes]], now: float) -> None:
+        with self._lock:
+            for name, raw in zip(stale, fetched):
+                current = self._values.get(name, (0, 0.0))[0]
+                value = int(raw) if raw is not None else current
+                self._store(name, max(current, value), now)
+
+    def _current(self, names: List[str]) -> Dict[str, int]:
+        with self._lock:
+            return {name: self._values.get(name, (0, 0.0))[0] for name in names}
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Current generation of each name, fetching stale ones in one MGET.
+
+        Args:
+            names: Counter names such as "all" or "product:42"
+
+        Returns:
+            Mapping of name to generation (0 for counters never bumped)
+        """
+        names = list(dict.fromkeys(names))
+        now = time.monotonic()
+
+        stale = self._stale(names, now)
+        if stale:
+            fetched: List[Optional[bytes]] = [None] * len(stale)
+            client = self._backend.client() if self._backend is not None else None
+            if client is not None:
+                try:
+                    fetched = client.mget([GENERATION_PREFIX + name for name in stale])
+                    self._backend.record_success()
+                except redis.RedisError as exc:
+                    self._backend.record_failure(exc)
+            self._refresh(stale, fetched, now)
+
+        return self._current(names)
+
+    async def get_many_async(self, names: Iterable[str]) -> Dict[str, int]:
+        """get_many for coroutines, fetching stale counters with redis.asyncio"""
+        names = list(dict.fromkeys(names))
+        now = time.monotonic()
+
+        stale = self._stale(names, now)
+        if stale:
+            fetched: List[Optional[bytes]] = [None] * len(stale)
+            client = self._backend.async_client() if self._backend is not None else None
+            if client is not None:
+                try:
+                    fetched = await client.mget([GENERATION_PREFIX + name for name in stale])
+                    self._backend.record_success()
+                except redis.RedisError as exc:
+                    self._backend.record_failure(exc)
+            self._refresh(stale, fetched, now)
+
+        return self._current(names)
+
+    def get(self, name: str) -> int:
+        return self.get_many([name])[name]
+
+    def bump(self, name: str) -> int:
+        """Advance a counter, returning its new generation"""
+        value = None
+        client = self._backend.client() if self._backend is not None else None
+        if client is not None:
+            try:
+                value = int(client.incr(GENERATION_PREFIX + name))
+                self._backend.record_success()
+            except redis.RedisError as exc:
+                self._backend.record_failure(exc)
+
+        with self._lock:
+            current = self._values.get(name, (0, 0.0))[0]
+            value = max(current + 1, value or 0)
+            self._store(name, value, time.monotonic())
+            return value
+
+    def observe(self, name: str, value: int) -> None:
+        """Record a generation announced by another worker"""
+        with self._lock:
+            current = self._values.get(name, (0, 0.0))[0]
+            self._store(name, max(current, value), time.monotonic())
+
+    def expire_local(self) -> None:
+        """Re-read every counter from Redis on next use, e.g. after an outage"""
+        with self._lock:
+            self._values = OrderedDict(
+                (name, (value, float("-inf"))) for name, (value, _) in self._values.items()
+            )
@@ -0,0 +1,118 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import threading
+
+import redis
+
+from app.core.redis_backend import RedisBackend
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class LocalInvalidationBus:
+    """
+    In-process invalidation bus.
+
+    Delivers messages synchronously to every subscriber. Used when Redis is
+    not available (a single process has nothing to broadcast to) and in tests
+    to stand in for other workers.
+    """
+
+    def __init__(self):
+        self._handlers: List[Handler] = []
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def unsubscribe(self, handler: Handler) -> None:
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    def publish(self, message: Dict[str, Any]) -> bool:
+        for handler in list(self._handlers):
+            handler(message)
+        return True
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class RedisInvalidationBus(LocalInvalidationBus):
+    """
+    Invalidation bus over Redis pub/sub.
+
+    Messages are published as JSON on a shared channel; a background thread
+    started with start() dispatches incoming messages to the subscribers and
+    resubscribes after connection failures. While Redis is unavailable,
+    messages are delivered in-process only. Pub/sub is fire-and-forget, so a
+    worker that misses a message relies on the short L1 TTL to converge.
+    """
+
+    def __init__(self, backend: RedisBackend, channel: str = INVALIDATION_CHANNEL, retry_interval: float = 1.0):
+        super().__init__()
+        self._backend = backend
+        self._channel = channel
+        self._retry_interval = retry_interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, message: Dict[str, Any]) -> bool:
+        client = self._backend.client()
+        if client is None:
+            return super().publish(message)
+        try:
+            client.publish(self._channel, json.dumps(message))
+            self._backend.record_success()
+            return True
+        except redis.RedisError as exc:
+            self._backend.record_failure(exc)
+            logger.warning("Failed to publish cache invalidation: %s", exc)
+            return super().publish(message)
+
+    def _dispatch(self, raw: Dict[str, Any]) -> None:
+        try:
+            message = json.loads(raw["data"])
+        except (KeyError, TypeError, ValueError):
+            return
+        super().publish(message)
+
+    def _listen(self) -> None:
+        while not self._stopping.is_set():
+            client = self._backend.client()
+            if client is None:
+                self._stopping.wait(self._retry_interval)
+                continue
+
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                while not self._stopping.is_set():
+                    raw = pubsub.get_message(timeout=1.0)
+                    if raw is not None:
+                        self._dispatch(raw)
+            except redis.RedisError as exc:
+                self._backend.record_failure(exc)
+                self._stopping.wait(self._retry_interval)
+            finally:
+                pubsub.close()
+
+    def start(self) -> None:
+        if not self._backend.enabled or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import json
+import threading
+import time
+
+
+def freeze(value: Any) -> Any:
+    """
+    Read-only snapshot of a JSON-like value.
+
+    Dicts become mapping proxies and lists become tuples, recursively, so a
+    stored entry can be handed to every reader without copying and without
+    one reader's mutation leaking into another's result.
+    """
+    if isinstance(value, MappingProxyType):
+        return value
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _estimate_size(key: str, value: Any) -> int:
+    """Approximate footprint of an entry, in bytes of its JSON encoding"""
+    try:
+        return len(key) + len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(key) + 64
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process cache with LRU eviction and per-entry TTL.
+
+    Bounded both by number of entries and by approximate size in bytes;
+    the least recently used entries are evicted first. Expired entries are
+    dropped lazily when they are read or reach the LRU end. Values are stored
+    as frozen snapshots (see freeze) and returned without copying.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, size)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries.keys()))
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key: str, now: float) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+        return default if value is None else value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values of the keys that are present, under a single lock acquisition"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float], size: int) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key, (_, oldest_expires_at, _) = next(iter(self._entries.items()))
+            self._remove(oldest_key)
+            if oldest_expires_at is not None and oldest_expires_at <= time.monotonic():
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        """
+        Store a frozen snapshot of value.
+
+        Args:
+            ttl: Seconds until the entry expires (None for no expiry)
+            size: Encoded size in bytes when already known, else estimated
+        """
+        self.set_many({key: value}, ttl, None if size is None else {key: size})
+
+    def set_many(
+        self,
+        values: Dict[str, Any],
+        ttl: Optional[float] = None,
+        sizes: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Store several values with the same TTL under a single lock acquisition"""
+        expires_at = time.monotonic() + ttl if ttl else None
+        prepared = []
+        for key, value in values.items():
+            size = sizes.get(key) if sizes else None
+            size = len(key) + size if size is not None else _estimate_size(key, value)
+            prepared.append((key, freeze(value), size))
+
+        with self._lock:
+            for key, value, size in prepared:
+                self._store(key, value, expires_at, size)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+            return removed
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every entry whose key starts with prefix"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,193 @@
+"""
+Lazily connected Redis backend with a circuit breaker.
+
+Nothing touches the network at import time: the connection pool is built
+on first use from REDIS_URL with short socket timeouts. Consecutive
+failures open the breaker, callers fall back to the memory tier, and after
+REDIS_RETRY_INTERVAL seconds a single probe is let through to decide
+whether to close it again.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+# Empty or "memory" disables Redis entirely
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.25"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_FAILURE_THRESHOLD = int(os.getenv("REDIS_FAILURE_THRESHOLD", "3"))
+REDIS_RETRY_INTERVAL = float(os.getenv("REDIS_RETRY_INTERVAL", "5"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one probe through per retry interval"""
+
+    def __init__(self, failure_threshold: int = 3, retry_interval: float = 5.0):
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to Redis now"""
+        if self._state == CLOSED:
+            return True
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.retry_interval:
+                self._state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        if self._state == CLOSED and not self._failures:
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Redis reachable again, closing circuit breaker")
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("Redis unavailable, serving from the memory tier")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+class RedisBackend:
+    """
+    Factory for pooled Redis clients, guarded by a circuit breaker.
+
+    Blocking callers use client(); coroutines use async_client(), which keeps
+    one redis.asyncio client per event loop. Both report to the same breaker.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = REDIS_URL,
+        socket_timeout: float = REDIS_SOCKET_TIMEOUT,
+        connect_timeout: float = REDIS_CONNECT_TIMEOUT,
+        max_connections: int = REDIS_MAX_CONNECTIONS,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.url = url if url and url != "memory" else None
+        self.socket_timeout = socket_timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker(REDIS_FAILURE_THRESHOLD, REDIS_RETRY_INTERVAL)
+        self._lock = threading.Lock()
+        self._client: Optional[redis.Redis] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._recovery_callbacks: List[Callable[[], None]] = []
+        # Failed calls by exception class
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.url is not None
+
+    @property
+    def available(self) -> bool:
+        """Configured and not currently failed over to memory"""
+        return self.enabled and self.breaker.state == CLOSED
+
+    def _build_client(self) -> redis.Redis:
+        pool = redis.ConnectionPool.from_url(
+            self.url,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.connect_timeout,
+            max_connections=self.max_connections,
+            health_check_interval=30
+        )
+        return redis.Redis(connection_pool=pool)
+
+    def _build_async_client(self) -> aioredis.Redis:
+        pool = aioredis.ConnectionPool.from_url(
+            self.url,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.connect_timeout,
+            max_connections=self.max_connections,
+            health_check_interval=30
+        )
+        return aioredis.Redis(connection_pool=pool)
+
+    def client(self) -> Optional[redis.Redis]:
+        """
+        Client to use for the next call, or None to use the memory tier.
+
+        Callers report the outcome with record_success / record_failure.
+        """
+        if not self.enabled or not self.breaker.allow():
+            return None
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def async_client(self) -> Optional[aioredis.Redis]:
+        """Asyncio client for the running event loop, or None to use the memory tier"""
+        if not self.enabled or not self.breaker.allow():
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = self._build_async_client()
+        return client
+
+    async def close_async_client(self) -> None:
+        """Close the running event loop's asyncio client, e.g. on shutdown"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def on_recovery(self, callback: Callable[[], None]) -> None:
+        """Run callback whenever Redis becomes reachable again after a failure"""
+        self._recovery_callbacks.append(callback)
+
+    def record_success(self) -> None:
+        recovered = self.breaker.state != CLOSED
+        self.breaker.record_success()
+        if recovered:
+            for callback in list(self._recovery_callbacks):
+                callback()
+
+    def record_failure(self, exc: Optional[BaseException] = None) -> None:
+        if exc is not None:
+            logger.debug("Redis call failed: %s", exc)
+        error = type(exc).__name__ if exc is not None else "unknown"
+        self.errors[error] = self.errors.get(error, 0) + 1
+        self.breaker.record_failure()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "available": self.available,
+            "breaker_state": self.breaker.state,
+            "errors": dict(self.errors)
+        }
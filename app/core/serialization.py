@@ -0,0 +1,111 @@
+"""
+Cache value serializers.
+
+Payloads start with a one-byte tag naming their format, so workers
+configured with different serializers (e.g. during a rolling deploy) can
+still read each other's entries. orjson and msgpack are optional; the
+standard-library JSON serializer is always available.
+"""
+from typing import Any, Dict, Optional
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+class JsonSerializer:
+    """Standard-library JSON"""
+    name = "json"
+    tag = b"j"
+
+    def dumps(self, value: Any) -> bytes:
+        return self.tag + json.dumps(value, separators=(",", ":")).encode()
+
+    def loads(self, payload: bytes) -> Any:
+        return json.loads(payload[1:])
+
+
+class OrjsonSerializer(JsonSerializer):
+    """orjson: same JSON wire format, several times faster to encode and decode"""
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return self.tag + orjson.dumps(value)
+
+    def loads(self, payload: bytes) -> Any:
+        return orjson.loads(payload[1:])
+
+
+class MsgpackSerializer:
+    """MessagePack: compact binary encoding"""
+    name = "msgpack"
+    tag = b"m"
+
+    def dumps(self, value: Any) -> bytes:
+        return self.tag + msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload[1:], raw=False)
+
+
+def _available() -> Dict[str, Any]:
+    serializers = {"json": JsonSerializer()}
+    if orjson is not None:
+        serializers["orjson"] = OrjsonSerializer()
+    if msgpack is not None:
+        serializers["msgpack"] = MsgpackSerializer()
+    return serializers
+
+
+_SERIALIZERS = _available()
+
+
+def get_serializer(name: Optional[str] = None):
+    """
+    Serializer by name, or the fastest available one for "auto".
+
+    Args:
+        name: "auto", "orjson", "msgpack" or "json" (defaults to CACHE_SERIALIZER)
+
+    Returns:
+        The serializer; falls back to JSON when the requested library is missing
+    """
+    name = (name or os.getenv("CACHE_SERIALIZER", "auto")).lower()
+    if name == "auto":
+        for candidate in ("orjson", "msgpack"):
+            if candidate in _SERIALIZERS:
+                return _SERIALIZERS[candidate]
+    return _SERIALIZERS.get(name, _SERIALIZERS["json"])
+
+
+def decode(payload: Any) -> Any:
+    """
+    Decode a payload written by any serializer.
+
+    Args:
+        payload: Tagged bytes (or untagged JSON text written before tagging)
+
+    Returns:
+        Decoded value
+
+    Raises:
+        ValueError: When the payload's format is not available in this process
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    tag = payload[:1]
+    if tag == MsgpackSerializer.tag:
+        if msgpack is None:
+            raise ValueError("msgpack payload but msgpack is not installed")
+        return _SERIALIZERS["msgpack"].loads(payload)
+    if tag == JsonSerializer.tag:
+        return _SERIALIZERS["orjson" if orjson is not None else "json"].loads(payload)
+    return json.loads(payload)
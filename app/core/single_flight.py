@@ -0,0 +1,120 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key within a process.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for and share its result (or exception) instead of repeating
+    the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers.
+
+        Args:
+            key: Coalescing key
+            fn: Function to run
+            timeout: Seconds a waiting caller waits before running fn itself
+
+        Returns:
+            (result, leader) where leader is True for the caller that ran fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.done.wait(timeout):
+                return fn(), True
+            if call.error is not None:
+                raise call.error
+            return call.value, False
+
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, True
+
+
+class _AsyncCall:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[str, _AsyncCall] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Await fn once per key among concurrent callers (see SingleFlight.do).
+
+        Returns:
+            (result, leader) where leader is True for the caller that awaited fn
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            try:
+                await asyncio.wait_for(call.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                return await fn(), True
+            if call.error is not None:
+                raise call.error
+            return call.value, False
+
+        call = _AsyncCall()
+        self._calls[key] = call
+        try:
+            call.value = await fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            self._calls.pop(key, None)
+            call.done.set()
+        return call.value, True
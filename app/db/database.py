@@ -1,4 +1,7 @@
+from typing import AsyncIterator, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -13,6 +16,65 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Async drivers for the asyncio endpoints, by the driver-less URL scheme
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg"
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Database URL for the async engine.
+
+    Args:
+        url: Synchronous URL such as "sqlite:///./test.db"
+
+    Returns:
+        The same database with its asyncio driver (aiosqlite / asyncpg);
+        URLs that already name a driver are returned unchanged
+    """
+    scheme, separator, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Created on first use; check_async_driver verifies the driver at startup
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def check_async_driver(url: Optional[str] = None) -> None:
+    """
+    Fail fast when the async endpoints' driver is not installed.
+
+    Raises:
+        RuntimeError: If the DBAPI module of the async URL cannot be imported
+    """
+    parsed = make_url(url or ASYNC_DATABASE_URL)
+    try:
+        parsed.get_dialect().import_dbapi()
+    except ImportError as exc:
+        raise RuntimeError(
+            f"Async database driver '{parsed.drivername}' is not installed ({exc.name}); "
+            "install it (see requirements.txt) or set ASYNC_DATABASE_URL"
+        ) from exc
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
 
 def get_db():
     db = SessionLocal()
@@ -20,3 +82,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
@@ -1,14 +1,21 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api import product_routes
 from app.db.database import Base, engine
 from app.api import promotion_router
 from app.api.engine_router import router as engine_router
-from app.db.database import SessionLocal
+from app.db.database import SessionLocal, check_async_driver, dispose_async_engine
 from app.services.promotion_scheduler import update_promotion_status
 from app.api.dashboard_router import router as dashboard_router
 from app.api.simulation_router import router as simulation_router
 from app.api.experiment_router import router as experiment_router
 from app.api.audit_router import router as audit_router
+from app.core.cache import AsyncCacheService, CacheService
+from app.core.cache_metrics import render_prometheus
+from app.services.cache_warmup import cache_warmer
+from app.services.audit_writer import audit_writer
+from app.services.audit_rollup import audit_compactor
+from app.services.audit_retention import audit_retention
 
 
 
@@ -33,8 +40,62 @@ app.include_router(audit_router)
 def root():
     return {"message": "Welcome to Promotions Engine!"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Cache metrics in the Prometheus text format"""
+    return PlainTextResponse(render_prometheus(CacheService.stats()), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def check_async_database_driver():
+    check_async_driver()
+
 @app.on_event("startup")
 def activate_promotion_scheduler():
     db = SessionLocal()
     update_promotion_status(db)
-    db.close()
\ No newline at end of file
+    db.close()
+
+@app.on_event("startup")
+def start_cache_invalidation_listener():
+    CacheService.start_invalidation_listener()
+
+@app.on_event("startup")
+def start_cache_warmup():
+    cache_warmer.start()
+
+@app.on_event("startup")
+def start_audit_writer():
+    audit_writer.start()
+
+@app.on_event("startup")
+def start_audit_compactor():
+    audit_compactor.start()
+
+@app.on_event("startup")
+def start_audit_retention():
+    audit_retention.start()
+
+@app.on_event("shutdown")
+def stop_cache_invalidation_listener():
+    CacheService.stop_invalidation_listener()
+
+@app.on_event("shutdown")
+def stop_cache_warmup():
+    cache_warmer.stop()
+
+@app.on_event("shutdown")
+def stop_audit_writer():
+    audit_writer.stop()
+
+@app.on_event("shutdown")
+def stop_audit_compactor():
+    audit_compactor.stop()
+
+@app.on_event("shutdown")
+def stop_audit_retention():
+    audit_retention.stop()
+
+@app.on_event("shutdown")
+async def close_async_connections():
+    await AsyncCacheService.close()
+    await dispose_async_engine()
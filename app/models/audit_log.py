@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
 
 class PriceAuditLog(Base):
     __tablename__ = "price_audit_logs"
+    # One index per /audit/logs filter, each ending in the (created_at, id)
+    # sort key so filtered pages are read in index order
+    __table_args__ = (
+        Index("ix_price_audit_logs_created_at_id", "created_at", "id"),
+        Index("ix_price_audit_logs_product_created_at_id", "product_id", "created_at", "id"),
+        Index("ix_price_audit_logs_user_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy.orm import declared_attr
+from app.db.database import Base
+
+
+class AuditRollupColumns:
+    """Totals of the audit rows of one bucket, product, currency and promotion"""
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False)
+    currency = Column(String, nullable=False)
+    # Name of the first applied promotion, "" when none applied
+    promotion = Column(String, nullable=False, default="")
+    total_calculations = Column(Integer, nullable=False, default=0)
+    total_revenue = Column(Float, nullable=False, default=0.0)
+    total_discount = Column(Float, nullable=False, default=0.0)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            UniqueConstraint(
+                "bucket_start", "product_id", "currency", "promotion",
+                name=f"uq_{cls.__tablename__}_key"
+            ),
+        )
+
+
+class PriceAuditHourlyRollup(AuditRollupColumns, Base):
+    __tablename__ = "price_audit_rollups_hourly"
+
+
+class PriceAuditDailyRollup(AuditRollupColumns, Base):
+    __tablename__ = "price_audit_rollups_daily"
+
+
+class AuditRollupWatermark(Base):
+    """Highest PriceAuditLog id already added to the rollups"""
+    __tablename__ = "audit_rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class PriceRequest(BaseModel):
     product_id: int
@@ -7,3 +7,20 @@ class PriceRequest(BaseModel):
     target_currency: Optional[str] = None  # Convert to this currency (ISO code)
     include_tax: Optional[bool] = None  # Override product tax_inclusive setting
     rounding_strategy: str = "half_up"  # half_up, half_down, up, down, nearest
+    detail: str = "full"  # full, summary (no explanation), final_only (final_price and currency)
+
+
+class BatchPriceRequest(BaseModel):
+    lines: List[PriceRequest]
+
+
+class CartItem(BaseModel):
+    product_id: int
+    quantity: int = 1
+
+
+class CartPriceRequest(BaseModel):
+    items: List[CartItem]
+    target_currency: Optional[str] = None  # Every line is priced in this currency
+    include_tax: Optional[bool] = None
+    rounding_strategy: str = "half_up"
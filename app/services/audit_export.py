@@ -0,0 +1,219 @@
+"""
+Bulk export of the price audit log.
+
+Rows are read with a streaming cursor (yield_per) in chunks of
+AUDIT_EXPORT_CHUNK_SIZE and encoded chunk by chunk, so memory stays flat
+however many rows are exported. /audit/export streams NDJSON or CSV; the
+command line writes one Parquet or Arrow file per day for warehouse loads:
+
+    python -m app.services.audit_export --start 2024-03-01 --end 2024-04-01 --out exports/
+
+pyarrow is optional and only needed for the Parquet/Arrow files.
+"""
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.models.audit_log import PriceAuditLog
+from app.services.audit_service import AuditService
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+AUDIT_EXPORT_CHUNK_SIZE = int(os.getenv("AUDIT_EXPORT_CHUNK_SIZE", "5000"))
+
+EXPORT_COLUMNS = [column.name for column in PriceAuditLog.__table__.columns]
+JSON_COLUMNS = {"applied_promotions", "extra_data"}
+
+NDJSON = "ndjson"
+CSV = "csv"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", CSV: "text/csv"}
+
+
+def iter_chunks(
+    db: Session,
+    product_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    chunk_size: int = AUDIT_EXPORT_CHUNK_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Matching audit rows in id order, as lists of at most chunk_size dicts.
+
+    The query runs once with a server-side cursor where the driver has one;
+    only the current chunk is held in memory.
+    """
+    query = AuditService._filter_logs(
+        db.query(*(getattr(PriceAuditLog, name) for name in EXPORT_COLUMNS)),
+        product_id, start_date, end_date
+    )
+    if user_id:
+        query = query.filter(PriceAuditLog.user_id == user_id)
+
+    rows = iter(query.order_by(PriceAuditLog.id).yield_per(chunk_size))
+    while True:
+        chunk = [row._asdict() for row in islice(rows, chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _text_value(name: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if name in JSON_COLUMNS:
+        return json.dumps(value, separators=(",", ":"))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def encode_ndjson(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    """One JSON object per line, one string per chunk"""
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(row, separators=(",", ":"), default=_json_default) + "\n" for row in chunk
+        )
+
+
+def encode_csv(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    """Header line, then one string per chunk; JSON columns are JSON-encoded"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_text_value(name, row[name]) for name in EXPORT_COLUMNS] for row in chunk)
+        yield buffer.getvalue()
+
+
+ENCODERS = {NDJSON: encode_ndjson, CSV: encode_csv}
+
+
+def _arrow_schema():
+    types = {
+        "id": pyarrow.int64(),
+        "product_id": pyarrow.int64(),
+        "quantity": pyarrow.int64(),
+        "created_at": pyarrow.timestamp("us")
+    }
+    floats = {"original_price", "final_price", "discount_amount", "tax_amount", "tax_rate"}
+    return pyarrow.schema([
+        (name, types.get(name, pyarrow.float64() if name in floats else pyarrow.string()))
+        for name in EXPORT_COLUMNS
+    ])
+
+
+def _record_batch(schema, chunk: List[Dict[str, Any]]):
+    columns = {
+        name: [row[name] if name not in JSON_COLUMNS else _text_value(name, row[name]) for row in chunk]
+        for name in EXPORT_COLUMNS
+    }
+    return pyarrow.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def export_partitions(
+    db: Session,
+    start: date,
+    end: date,
+    out_dir: str,
+    file_format: str = "parquet",
+    chunk_size: int = AUDIT_EXPORT_CHUNK_SIZE
+) -> Dict[str, int]:
+    """
+    Write the audit rows of each day in [start, end) to
+    out_dir/date=YYYY-MM-DD/audit.<parquet|arrow>, chunk by chunk.
+
+    Days without rows get no file.
+
+    Returns:
+        Path -> number of rows written
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required for Parquet/Arrow export (pip install pyarrow)")
+
+    schema = _arrow_schema()
+    written: Dict[str, int] = {}
+    day = start
+    while day < end:
+        day_start = datetime.combine(day, datetime.min.time())
+        # end_date is inclusive; stop just before the next midnight
+        day_end = day_start + timedelta(days=1) - timedelta(microseconds=1)
+        path = os.path.join(out_dir, f"date={day.isoformat()}", f"audit.{file_format}")
+
+        writer = None
+        rows = 0
+        try:
+            for chunk in iter_chunks(db, start_date=day_start, end_date=day_end, chunk_size=chunk_size):
+                if writer is None:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if file_format == "parquet":
+                        writer = pyarrow.parquet.ParquetWriter(path, schema)
+                    else:
+                        writer = pyarrow.ipc.new_file(path, schema)
+                batch = _record_batch(schema, chunk)
+                if file_format == "parquet":
+                    writer.write_batch(batch)
+                else:
+                    writer.write(batch)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if rows:
+            written[path] = rows
+        day += timedelta(days=1)
+    return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export the price audit log as daily Parquet/Arrow files")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, type=date.fromisoformat, help="Day after the last one (YYYY-MM-DD)")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=AUDIT_EXPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        written = export_partitions(db, args.start, args.end, args.out, args.format, args.chunk_size)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    for path, rows in written.items():
+        print(f"{path}: {rows} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
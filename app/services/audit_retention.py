@@ -0,0 +1,178 @@
+"""
+Scheduled retention of the price audit log.
+
+Every AUDIT_RETENTION_INTERVAL seconds a background thread deletes the
+whole days of logs older than AUDIT_RETENTION_DAYS, and their hourly and
+daily rollups, through AuditService.cleanup_old_logs, in
+id ranges of AUDIT_RETENTION_BATCH_SIZE committed one at a time with
+AUDIT_RETENTION_PAUSE seconds between them, so pricing writes are never
+blocked for long. With AUDIT_ARCHIVE_DIR set, each run first appends the
+rows it deletes to a gzip-compressed NDJSON file in that directory.
+
+The schedule runs unless AUDIT_RETENTION_ENABLED=false; DELETE
+/audit/cleanup runs the same purge on demand.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import gzip
+import logging
+import os
+import threading
+
+from sqlalchemy.orm import Session
+
+from app.core.background import BackgroundWorker
+from app.db.database import SessionLocal
+from app.services.audit_export import encode_ndjson
+from app.services.audit_service import AuditService
+
+logger = logging.getLogger(__name__)
+
+AUDIT_RETENTION_ENABLED = os.getenv("AUDIT_RETENTION_ENABLED", "true").lower() == "true"
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+AUDIT_RETENTION_INTERVAL = float(os.getenv("AUDIT_RETENTION_INTERVAL", "3600"))
+AUDIT_RETENTION_BATCH_SIZE = int(os.getenv("AUDIT_RETENTION_BATCH_SIZE", "1000"))
+AUDIT_RETENTION_PAUSE = float(os.getenv("AUDIT_RETENTION_PAUSE", "0.1"))
+# Directory for compressed archives of deleted rows; empty disables archiving
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "")
+
+
+class CleanupInProgress(Exception):
+    """Raised when a purge is requested while another one is running"""
+
+
+class GzipArchive:
+    """Appends batches of audit rows to one gzip NDJSON file, opened on first use"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self.rows = 0
+        self._file = None
+
+    def __call__(self, rows: List[Dict[str, Any]]) -> None:
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+            self.path = os.path.join(self.directory, f"audit_logs_{stamp}.ndjson.gz")
+            self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        for text in encode_ndjson(iter([rows])):
+            self._file.write(text)
+        # Rows are deleted right after this returns: make sure they are on disk
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class AuditRetention(BackgroundWorker):
+    """Runs the audit purge on a schedule, or once on demand, one at a time"""
+
+    thread_name = "audit-retention"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        days: int = AUDIT_RETENTION_DAYS,
+        interval: float = AUDIT_RETENTION_INTERVAL,
+        batch_size: int = AUDIT_RETENTION_BATCH_SIZE,
+        pause: float = AUDIT_RETENTION_PAUSE,
+        archive_dir: str = AUDIT_ARCHIVE_DIR,
+        enabled: bool = AUDIT_RETENTION_ENABLED
+    ):
+        super().__init__(enabled)
+        self.session_factory = session_factory
+        self.days = days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.archive_dir = archive_dir
+        self._running = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def busy(self) -> bool:
+        return self._running.locked()
+
+    def purge(self, db: Session, days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Delete (and archive) logs older than `days` in this session.
+
+        Returns:
+            {"deleted_count", "archive", "started_at", "finished_at"}
+
+        Raises:
+            CleanupInProgress: If another purge is running in this process
+        """
+        if not self._running.acquire(blocking=False):
+            raise CleanupInProgress("An audit cleanup is already running")
+        try:
+            return self._purge(db, days)
+        finally:
+            self._running.release()
+
+    def _purge(self, db: Session, days: Optional[int]) -> Dict[str, Any]:
+        started_at = datetime.utcnow()
+        archive = GzipArchive(self.archive_dir) if self.archive_dir else None
+        try:
+            deleted = AuditService.cleanup_old_logs(
+                db, days if days is not None else self.days, self.batch_size, self.pause, archive
+            )
+        finally:
+            if archive is not None:
+                archive.close()
+        self.last_run = {
+            "deleted_count": deleted,
+            "archive": archive.path if archive is not None else None,
+            "started_at": started_at.isoformat(),
+            "finished_at": datetime.utcnow().isoformat()
+        }
+        return self.last_run
+
+    def _run_locked(self, days: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Purge in a new session; the caller holds _running, released here"""
+        try:
+            db = self.session_factory()
+            try:
+                return self._purge(db, days)
+            except Exception:
+                db.rollback()
+                logger.warning("Audit retention cleanup failed", exc_info=True)
+                return None
+            finally:
+                db.close()
+        finally:
+            self._running.release()
+
+    def run_once(self, days: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if not self._running.acquire(blocking=False):
+            return None
+        return self._run_locked(days)
+
+    def trigger(self, days: Optional[int] = None) -> None:
+        """
+        Start a purge on a background thread.
+
+        The purge lock is taken before returning, so of two concurrent calls
+        exactly one starts a purge.
+
+        Raises:
+            CleanupInProgress: If a purge is already running
+        """
+        if not self._running.acquire(blocking=False):
+            raise CleanupInProgress("An audit cleanup is already running")
+        try:
+            threading.Thread(target=self._run_locked, args=(days,), name="audit-cleanup", daemon=True).start()
+        except BaseException:
+            self._running.release()
+            raise
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.run_once()
+
+
+audit_retention = AuditRetention()
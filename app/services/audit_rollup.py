@@ -0,0 +1,245 @@
+"""
+Hourly and daily rollups of the price audit log.
+
+A background compactor adds PriceAuditLog rows above a watermark id to
+per-(bucket, product, currency, promotion) totals, in batches of
+AUDIT_ROLLUP_BATCH_SIZE, every AUDIT_ROLLUP_INTERVAL seconds. Rollups and
+watermark are committed together, so a row is counted exactly once; the
+watermark only advances through rows older than AUDIT_ROLLUP_LAG_SECONDS,
+which leaves time for slower transactions to commit rows with lower ids.
+
+Statistics read whole days from the daily rollups, the remaining whole
+hours from the hourly ones, and only the partial hours at the edges of the
+range plus the rows above the watermark from the audit log itself.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+import logging
+import os
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.background import BackgroundWorker
+from app.db.database import SessionLocal
+from app.models.audit_log import PriceAuditLog
+from app.models.audit_rollup import (
+    AuditRollupColumns, AuditRollupWatermark, PriceAuditDailyRollup, PriceAuditHourlyRollup
+)
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ROLLUP_ENABLED = os.getenv("AUDIT_ROLLUP_ENABLED", "true").lower() == "true"
+AUDIT_ROLLUP_INTERVAL = float(os.getenv("AUDIT_ROLLUP_INTERVAL", "60"))
+AUDIT_ROLLUP_BATCH_SIZE = int(os.getenv("AUDIT_ROLLUP_BATCH_SIZE", "5000"))
+AUDIT_ROLLUP_LAG_SECONDS = float(os.getenv("AUDIT_ROLLUP_LAG_SECONDS", "10"))
+
+WATERMARK_NAME = "price_audit_logs"
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+RollupSpan = Tuple[Type[AuditRollupColumns], Optional[datetime], Optional[datetime]]
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil(moment: datetime, floor: Callable[[datetime], datetime], step: timedelta) -> datetime:
+    start = floor(moment)
+    return start if start == moment else start + step
+
+
+def promotion_key(applied_promotions: Optional[List[Any]]) -> str:
+    """Rollup promotion of an audit row: the first applied promotion's name"""
+    if not applied_promotions:
+        return ""
+    first = applied_promotions[0]
+    return str(first.get("name", "")) if isinstance(first, dict) else str(first)
+
+
+def rollup_spans(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Tuple[Optional[Tuple[Optional[datetime], Optional[datetime]]], List[RollupSpan]]:
+    """
+    Split a statistics range into whole days and whole hours.
+
+    Returns:
+        ((start, end) of the part covered by rollups, or None if no whole hour
+        fits, [(rollup model, first bucket, end bucket)]); None bounds are open
+    """
+    low = _ceil(start_date, hour_start, HOUR) if start_date else None
+    high = hour_start(end_date) if end_date else None
+    if low is not None and high is not None and low >= high:
+        return None, []
+
+    day_low = _ceil(low, day_start, DAY) if low is not None else None
+    day_high = day_start(high) if high is not None else None
+    if day_low is not None and day_high is not None and day_low >= day_high:
+        return (low, high), [(PriceAuditHourlyRollup, low, high)]
+
+    spans: List[RollupSpan] = [(PriceAuditDailyRollup, day_low, day_high)]
+    if low is not None and low < day_low:
+        spans.append((PriceAuditHourlyRollup, low, day_low))
+    if high is not None and day_high < high:
+        spans.append((PriceAuditHourlyRollup, day_high, high))
+    return (low, high), spans
+
+
+def get_watermark(db: Session) -> int:
+    """Highest audit log id included in the rollups (0 before the first compaction)"""
+    last_id = db.query(AuditRollupWatermark.last_id).filter(
+        AuditRollupWatermark.name == WATERMARK_NAME
+    ).scalar()
+    return last_id or 0
+
+
+def _add_to_rollup(
+    db: Session,
+    model: Type[AuditRollupColumns],
+    bucket_of: Callable[[datetime], datetime],
+    rows: Iterable[Any]
+) -> None:
+    totals: Dict[Tuple[datetime, int, str, str], List[float]] = {}
+    for row in rows:
+        key = (bucket_of(row.created_at), row.product_id, row.currency, promotion_key(row.applied_promotions))
+        bucket = totals.setdefault(key, [0, 0.0, 0.0])
+        bucket[0] += 1
+        bucket[1] += row.final_price
+        bucket[2] += row.discount_amount
+
+    existing = {
+        (rollup.bucket_start, rollup.product_id, rollup.currency, rollup.promotion): rollup
+        for rollup in db.query(model).filter(
+            model.bucket_start.in_({key[0] for key in totals}),
+            model.product_id.in_({key[1] for key in totals})
+        )
+    }
+    for key, (calculations, revenue, discount) in totals.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            db.add(model(
+                bucket_start=key[0], product_id=key[1], currency=key[2], promotion=key[3],
+                total_calculations=calculations, total_revenue=revenue, total_discount=discount
+            ))
+        else:
+            rollup.total_calculations += calculations
+            rollup.total_revenue += revenue
+            rollup.total_discount += discount
+
+
+def compact(
+    db: Session,
+    batch_size: int = AUDIT_ROLLUP_BATCH_SIZE,
+    lag_seconds: float = AUDIT_ROLLUP_LAG_SECONDS,
+    now: Optional[datetime] = None
+) -> int:
+    """
+    Add audit rows above the watermark to the hourly and daily rollups.
+
+    Each batch commits its rollups with the new watermark only if no other
+    compactor moved the watermark meanwhile, so concurrent workers never
+    count a row twice.
+
+    Args:
+        db: Database session
+        batch_size: Audit rows per transaction
+        lag_seconds: Rows younger than this are left for the next run
+        now: Current time (defaults to utcnow)
+
+    Returns:
+        Number of audit rows rolled up
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=lag_seconds)
+    limit_id = db.query(func.max(PriceAuditLog.id)).filter(PriceAuditLog.created_at <= cutoff).scalar()
+    if not limit_id:
+        return 0
+
+    if db.get(AuditRollupWatermark, WATERMARK_NAME) is None:
+        try:
+            db.add(AuditRollupWatermark(name=WATERMARK_NAME, last_id=0))
+            db.commit()
+        except IntegrityError:
+            # Created by another compactor
+            db.rollback()
+
+    processed = 0
+    watermark = get_watermark(db)
+    while watermark < limit_id:
+        rows = (
+            db.query(
+                PriceAuditLog.id,
+                PriceAuditLog.product_id,
+                PriceAuditLog.currency,
+                PriceAuditLog.final_price,
+                PriceAuditLog.discount_amount,
+                PriceAuditLog.applied_promotions,
+                PriceAuditLog.created_at
+            )
+            .filter(PriceAuditLog.id > watermark, PriceAuditLog.id <= limit_id)
+            .order_by(PriceAuditLog.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        _add_to_rollup(db, PriceAuditHourlyRollup, hour_start, rows)
+        _add_to_rollup(db, PriceAuditDailyRollup, day_start, rows)
+        moved = db.execute(
+            update(AuditRollupWatermark)
+            .where(AuditRollupWatermark.name == WATERMARK_NAME, AuditRollupWatermark.last_id == watermark)
+            .values(last_id=rows[-1].id)
+        ).rowcount
+        if not moved:
+            db.rollback()
+            break
+        db.commit()
+        processed += len(rows)
+        watermark = rows[-1].id
+    return processed
+
+
+class AuditRollupCompactor(BackgroundWorker):
+    """Runs compact() on a background thread every `interval` seconds"""
+
+    thread_name = "audit-rollup"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = AUDIT_ROLLUP_INTERVAL,
+        batch_size: int = AUDIT_ROLLUP_BATCH_SIZE,
+        lag_seconds: float = AUDIT_ROLLUP_LAG_SECONDS,
+        enabled: bool = AUDIT_ROLLUP_ENABLED
+    ):
+        super().__init__(enabled)
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lag_seconds = lag_seconds
+
+    def run_once(self) -> int:
+        db = self.session_factory()
+        try:
+            return compact(db, self.batch_size, self.lag_seconds)
+        except Exception:
+            db.rollback()
+            logger.warning("Audit rollup compaction failed", exc_info=True)
+            return 0
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self.run_once()
+            self._stopping.wait(self.interval)
+
+
+audit_compactor = AuditRollupCompactor()
@@ -1,10 +1,63 @@
+from sqlalchemy import func, insert, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.audit_log import PriceAuditLog
-from typing import Dict, Any, Optional, List
+from app.models.audit_rollup import PriceAuditDailyRollup, PriceAuditHourlyRollup
+from app.services.audit_rollup import day_start, get_watermark, rollup_spans
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
+import base64
+import json
+import time
+
+# Dimensions /audit/statistics can group by
+STATISTICS_GROUPS = ("product", "currency", "day", "promotion")
+
+
+def _group_column(model, timestamp, group_by: str):
+    """Grouping expression on the audit log or a rollup table"""
+    if group_by == "product":
+        return model.product_id
+    if group_by == "currency":
+        return model.currency
+    if group_by == "day":
+        return func.date(timestamp)
+    if model is PriceAuditLog:
+        # promotion_key in SQL: the first applied promotion's name, "" for none
+        return func.coalesce(model.applied_promotions[0]["name"].as_string(), "")
+    return model.promotion
+
 
 class AuditService:
 
+    @staticmethod
+    def _audit_values(
+        product_id: int,
+        quantity: int,
+        pricing_result: Dict[str, Any],
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        request_id: Optional[str] = None,
+        extra_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        return {
+            "product_id": product_id,
+            "quantity": quantity,
+            "original_price": pricing_result.get("original_price", 0),
+            "final_price": pricing_result.get("final_price", 0),
+            "discount_amount": pricing_result.get("discount_amount", 0),
+            "applied_promotions": pricing_result.get("applied_promotions", []),
+            "currency": pricing_result.get("currency", "INR"),
+            "tax_amount": pricing_result.get("tax_amount", 0),
+            "tax_rate": pricing_result.get("tax_rate", 0),
+            "user_id": user_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "request_id": request_id,
+            "extra_data": extra_data or {}
+        }
+
     @staticmethod
     def log_price_calculation(
         db: Session,
@@ -17,28 +70,79 @@ class AuditService:
         request_id: Optional[str] = None,
         extra_data: Optional[Dict[str, Any]] = None
     ) -> PriceAuditLog:
-        audit_log = PriceAuditLog(
-            product_id=product_id,
-            quantity=quantity,
-            original_price=pricing_result.get("original_price", 0),
-            final_price=pricing_result.get("final_price", 0),
-            discount_amount=pricing_result.get("discount_amount", 0),
-            applied_promotions=pricing_result.get("applied_promotions", []),
-            currency=pricing_result.get("currency", "INR"),
-            tax_amount=pricing_result.get("tax_amount", 0),
-            tax_rate=pricing_result.get("tax_rate", 0),
-            user_id=user_id,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            request_id=request_id,
-            extra_data=extra_data or {}
-        )
+        audit_log = PriceAuditLog(**AuditService._audit_values(
+            product_id, quantity, pricing_result,
+            user_id, ip_address, user_agent, request_id, extra_data
+        ))
 
         db.add(audit_log)
         db.commit()
         db.refresh(audit_log)
         return audit_log
 
+    @staticmethod
+    def build_rows(
+        records: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        request_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Insert values of audit rows, stamped with the current time.
+
+        Each record holds product_id, quantity, pricing_result and optionally
+        extra_data; request metadata is shared by every row.
+        """
+        created_at = datetime.utcnow()
+        rows = []
+        for record in records:
+            values = AuditService._audit_values(
+                record["product_id"],
+                record["quantity"],
+                record["pricing_result"],
+                user_id, ip_address, user_agent, request_id,
+                record.get("extra_data")
+            )
+            values["created_at"] = created_at
+            rows.append(values)
+        return rows
+
+    @staticmethod
+    def insert_rows(db: Session, rows: List[Dict[str, Any]]) -> int:
+        """Write rows from build_rows with one executemany INSERT and a single commit"""
+        if not rows:
+            return 0
+        db.execute(insert(PriceAuditLog), rows)
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    async def insert_rows_async(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+        """insert_rows through an async session"""
+        if not rows:
+            return 0
+        await db.execute(insert(PriceAuditLog), rows)
+        await db.commit()
+        return len(rows)
+
+    @staticmethod
+    def log_price_calculations_bulk(
+        db: Session,
+        records: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        request_id: Optional[str] = None
+    ) -> int:
+        """Write many audit rows with one executemany INSERT and a single commit.
+
+        Each record holds product_id, quantity, pricing_result and optionally
+        extra_data; request metadata is shared by every row.
+        """
+        return AuditService.insert_rows(
+            db, AuditService.build_rows(records, user_id, ip_address, user_agent, request_id)
+        )
+
     @staticmethod
     def get_audit_logs(
         db: Session,
@@ -47,40 +151,62 @@ class AuditService:
         end_date: Optional[datetime] = None,
         user_id: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[PriceAuditLog]:
-        query = db.query(PriceAuditLog)
-
-        if product_id:
-            query = query.filter(PriceAuditLog.product_id == product_id)
+        """Newest logs first, paged by offset or, when given, by a cursor.
 
-        if start_date:
-            query = query.filter(PriceAuditLog.created_at >= start_date)
+        A cursor from encode_cursor() continues right after the log it was
+        made from, so deep pages cost an index seek instead of skipping
+        `offset` rows; offset is ignored when a cursor is given.
 
-        if end_date:
-            query = query.filter(PriceAuditLog.created_at <= end_date)
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = AuditService._filter_logs(db.query(PriceAuditLog), product_id, start_date, end_date)
 
         if user_id:
             query = query.filter(PriceAuditLog.user_id == user_id)
 
-        query = query.order_by(PriceAuditLog.created_at.desc())
-        query = query.offset(offset).limit(limit)
+        # id breaks ties between rows written in the same batch
+        query = query.order_by(PriceAuditLog.created_at.desc(), PriceAuditLog.id.desc())
+
+        if cursor:
+            created_at, log_id = AuditService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(PriceAuditLog.created_at, PriceAuditLog.id) < tuple_(created_at, log_id)
+            )
+        else:
+            query = query.offset(offset)
 
-        return query.all()
+        return query.limit(limit).all()
+
+    @staticmethod
+    def encode_cursor(log: PriceAuditLog) -> str:
+        """Opaque cursor pointing just after `log` in get_audit_logs order"""
+        payload = json.dumps([log.created_at.isoformat(), log.id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            created_at, log_id = json.loads(payload)
+            return datetime.fromisoformat(created_at), int(log_id)
+        except (ValueError, TypeError) as exc:
+            raise ValueError("Invalid cursor") from exc
 
     @staticmethod
     def get_audit_log(db: Session, log_id: int) -> Optional[PriceAuditLog]:
         return db.query(PriceAuditLog).filter(PriceAuditLog.id == log_id).first()
 
     @staticmethod
-    def get_audit_statistics(
-        db: Session,
+    def _filter_logs(
+        query,
         product_id: Optional[int] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
-    ) -> Dict[str, Any]:
-        query = db.query(PriceAuditLog)
-
+    ):
         if product_id:
             query = query.filter(PriceAuditLog.product_id == product_id)
 
@@ -90,38 +216,166 @@ class AuditService:
         if end_date:
             query = query.filter(PriceAuditLog.created_at <= end_date)
 
-        logs = query.all()
+        return query
 
-        if not logs:
-            return {
-                "total_calculations": 0,
-                "total_revenue": 0,
-                "total_discount": 0,
-                "avg_discount": 0,
-                "unique_products": 0,
-                "period_start": start_date.isoformat() if start_date else None,
-                "period_end": end_date.isoformat() if end_date else None
-            }
-
-        total_revenue = sum(log.final_price for log in logs)
-        total_discount = sum(log.discount_amount for log in logs)
-        unique_products = len(set(log.product_id for log in logs))
+    @staticmethod
+    def _add_to_group(
+        groups: Dict[Any, Dict[str, Any]],
+        key: Any,
+        product_id: int,
+        calculations: int,
+        revenue: float,
+        discount: float
+    ) -> None:
+        group = groups.setdefault(key, {"calculations": 0, "revenue": 0.0, "discount": 0.0, "products": set()})
+        group["calculations"] += calculations or 0
+        group["revenue"] += revenue or 0.0
+        group["discount"] += discount or 0.0
+        group["products"].add(product_id)
 
+    @staticmethod
+    def _aggregates(group: Dict[str, Any]) -> Dict[str, Any]:
+        count = group["calculations"]
         return {
-            "total_calculations": len(logs),
-            "total_revenue": float(total_revenue),
-            "total_discount": float(total_discount),
-            "avg_discount": float(total_discount / len(logs)) if logs else 0,
-            "unique_products": unique_products,
-            "period_start": start_date.isoformat() if start_date else None,
-            "period_end": end_date.isoformat() if end_date else None
+            "total_calculations": count,
+            "total_revenue": float(group["revenue"]),
+            "total_discount": float(group["discount"]),
+            "avg_discount": float(group["discount"] / count) if count else 0,
+            "unique_products": len(group["products"])
         }
 
     @staticmethod
-    def cleanup_old_logs(db: Session, days: int = 90) -> int:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        deleted = db.query(PriceAuditLog).filter(
+    def get_audit_statistics(
+        db: Session,
+        product_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        group_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Totals over the matching audit rows.
+
+        Whole days and hours already compacted are read from the rollup
+        tables; only the edges of the range and the rows above the rollup
+        watermark are aggregated from the audit log. Either part is grouped
+        by product in the database and merged here, so the work grows with
+        buckets and products, not with rows.
+
+        With group_by (see STATISTICS_GROUPS) the same totals are also
+        returned per group, largest revenue first, or chronologically for days.
+        """
+        groups: Dict[Any, Dict[str, Any]] = {}
+        watermark = get_watermark(db)
+        rolled, spans = rollup_spans(start_date, end_date) if watermark else (None, [])
+
+        for model, low, high in spans:
+            keys = [_group_column(model, model.bucket_start, group_by).label("key")] if group_by else []
+            query = db.query(
+                *keys,
+                model.product_id,
+                func.sum(model.total_calculations),
+                func.sum(model.total_revenue),
+                func.sum(model.total_discount)
+            )
+            if product_id:
+                query = query.filter(model.product_id == product_id)
+            if low is not None:
+                query = query.filter(model.bucket_start >= low)
+            if high is not None:
+                query = query.filter(model.bucket_start < high)
+            for row in query.group_by(*keys, model.product_id):
+                AuditService._add_to_group(groups, row[0] if group_by else None, *row[len(keys):])
+
+        tail = AuditService._filter_logs(db.query(PriceAuditLog), product_id, start_date, end_date)
+        if rolled is not None:
+            low, high = rolled
+            outside = [PriceAuditLog.id > watermark]
+            if low is not None:
+                outside.append(PriceAuditLog.created_at < low)
+            if high is not None:
+                outside.append(PriceAuditLog.created_at >= high)
+            tail = tail.filter(or_(*outside))
+
+        keys = [_group_column(PriceAuditLog, PriceAuditLog.created_at, group_by).label("key")] if group_by else []
+        rows = tail.with_entities(
+            *keys,
+            PriceAuditLog.product_id,
+            func.count(PriceAuditLog.id),
+            func.sum(PriceAuditLog.final_price),
+            func.sum(PriceAuditLog.discount_amount)
+        ).group_by(*keys, PriceAuditLog.product_id)
+        for row in rows:
+            AuditService._add_to_group(groups, row[0] if group_by else None, *row[len(keys):])
+
+        totals: Dict[str, Any] = {"calculations": 0, "revenue": 0.0, "discount": 0.0, "products": set()}
+        for group in groups.values():
+            totals["calculations"] += group["calculations"]
+            totals["revenue"] += group["revenue"]
+            totals["discount"] += group["discount"]
+            totals["products"] |= group["products"]
+
+        stats = AuditService._aggregates(totals)
+        stats["period_start"] = start_date.isoformat() if start_date else None
+        stats["period_end"] = end_date.isoformat() if end_date else None
+
+        if group_by:
+            if group_by == "day":
+                # Dates come back as strings from SQLite and as date objects elsewhere
+                ordered = sorted(((str(key), group) for key, group in groups.items()), key=lambda item: item[0])
+            else:
+                ordered = sorted(groups.items(), key=lambda item: -item[1]["revenue"])
+            stats["group_by"] = group_by
+            stats["groups"] = [
+                {"key": None if group_by == "promotion" and key == "" else key, **AuditService._aggregates(group)}
+                for key, group in ordered
+            ]
+
+        return stats
+
+    @staticmethod
+    def cleanup_old_logs(
+        db: Session,
+        days: int = 90,
+        batch_size: int = 1000,
+        pause: float = 0.0,
+        archive: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ) -> int:
+        """Delete logs of whole days older than `days`, one id range per transaction.
+
+        Each batch deletes at most batch_size ids and commits on its own, so
+        locks are held briefly and pricing writes interleave with the purge;
+        `pause` seconds are slept between batches. When given, `archive`
+        receives each batch's rows (as column dicts) before they are deleted.
+
+        The cutoff is rounded down to midnight and the hourly and daily
+        rollups before it are deleted as well, so statistics never count rows
+        that are gone; a bucket a concurrent compaction writes for purged rows
+        is removed by the next run.
+        """
+        cutoff_date = day_start(datetime.utcnow() - timedelta(days=days))
+        low, high = db.query(func.min(PriceAuditLog.id), func.max(PriceAuditLog.id)).filter(
             PriceAuditLog.created_at < cutoff_date
-        ).delete()
+        ).one()
+
+        columns = list(PriceAuditLog.__table__.columns)
+        deleted = 0
+        while low is not None and low <= high:
+            in_batch = (
+                PriceAuditLog.id >= low,
+                PriceAuditLog.id < low + batch_size,
+                PriceAuditLog.created_at < cutoff_date
+            )
+            if archive is not None:
+                rows = db.query(*columns).filter(*in_batch).order_by(PriceAuditLog.id).all()
+                if rows:
+                    archive([row._asdict() for row in rows])
+            deleted += db.query(PriceAuditLog).filter(*in_batch).delete(synchronize_session=False)
+            db.commit()
+
+            low += batch_size
+            if pause and low <= high:
+                time.sleep(pause)
+
+        for model in (PriceAuditHourlyRollup, PriceAuditDailyRollup):
+            db.query(model).filter(model.bucket_start < cutoff_date).delete(synchronize_session=False)
         db.commit()
         return deleted
@@ -0,0 +1,235 @@
+"""
+Background writer for price audit rows.
+
+Pricing requests hand their audit rows to a bounded in-memory queue instead
+of opening a write transaction each. A worker thread drains the queue and
+writes the rows with one bulk INSERT per AUDIT_FLUSH_ROWS rows or every
+AUDIT_FLUSH_INTERVAL_MS milliseconds, whichever comes first, and flushes
+what is left on shutdown.
+
+When the queue is full, AUDIT_QUEUE_POLICY decides: "drop_newest" discards
+the incoming rows, "drop_oldest" discards the oldest queued ones, and
+"block" makes the request wait up to AUDIT_ENQUEUE_TIMEOUT seconds for
+space before dropping. Dropped rows are counted in stats().
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.background import BackgroundWorker
+from app.db.database import SessionLocal
+from app.services.audit_service import AuditService
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ASYNC_WRITES = os.getenv("AUDIT_ASYNC_WRITES", "true").lower() == "true"
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_FLUSH_ROWS = int(os.getenv("AUDIT_FLUSH_ROWS", "500"))
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+AUDIT_QUEUE_POLICY = os.getenv("AUDIT_QUEUE_POLICY", "drop_newest").lower()
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "0.05"))
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+_POLL_INTERVAL = 0.1
+
+
+class AuditWriter(BackgroundWorker):
+    """Bounded queue of audit rows drained by a bulk-inserting worker thread"""
+
+    thread_name = "audit-writer"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_queue: int = AUDIT_QUEUE_SIZE,
+        flush_rows: int = AUDIT_FLUSH_ROWS,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_MS / 1000,
+        policy: str = AUDIT_QUEUE_POLICY,
+        enqueue_timeout: float = AUDIT_ENQUEUE_TIMEOUT,
+        enabled: bool = AUDIT_ASYNC_WRITES
+    ):
+        if policy not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown audit queue policy: {policy}")
+        super().__init__(enabled)
+        self.session_factory = session_factory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        # Serialises flushes between the worker and flush()/stop()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def _count(self, name: str, amount: int) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _put(self, row: Dict[str, Any]) -> bool:
+        try:
+            if self.policy == BLOCK:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == DROP_OLDEST:
+            try:
+                self._queue.get_nowait()
+                self._count("dropped", 1)
+                self._queue.put_nowait(row)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        self._count("dropped", 1)
+        return False
+
+    def submit(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Queue rows built with AuditService.build_rows.
+
+        Returns:
+            False when the writer is not running and the caller should write
+            the rows itself; True otherwise, even if the policy dropped some
+        """
+        if not self.running:
+            return False
+        for row in rows:
+            self._put(row)
+        return True
+
+    async def submit_async(self, rows: List[Dict[str, Any]]) -> bool:
+        """submit() without blocking the event loop under the "block" policy"""
+        if self.policy == BLOCK and self.running:
+            return await asyncio.to_thread(self.submit, rows)
+        return self.submit(rows)
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            AuditService.insert_rows(db, rows)
+            self._count("written", len(rows))
+        except Exception:
+            db.rollback()
+            self._count("failed", len(rows))
+            logger.warning("Failed to write %d audit rows", len(rows), exc_info=True)
+        finally:
+            db.close()
+        self._count("flushes", 1)
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far.
+
+        Returns:
+            Number of rows taken from the queue
+        """
+        taken = 0
+        with self._flush_lock:
+            while True:
+                rows = self._drain(self.flush_rows)
+                if not rows:
+                    return taken
+                self._write(rows)
+                taken += len(rows)
+
+    def _run(self) -> None:
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            batch: List[Dict[str, Any]] = []
+            while len(batch) < self.flush_rows and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    # Short waits so stop() is noticed without waiting out the interval
+                    batch.append(self._queue.get(timeout=min(remaining, _POLL_INTERVAL)))
+                except queue.Empty:
+                    continue
+            if batch:
+                with self._flush_lock:
+                    self._write(batch)
+            if self._stopping.is_set():
+                return
+
+    def stop(self, timeout: float = 10) -> None:
+        """Stop the worker and write the rows still queued"""
+        super().stop(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "running": self.running,
+                "policy": self.policy,
+                "queued": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes
+            }
+
+
+audit_writer = AuditWriter()
+
+
+def record_price_calculations(
+    db: Session,
+    records: List[Dict[str, Any]],
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None
+) -> None:
+    """
+    Audit priced lines: queued for the background writer, or written in this
+    session when the writer is not running.
+
+    Args:
+        db: Database session used for the synchronous fallback
+        records: Dicts with product_id, quantity, pricing_result and
+            optionally extra_data
+    """
+    rows = AuditService.build_rows(records, user_id, ip_address, user_agent, request_id)
+    if rows and not audit_writer.submit(rows):
+        AuditService.insert_rows(db, rows)
+
+
+async def record_price_calculations_async(
+    db: AsyncSession,
+    records: List[Dict[str, Any]],
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None
+) -> None:
+    """record_price_calculations through an async session"""
+    rows = AuditService.build_rows(records, user_id, ip_address, user_agent, request_id)
+    if rows and not await audit_writer.submit_async(rows):
+        await AuditService.insert_rows_async(db, rows)
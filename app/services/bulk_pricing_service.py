@@ -0,0 +1,567 @@
+"""
+Bulk Pricing Service for catalog-wide repricing.
+
+Prices every product x a small set of quantities with NumPy over columnar
+arrays in fixed-point integers, reproducing evaluate_price() exactly:
+money is held in micro-units (1e-6 of the currency), percentages and tax
+rates in basis points of a percent (1e-4), exchange rates in 1e-4, and
+every quantize step of the Decimal engine is replayed as an integer
+division with the same rounding mode. Rows whose intermediate values
+cannot be represented exactly in int64 (stacked percentages that do not
+divide evenly) are re-priced at a finer scale with Python-int object
+arrays; anything still not exact (very large amounts, exotic rates) is
+priced with the Decimal engine, so the output always matches
+calculate_price_with_explanation.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.core.currency import EXCHANGE_RATES
+from app.services.engine_service import evaluate_price
+from app.services.promotion_index import CompiledRule, promotion_index
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any, Optional, Sequence
+import numpy as np
+
+UNITS_PER_CENT = 10 ** 4          # micro-units per cent
+RATE_SCALE = 10 ** 4              # percentages and tax rates: 18.00% -> 1800
+FX_SCALE = 10 ** 4                # exchange rates: 0.012 -> 120
+MAX_EXACT_UNITS = 10 ** 14        # keeps every intermediate product below 2**63
+WIDE_UNITS_PER_CENT = 10 ** 12    # 1e-14 of the currency, three stacked percentages deep
+WIDE_MAX_EXACT_UNITS = 10 ** 24   # 1e10 currency units, 28 significant digits after tax
+
+RULE_NONE, RULE_PERCENTAGE, RULE_FLAT, RULE_BOGO = 0, 1, 2, 3
+_RULE_TYPES = {"percentage": RULE_PERCENTAGE, "flat": RULE_FLAT, "bogo": RULE_BOGO}
+
+
+def _scaled_int(value: Decimal, scale: int) -> Optional[int]:
+    """value * scale as an int, or None if that is not exact"""
+    scaled = value * scale
+    if scaled != scaled.to_integral_value():
+        return None
+    return int(scaled)
+
+
+@dataclass
+class ProductColumns:
+    """Columnar product table"""
+    product_ids: np.ndarray        # int64
+    base_cents: np.ndarray         # int64
+    cap_cents: np.ndarray          # int64, 0 where has_cap is False
+    has_cap: np.ndarray            # bool
+    tax_bp: np.ndarray             # int64, tax_rate * 100
+    tax_rate: np.ndarray           # float64, as reported in results
+    tax_inclusive: np.ndarray      # bool
+    currency: np.ndarray           # object (ISO code)
+    fx_rate: np.ndarray            # int64, 0 for unsupported currencies
+    exact: np.ndarray              # bool, False forces the Decimal fallback
+
+
+@dataclass
+class RuleColumns:
+    """
+    Compiled rules in a ragged layout.
+
+    Every distinct rule is stored once in the rule table; its last entry is
+    a RULE_NONE sentinel. A product's own rules are the CSR segment
+    product_rules[product_offsets[i]:product_offsets[i + 1]], and the rules
+    of each category are stored once in the same way, gathered by products
+    through product_category. Segments hold rule table indices in
+    (priority, id) order.
+    """
+    rule_id: np.ndarray            # int64
+    rule_type: np.ndarray          # int8
+    priority: np.ndarray           # int64
+    rate_bp: np.ndarray            # int64, percentage * 100
+    flat_units: np.ndarray         # int64
+    bundle_size: np.ndarray        # int64
+    get_quantity: np.ndarray       # int64
+    min_quantity: np.ndarray       # int64, 0 when unset
+    min_amount: np.ndarray         # float64, NaN when unset
+    stacking: np.ndarray           # bool
+    exact: np.ndarray              # bool per rule, False forces the Decimal fallback
+    product_offsets: np.ndarray    # int64, n_products + 1
+    product_rules: np.ndarray      # int64 rule table indices
+    category_offsets: np.ndarray   # int64, n_categories + 1
+    category_rules: np.ndarray     # int64 rule table indices
+    product_category: np.ndarray   # int64 category index per product
+
+
+def build_product_columns(products: Sequence[Any]) -> ProductColumns:
+    """Columnar table of Product objects or rows with the same pricing columns"""
+    n = len(products)
+    columns = ProductColumns(
+        product_ids=np.zeros(n, dtype=np.int64),
+        base_cents=np.zeros(n, dtype=np.int64),
+        cap_cents=np.zeros(n, dtype=np.int64),
+        has_cap=np.zeros(n, dtype=bool),
+        tax_bp=np.zeros(n, dtype=np.int64),
+        tax_rate=np.zeros(n, dtype=np.float64),
+        tax_inclusive=np.zeros(n, dtype=bool),
+        currency=np.empty(n, dtype=object),
+        fx_rate=np.zeros(n, dtype=np.int64),
+        exact=np.ones(n, dtype=bool)
+    )
+
+    for i, product in enumerate(products):
+        base_cents = _scaled_int(Decimal(str(product.base_price)), 100)
+        tax_rate = Decimal(str(product.tax_rate))
+        tax_bp = _scaled_int(tax_rate, 100)
+        currency = product.currency or "INR"
+        fx_rate = _scaled_int(EXCHANGE_RATES[currency], FX_SCALE) if currency in EXCHANGE_RATES else None
+
+        columns.product_ids[i] = product.id
+        columns.tax_rate[i] = float(tax_rate)
+        columns.tax_inclusive[i] = bool(product.tax_inclusive)
+        columns.currency[i] = currency
+
+        if product.max_discount_cap is not None:
+            cap_cents = _scaled_int(Decimal(str(product.max_discount_cap)), 100)
+            columns.has_cap[i] = True
+            if cap_cents is None:
+                columns.exact[i] = False
+            else:
+                columns.cap_cents[i] = cap_cents
+
+        if base_cents is None or tax_bp is None or not 0 <= tax_bp <= RATE_SCALE or not fx_rate:
+            columns.exact[i] = False
+            continue
+        columns.base_cents[i] = base_cents
+        columns.tax_bp[i] = tax_bp
+        columns.fx_rate[i] = fx_rate
+
+    return columns
+
+
+def _segments(groups: Sequence[Sequence[CompiledRule]], table: Dict[int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """CSR offsets and rule table indices of rule lists, adding new rules to the table"""
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    indices = []
+    for i, rules in enumerate(groups):
+        for rule in rules:
+            indices.append(table.setdefault(rule.id, len(table)))
+        offsets[i + 1] = len(indices)
+    return offsets, np.asarray(indices, dtype=np.int64)
+
+
+def build_rule_columns(
+    product_rules: Sequence[Sequence[CompiledRule]],
+    category_rules: Sequence[Sequence[CompiledRule]] = (),
+    product_category: Optional[Sequence[int]] = None
+) -> RuleColumns:
+    """
+    Args:
+        product_rules: Each product's own rules, in (priority, id) order
+        category_rules: Rules of each category, in (priority, id) order
+        product_category: Index into category_rules per product, -1 for none
+    """
+    table: Dict[int, int] = {}
+    product_offsets, product_indices = _segments(product_rules, table)
+    category_offsets, category_indices = _segments(list(category_rules) + [[]], table)
+
+    rules_by_id = {rule.id: rule for rules in (*product_rules, *category_rules) for rule in rules}
+    n = len(table) + 1
+    columns = RuleColumns(
+        rule_id=np.full(n, -1, dtype=np.int64),
+        rule_type=np.zeros(n, dtype=np.int8),
+        priority=np.zeros(n, dtype=np.int64),
+        rate_bp=np.zeros(n, dtype=np.int64),
+        flat_units=np.zeros(n, dtype=np.int64),
+        bundle_size=np.zeros(n, dtype=np.int64),
+        get_quantity=np.zeros(n, dtype=np.int64),
+        min_quantity=np.zeros(n, dtype=np.int64),
+        min_amount=np.full(n, np.nan, dtype=np.float64),
+        stacking=np.zeros(n, dtype=bool),
+        exact=np.ones(n, dtype=bool),
+        product_offsets=product_offsets,
+        product_rules=product_indices,
+        category_offsets=category_offsets,
+        category_rules=category_indices,
+        # The appended empty category stands in for uncategorised products
+        product_category=np.full(len(product_rules), len(category_rules), dtype=np.int64)
+    )
+    if product_category is not None:
+        assigned = np.asarray(product_category, dtype=np.int64)
+        columns.product_category = np.where(assigned >= 0, assigned, len(category_rules))
+
+    for rule_id, j in table.items():
+        rule = rules_by_id[rule_id]
+        columns.rule_id[j] = rule.id
+        columns.rule_type[j] = _RULE_TYPES.get(rule.discount_type, RULE_NONE)
+        columns.priority[j] = rule.priority
+        columns.stacking[j] = rule.stacking_enabled
+        columns.min_quantity[j] = rule.min_quantity or 0
+        if rule.min_amount:
+            columns.min_amount[j] = rule.min_amount
+
+        if rule.discount_type == "percentage":
+            rate_bp = _scaled_int(rule.discount_decimal, 100)
+            if rate_bp is None or not 0 <= rate_bp <= RATE_SCALE:
+                columns.exact[j] = False
+            else:
+                columns.rate_bp[j] = rate_bp
+        elif rule.discount_type == "flat":
+            flat_units = _scaled_int(rule.discount_decimal, 100 * UNITS_PER_CENT)
+            if flat_units is None or abs(flat_units) > MAX_EXACT_UNITS:
+                columns.exact[j] = False
+            else:
+                columns.flat_units[j] = flat_units
+        elif rule.discount_type == "bogo":
+            columns.bundle_size[j] = rule.bundle_size
+            columns.get_quantity[j] = rule.get_quantity or 0
+
+    return columns
+
+
+def _div_round(num: np.ndarray, den, rounding_strategy: str = "half_up") -> np.ndarray:
+    """num / den rounded to an integer like Decimal.quantize with the given strategy"""
+    sign = np.where(num < 0, -1, 1)
+    magnitude = np.abs(num)
+    quotient = magnitude // den
+    remainder = magnitude % den
+    twice = remainder * 2
+
+    if rounding_strategy == "half_down":
+        bump = twice > den
+    elif rounding_strategy == "up":
+        bump = remainder > 0
+    elif rounding_strategy == "down":
+        bump = np.zeros(len(num), dtype=bool)
+    elif rounding_strategy == "nearest":
+        bump = (twice > den) | ((twice == den) & (quotient % 2 == 1))
+    else:
+        bump = twice >= den
+
+    return sign * (quotient + bump.astype(np.int64))
+
+
+def _convert_units(
+    units: np.ndarray,
+    from_currency: np.ndarray,
+    from_rate: np.ndarray,
+    to_currency: str,
+    to_rate: int,
+    units_per_cent: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Replay convert_currency() on fixed-point amounts.
+
+    Returns:
+        Converted amounts in cents, and a mask of exact half-cent ties
+        between two non-INR currencies. The Decimal engine rounds those
+        through an INR intermediate and may land on either side of the tie.
+    """
+    if to_currency == "INR":
+        num = units * FX_SCALE
+        den = from_rate * units_per_cent
+    else:
+        num = units * to_rate
+        den = np.where(from_currency == "INR", FX_SCALE, from_rate) * units_per_cent
+    den = np.where(den > 0, den, 1)
+
+    if to_currency == "INR":
+        tie = np.zeros(len(units), dtype=bool)
+    else:
+        tie = (from_currency != "INR") & ((np.abs(num) % den) * 2 == den)
+    return _div_round(num, den), tie
+
+
+def _price_rows(
+    products: ProductColumns,
+    rules: RuleColumns,
+    row_product: np.ndarray,
+    q: np.ndarray,
+    target_currency: Optional[str],
+    include_tax: Optional[bool],
+    rounding_strategy: str,
+    units_per_cent: int,
+    max_units: int,
+    wide: bool
+) -> Dict[str, np.ndarray]:
+    def _money(values: np.ndarray) -> np.ndarray:
+        return values.astype(object) if wide else values
+
+    base_cents = products.base_cents[row_product] * q
+    base = _money(base_cents) * units_per_cent
+    exact = products.exact[row_product] & (np.abs(base) <= max_units)
+    base = np.where(exact, base, 0)
+    base_float = base_cents / 100.0
+    unit_price = _money(products.base_cents[row_product]) * units_per_cent
+
+    total = _money(np.zeros(len(q), dtype=np.int64))
+    primary = np.full(len(q), -1, dtype=np.int64)
+
+    # Walk each row's product and category segments merged by (priority, id)
+    sentinel = len(rules.rule_id) - 1
+    product_rules = np.append(rules.product_rules, sentinel)
+    category_rules = np.append(rules.category_rules, sentinel)
+    product_pos = rules.product_offsets[row_product]
+    product_end = rules.product_offsets[row_product + 1]
+    category = rules.product_category[row_product]
+    category_pos = rules.category_offsets[category]
+    category_end = rules.category_offsets[category + 1]
+    steps = int(np.max(product_end - product_pos + category_end - category_pos, initial=0))
+
+    for _ in range(steps):
+        has_product = product_pos < product_end
+        has_category = category_pos < category_end
+        product_rule = np.where(has_product, product_rules[product_pos], sentinel)
+        category_rule = np.where(has_category, category_rules[category_pos], sentinel)
+        product_priority = rules.priority[product_rule]
+        category_priority = rules.priority[category_rule]
+        take_product = has_product & (
+            ~has_category
+            | (product_priority < category_priority)
+            | ((product_priority == category_priority) & (rules.rule_id[product_rule] < rules.rule_id[category_rule]))
+        )
+        rule = np.where(take_product, product_rule, category_rule)
+        product_pos = product_pos + take_product
+        category_pos = category_pos + (has_category & ~take_product)
+
+        exact &= rules.exact[rule]
+        rule_type = rules.rule_type[rule]
+        min_quantity = rules.min_quantity[rule]
+        min_amount = rules.min_amount[rule]
+
+        eligible = (rule_type != RULE_NONE) & ~((min_quantity > 0) & (q < min_quantity))
+        with np.errstate(invalid="ignore"):
+            eligible &= ~(base_float < min_amount)
+
+        stacking = rules.stacking[rule]
+        percentage_of = np.where(stacking, base - total, base) * rules.rate_bp[rule]
+        exact &= ~((rule_type == RULE_PERCENTAGE) & eligible & (percentage_of % RATE_SCALE != 0))
+
+        flat_units = rules.flat_units[rule]
+        flat = _money(flat_units) * (units_per_cent // UNITS_PER_CENT) * q
+        exact &= ~((rule_type == RULE_FLAT) & eligible & (np.abs(flat_units.astype(np.float64) * q) > MAX_EXACT_UNITS))
+
+        bundle_size = rules.bundle_size[rule]
+        free_items = np.where(bundle_size > 0, q // np.maximum(bundle_size, 1), 0) * rules.get_quantity[rule]
+
+        discount = np.select(
+            [rule_type == RULE_PERCENTAGE, rule_type == RULE_FLAT, rule_type == RULE_BOGO],
+            [percentage_of // RATE_SCALE, flat, unit_price * free_items],
+            default=0
+        )
+        discount = np.where(exact & eligible, discount, 0)
+
+        stacked = (discount > 0) & stacking
+        replaced = (discount > 0) & ~stacking & (discount > total)
+        rule_id = rules.rule_id[rule]
+
+        primary = np.where(stacked & (primary == -1), rule_id, primary)
+        primary = np.where(replaced, rule_id, primary)
+        total = np.where(stacked, total + discount, np.where(replaced, discount, total))
+
+    cap = _money(products.cap_cents[row_product] * q) * units_per_cent
+    total = np.where(products.has_cap[row_product] & (total > cap), cap, total)
+    amount = base - total
+
+    tax_bp = products.tax_bp[row_product]
+    if include_tax is None:
+        inclusive = products.tax_inclusive[row_product]
+    else:
+        inclusive = np.full(len(q), include_tax, dtype=bool)
+
+    inclusive_den = _money(RATE_SCALE + tax_bp) * units_per_cent
+    base_amount = np.where(
+        inclusive,
+        _div_round(amount * RATE_SCALE, inclusive_den),
+        _div_round(amount, units_per_cent)
+    )
+    tax_amount = np.where(
+        inclusive,
+        _div_round(amount * tax_bp, inclusive_den),
+        _div_round(amount * tax_bp, RATE_SCALE * units_per_cent)
+    )
+    total_amount = np.where(
+        inclusive,
+        _div_round(amount, units_per_cent),
+        _div_round(amount * (RATE_SCALE + tax_bp), RATE_SCALE * units_per_cent)
+    )
+
+    original = base // units_per_cent
+    discount_amount = _div_round(total, units_per_cent, rounding_strategy)
+    product_currency = products.currency[row_product]
+
+    if target_currency is not None:
+        convert = product_currency != target_currency
+        to_rate = None
+        if target_currency in EXCHANGE_RATES:
+            to_rate = _scaled_int(EXCHANGE_RATES[target_currency], FX_SCALE)
+
+        if to_rate is None:
+            exact &= ~convert
+        else:
+            from_rate = _money(products.fx_rate[row_product])
+            converted = []
+            for units in (base_amount * units_per_cent, tax_amount * units_per_cent,
+                          total_amount * units_per_cent, total, base):
+                cents, tie = _convert_units(
+                    units, product_currency, from_rate, target_currency, to_rate, units_per_cent
+                )
+                exact &= ~(convert & tie)
+                converted.append(cents)
+            base_amount = np.where(convert, converted[0], base_amount)
+            tax_amount = np.where(convert, converted[1], tax_amount)
+            total_amount = np.where(convert, converted[2], total_amount)
+            discount_amount = np.where(convert, converted[3], discount_amount)
+            original = np.where(convert, converted[4], original)
+
+        currency = np.full(len(q), target_currency, dtype=object)
+    else:
+        currency = product_currency
+
+    return {
+        "product_id": products.product_ids[row_product],
+        "quantity": q,
+        "original_price": original.astype(np.int64),
+        "base_price_after_discount": base_amount.astype(np.int64),
+        "tax_amount": tax_amount.astype(np.int64),
+        "final_price": total_amount.astype(np.int64),
+        "discount_amount": discount_amount.astype(np.int64),
+        "applied_promotion_id": primary,
+        "currency": currency,
+        "tax_rate": products.tax_rate[row_product],
+        "tax_inclusive": inclusive,
+        "exact": exact
+    }
+
+
+def price_columns(
+    products: ProductColumns,
+    rules: RuleColumns,
+    quantities: Sequence[int],
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up"
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized pricing kernel over every product x quantity.
+
+    Rows are first priced in int64 micro-units. Rows that are not exact at
+    that scale (typically chains of stacked percentages) are re-priced with
+    Python-int object arrays at WIDE_UNITS_PER_CENT, which stays within the
+    28 significant digits the Decimal engine computes exactly.
+
+    Args:
+        products: Columnar product table
+        rules: Compiled live rules, product segments aligned with products
+        quantities: Quantities to price every product at
+        target_currency: Target currency for conversion (ISO code)
+        include_tax: Override product tax_inclusive setting
+        rounding_strategy: Rounding strategy for prices
+
+    Returns:
+        Arrays of shape (n_products * n_quantities,), product-major: integer
+        cents for every money field, the primary applied rule id (-1 for
+        none) and an `exact` mask; rows where `exact` is False must be priced
+        with the Decimal engine.
+    """
+    qty = np.asarray(quantities, dtype=np.int64)
+    row_product = np.repeat(np.arange(len(products.product_ids)), len(qty))
+    q = np.tile(qty, len(products.product_ids))
+
+    result = _price_rows(
+        products, rules, row_product, q, target_currency, include_tax, rounding_strategy,
+        UNITS_PER_CENT, MAX_EXACT_UNITS, wide=False
+    )
+
+    retry = np.flatnonzero(~result["exact"])
+    if len(retry):
+        wide = _price_rows(
+            products, rules, row_product[retry], q[retry], target_currency, include_tax, rounding_strategy,
+            WIDE_UNITS_PER_CENT, WIDE_MAX_EXACT_UNITS, wide=True
+        )
+        for field, values in wide.items():
+            result[field][retry] = values
+
+    return result
+
+
+def reprice_catalog(
+    db: Session,
+    quantities: Sequence[int],
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up",
+    now: Optional[datetime] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Compute final prices for every product x quantity.
+
+    Args:
+        db: Database session
+        quantities: Quantities to price every product at
+        target_currency: Target currency for conversion (ISO code)
+        include_tax: Override product tax_inclusive setting
+        rounding_strategy: Rounding strategy for prices
+        now: Evaluation time (defaults to current UTC time)
+
+    Returns:
+        Arrays of shape (n_products * n_quantities,), product-major, with the
+        same money fields as calculate_price_with_explanation as float64,
+        plus applied_promotion_id and the number of rows priced by the
+        Decimal fallback under "fallback_rows"
+    """
+    now = now or datetime.utcnow()
+    # Plain rows: only the pricing columns, no ORM identity map
+    products = db.execute(
+        select(
+            Product.id,
+            Product.base_price,
+            Product.max_discount_cap,
+            Product.category,
+            Product.tax_rate,
+            Product.tax_inclusive,
+            Product.currency
+        ).order_by(Product.id.asc())
+    ).all()
+
+    promotion_index.ensure_loaded(db)
+    categories = sorted({product.category for product in products if product.category})
+    category_index = {category: i for i, category in enumerate(categories)}
+
+    result = price_columns(
+        build_product_columns(products),
+        build_rule_columns(
+            [promotion_index.live_rules(product.id, None, now).rules for product in products],
+            [promotion_index.live_category_rules(category, now).rules for category in categories],
+            [category_index.get(product.category, -1) for product in products]
+        ),
+        quantities,
+        target_currency,
+        include_tax,
+        rounding_strategy
+    )
+
+    money_fields = ("original_price", "base_price_after_discount", "tax_amount", "final_price", "discount_amount")
+    output: Dict[str, Any] = {field: result[field] / 100.0 for field in money_fields}
+    for field in ("product_id", "quantity", "applied_promotion_id", "currency", "tax_rate", "tax_inclusive"):
+        output[field] = result[field]
+
+    fallback_rows = np.flatnonzero(~result["exact"])
+    for row in fallback_rows:
+        product = products[row // len(quantities)]
+        live = promotion_index.live_rules(product.id, product.category, now)
+        priced = evaluate_price(
+            product,
+            live.rules,
+            int(result["quantity"][row]),
+            target_currency,
+            include_tax,
+            rounding_strategy,
+            now=now
+        )
+        for field in money_fields:
+            output[field][row] = priced[field]
+        output["currency"][row] = priced["currency"]
+        output["tax_inclusive"][row] = priced["tax_inclusive"]
+        output["applied_promotion_id"][row] = next(
+            (rule.id for rule in live.rules if rule.name == priced["applied_promotion"]), -1
+        )
+
+    output["fallback_rows"] = len(fallback_rows)
+    return output
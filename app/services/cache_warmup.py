@@ -0,0 +1,196 @@
+"""
+Background warm-up of the price cache.
+
+Prices are served from one cached rule plan per product, so warming a
+(product, quantity, currency, tax, rounding) combination means warming its
+product's plan. The hot products are CACHE_WARMUP_PRODUCTS if set, otherwise
+the products priced most often in the audit log over the last
+CACHE_WARMUP_WINDOW_HOURS. They are warmed at startup on a worker thread and
+again, in batches on a small thread pool, after this worker invalidates
+them, so a cold cache after a deploy or a flush does not reach request
+traffic.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+import logging
+import os
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.background import BackgroundWorker
+from app.core.cache import add_generation_hook
+from app.db.database import SessionLocal
+from app.models.audit_log import PriceAuditLog
+from app.services.engine_service import load_rule_plans
+
+logger = logging.getLogger(__name__)
+
+CACHE_WARMUP_ENABLED = os.getenv("CACHE_WARMUP_ENABLED", "true").lower() == "true"
+# Comma-separated product IDs to warm instead of learning them from the audit log
+CACHE_WARMUP_PRODUCTS = os.getenv("CACHE_WARMUP_PRODUCTS", "")
+CACHE_WARMUP_TOP_N = int(os.getenv("CACHE_WARMUP_TOP_N", "200"))
+CACHE_WARMUP_WINDOW_HOURS = float(os.getenv("CACHE_WARMUP_WINDOW_HOURS", "24"))
+CACHE_WARMUP_CONCURRENCY = int(os.getenv("CACHE_WARMUP_CONCURRENCY", "4"))
+CACHE_WARMUP_BATCH_SIZE = int(os.getenv("CACHE_WARMUP_BATCH_SIZE", "50"))
+
+
+def _parse_product_ids(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def most_requested_products(db: Session, limit: int, since: datetime) -> List[int]:
+    """
+    Products priced most often since a point in time.
+
+    Args:
+        db: Database session
+        limit: Maximum number of products
+        since: Start of the window
+
+    Returns:
+        Product IDs, most requested first
+    """
+    rows = (
+        db.query(PriceAuditLog.product_id)
+        .filter(PriceAuditLog.created_at >= since)
+        .group_by(PriceAuditLog.product_id)
+        .order_by(func.count(PriceAuditLog.id).desc())
+        .limit(limit)
+        .all()
+    )
+    return [row.product_id for row in rows]
+
+
+class CacheWarmer(BackgroundWorker):
+    """
+    Precomputes the rule plans of hot products.
+
+    The startup warm-up runs on the worker thread; re-warms after an
+    invalidation go to a bounded thread pool.
+    """
+
+    thread_name = "cache-warmup"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        products: Optional[List[int]] = None,
+        top_n: int = CACHE_WARMUP_TOP_N,
+        window_hours: float = CACHE_WARMUP_WINDOW_HOURS,
+        concurrency: int = CACHE_WARMUP_CONCURRENCY,
+        batch_size: int = CACHE_WARMUP_BATCH_SIZE,
+        enabled: bool = CACHE_WARMUP_ENABLED
+    ):
+        super().__init__(enabled)
+        self.session_factory = session_factory
+        self.products = products
+        self.top_n = top_n
+        self.window_hours = window_hours
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+        self._hot: List[int] = []
+
+    @property
+    def hot_products(self) -> List[int]:
+        return list(self._hot)
+
+    def learn(self) -> List[int]:
+        """Refresh the hot product list from configuration or the audit log"""
+        if self.products is not None:
+            self._hot = list(self.products)
+            return self.hot_products
+
+        db = self.session_factory()
+        try:
+            since = datetime.utcnow() - timedelta(hours=self.window_hours)
+            self._hot = most_requested_products(db, self.top_n, since)
+        finally:
+            db.close()
+        return self.hot_products
+
+    def warm(self, product_ids: List[int]) -> int:
+        """
+        Build and cache the plans of the given products that are not cached.
+
+        Returns:
+            Number of plans built
+        """
+        built = 0
+        for start in range(0, len(product_ids), self.batch_size):
+            if self._stopping.is_set():
+                break
+            db = self.session_factory()
+            try:
+                _, computed_ids = load_rule_plans(db, product_ids[start:start + self.batch_size])
+                built += len(computed_ids)
+            finally:
+                db.close()
+        return built
+
+    def _warm_batch(self, product_ids: List[int]) -> int:
+        try:
+            return self.warm(product_ids)
+        except Exception:
+            logger.warning("Cache warm-up failed", exc_info=True)
+            return 0
+
+    def _submit(self, fn: Callable, *args) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix="cache-warmup"
+                )
+            self._pending = [future for future in self._pending if not future.done()]
+            self._pending.append(self._executor.submit(fn, *args))
+
+    def schedule(self, product_ids: List[int]) -> None:
+        """Warm products in the background, one batch per pool task"""
+        if not self.enabled:
+            return
+        for start in range(0, len(product_ids), self.batch_size):
+            self._submit(self._warm_batch, product_ids[start:start + self.batch_size])
+
+    def _run(self) -> None:
+        """Learn the hot products and warm them, once per start()"""
+        try:
+            self.warm(self.learn())
+        except Exception:
+            logger.warning("Cache warm-up failed", exc_info=True)
+
+    def on_generation_bump(self, name: str) -> None:
+        """Re-warm what a local invalidation made unreachable"""
+        if name.startswith("product:"):
+            self.schedule([int(name.split(":", 1)[1])])
+        else:
+            # A global or category bump; plans still cached are plain lookups
+            self.schedule(self.hot_products)
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until the startup and scheduled warm-ups have finished"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def stop(self, timeout: float = 10) -> None:
+        super().stop(timeout)
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pending = []
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+cache_warmer = CacheWarmer(
+    products=_parse_product_ids(CACHE_WARMUP_PRODUCTS) if CACHE_WARMUP_PRODUCTS else None
+)
+
+add_generation_hook(cache_warmer.on_generation_bump)
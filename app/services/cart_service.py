@@ -0,0 +1,200 @@
+"""
+Cart Service for pricing a whole basket in a single evaluation pass.
+Category promotion thresholds (min_quantity / min_amount) are measured
+across every line of the cart in that category.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.currency import convert_currency
+from app.models.product import Product
+from app.services.engine_service import (
+    evaluate_price,
+    load_products_and_promotions,
+    load_products_and_promotions_async
+)
+from app.services.promotion_index import LiveRules
+from app.services.audit_writer import record_price_calculations, record_price_calculations_async
+from typing import Dict, Any, Optional, List
+from decimal import Decimal
+from datetime import datetime
+
+
+def _sum_field(lines: List[Dict[str, Any]], field: str) -> float:
+    return float(sum((Decimal(str(line[field])) for line in lines), Decimal(0)))
+
+
+def _merge_quantities(items: List[Dict[str, Any]]) -> Dict[int, int]:
+    quantities: Dict[int, int] = {}
+    for item in items:
+        quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item.get("quantity", 1)
+    return quantities
+
+
+def _audit_records(lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "product_id": line["product_id"],
+            "quantity": line["quantity"],
+            "pricing_result": line,
+            "extra_data": {"cart_lines": len(lines)}
+        }
+        for line in lines
+    ]
+
+
+def _price_cart(
+    quantities: Dict[int, int],
+    products: Dict[int, Product],
+    promotions: Dict[int, LiveRules],
+    target_currency: Optional[str],
+    include_tax: Optional[bool],
+    rounding_strategy: str,
+    now: datetime
+) -> Dict[str, Any]:
+    first_product = products[next(iter(quantities))] if quantities else None
+    display_currency = target_currency or (first_product.currency if first_product else None) or "INR"
+
+    # Category totals are in the display currency, so lines in different
+    # currencies add up and compare against thresholds consistently
+    category_quantity: Dict[str, int] = {}
+    category_amount: Dict[str, Decimal] = {}
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        if not product.category:
+            continue
+        line_amount = convert_currency(
+            Decimal(str(product.base_price)) * quantity, product.currency or "INR", display_currency
+        )
+        category_quantity[product.category] = category_quantity.get(product.category, 0) + quantity
+        category_amount[product.category] = category_amount.get(product.category, Decimal(0)) + line_amount
+
+    lines = []
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        live = promotions[product_id]
+        result = evaluate_price(
+            product,
+            live.rules,
+            quantity,
+            display_currency,
+            include_tax,
+            rounding_strategy,
+            now=now,
+            category_quantity=category_quantity.get(product.category),
+            category_amount=category_amount.get(product.category),
+            skipped_expired=live.expired,
+            skipped_not_started=live.not_started
+        )
+        lines.append({"product_id": product_id, "quantity": quantity, **result})
+
+    return {
+        "items": lines,
+        "currency": display_currency,
+        "total_quantity": sum(quantities.values()),
+        "original_price": _sum_field(lines, "original_price"),
+        "discount_amount": _sum_field(lines, "discount_amount"),
+        "base_price_after_discount": _sum_field(lines, "base_price_after_discount"),
+        "tax_amount": _sum_field(lines, "tax_amount"),
+        "final_price": _sum_field(lines, "final_price"),
+        "category_totals": {
+            category: {
+                "quantity": category_quantity[category],
+                "amount": float(category_amount[category])
+            }
+            for category in category_quantity
+        }
+    }
+
+
+def calculate_cart_price(
+    db: Session,
+    items: List[Dict[str, Any]],
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up",
+    enable_audit: bool = True,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Price a cart with one product/promotion load and one evaluation pass.
+
+    Lines for the same product are merged before pricing. Every line is
+    priced in the same display currency: target_currency if given, otherwise
+    the currency of the first product in the cart.
+
+    Args:
+        db: Database session
+        items: Dicts with product_id and quantity
+        target_currency: Target currency for conversion (ISO code)
+        include_tax: Override product tax_inclusive setting
+        rounding_strategy: Rounding strategy for prices
+        enable_audit: Write one audit row per cart line
+
+    Returns:
+        Dictionary with per-line pricing and cart totals, or None if any
+        product does not exist
+    """
+    quantities = _merge_quantities(items)
+
+    now = datetime.utcnow()
+    products, promotions = load_products_and_promotions(db, quantities.keys(), now)
+    if len(products) != len(quantities):
+        return None
+
+    cart = _price_cart(quantities, products, promotions, target_currency, include_tax, rounding_strategy, now)
+
+    if enable_audit and cart["items"]:
+        try:
+            record_price_calculations(
+                db,
+                _audit_records(cart["items"]),
+                user_id=user_id,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                request_id=request_id
+            )
+        except Exception:
+            db.rollback()
+
+    return cart
+
+
+async def calculate_cart_price_async(
+    db: AsyncSession,
+    items: List[Dict[str, Any]],
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up",
+    enable_audit: bool = True,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """calculate_cart_price through an async session"""
+    quantities = _merge_quantities(items)
+
+    now = datetime.utcnow()
+    products, promotions = await load_products_and_promotions_async(db, quantities.keys(), now)
+    if len(products) != len(quantities):
+        return None
+
+    cart = _price_cart(quantities, products, promotions, target_currency, include_tax, rounding_strategy, now)
+
+    if enable_audit and cart["items"]:
+        try:
+            await record_price_calculations_async(
+                db,
+                _audit_records(cart["items"]),
+                user_id=user_id,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                request_id=request_id
+            )
+        except Exception:
+            await db.rollback()
+
+    return cart
@@ -1,58 +1,261 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.product import Product
-from app.models.promotion import Promotion
 from decimal import Decimal
 from datetime import datetime
-from app.core.cache import CacheService
+from app.core.cache import CACHE_NEGATIVE_TTL, CACHE_TTL, AsyncCacheService, CacheService
+from app.core.memory_cache import MemoryCache
 from app.core.currency import convert_currency, calculate_tax, round_price
-from app.services.audit_service import AuditService
-from typing import Optional, Dict, Any, List
+from app.services.audit_writer import record_price_calculations, record_price_calculations_async
+from app.services.promotion_index import CompiledRule, LiveRules, promotion_index
+from typing import Optional, Dict, Any, List, Iterable, NamedTuple, Tuple
+import os
+import uuid
 
-def calculate_price_with_explanation(
-    db: Session,
-    product_id: int,
+# Keeps IN (...) lists well below SQLite's bound-parameter limit
+_IN_CHUNK_SIZE = 500
+
+# Audit deduplication of priced calculations:
+#   "plan" - each distinct calculation (product, quantity, options and detail)
+#            is audited the first time a worker serves it from a rule plan;
+#            the worker remembers the last AUDIT_DEDUP_ENTRIES of them, so a
+#            calculation is audited at least once per plan, and again by
+#            another worker or once its entry was evicted
+#   "off"  - every response is audited
+AUDIT_DEDUP_PLAN = "plan"
+AUDIT_DEDUP_OFF = "off"
+AUDIT_DEDUP = os.getenv("AUDIT_DEDUP", AUDIT_DEDUP_PLAN).lower()
+if AUDIT_DEDUP not in (AUDIT_DEDUP_PLAN, AUDIT_DEDUP_OFF):
+    raise ValueError(f"Unknown AUDIT_DEDUP mode: {AUDIT_DEDUP}")
+AUDIT_DEDUP_ENTRIES = int(os.getenv("AUDIT_DEDUP_ENTRIES", "50000"))
+
+# Calculations this worker has audited under "plan" deduplication; kept apart
+# from the shared cache so a crawler walking quantities cannot evict plans
+_audited = MemoryCache(max_entries=AUDIT_DEDUP_ENTRIES)
+
+# Response detail levels; lower levels skip the explanation strings and trim
+# the response, but every amount is still computed for the audit log
+DETAIL_FULL = "full"
+DETAIL_SUMMARY = "summary"
+DETAIL_FINAL_ONLY = "final_only"
+
+# Cached for CACHE_NEGATIVE_TTL in place of the plan of a product that does
+# not exist, so repeated lookups of unknown IDs skip the database
+MISSING_PLAN = {"missing": True}
+
+
+def _is_missing(plan: Optional[Dict[str, Any]]) -> bool:
+    return plan is None or bool(plan.get("missing"))
+
+
+def _plan_cache_key(product_id: int, generation: Optional[str] = None) -> str:
+    return CacheService._get_key("plan", product_id, generation or CacheService.generation_tag(product_id))
+
+
+def _category_dependencies(categories: Iterable[Optional[str]]) -> Dict[str, int]:
+    """Category generations that cached prices of these categories depend on"""
+    return CacheService.generations(f"category:{category}" for category in categories if category)
+
+
+def _promotion_reason(promo: CompiledRule) -> str:
+    if promo.discount_type == "percentage":
+        return f"Applied {promo.discount_value}% discount"
+    if promo.discount_type == "flat":
+        return f"Applied flat discount of {promo.discount_value} per item"
+    if promo.discount_type == "bogo":
+        return f"Applied BOGO: buy {promo.buy_quantity} get {promo.get_quantity} free"
+    return ""
+
+
+def _chunked(values: List[Any], size: int = _IN_CHUNK_SIZE) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class PlanProduct(NamedTuple):
+    """Pricing attributes of a product, as carried by a rule plan"""
+    id: int
+    base_price: Decimal
+    max_discount_cap: Optional[Decimal]
+    category: Optional[str]
+    tax_rate: Decimal
+    tax_inclusive: bool
+    currency: Optional[str]
+
+
+def build_rule_plan(product: Product, live: LiveRules) -> Dict[str, Any]:
+    """
+    Build the cacheable rule plan of a product.
+
+    The plan holds the product's pricing attributes and its candidate rules
+    with their quantity and amount thresholds, so a price for any quantity
+    is computed from it arithmetically, without the database. Rules that
+    have not started yet are kept: the plan is cached for CACHE_TTL and
+    evaluate_price skips them until their start_date.
+
+    Args:
+        product: Product to plan
+        live: Unexpired candidate rules from the promotion index
+            (include_upcoming=True)
+
+    Returns:
+        JSON-serialisable plan
+    """
+    return {
+        "product": {
+            "id": product.id,
+            "base_price": str(product.base_price),
+            "max_discount_cap": str(product.max_discount_cap) if product.max_discount_cap is not None else None,
+            "category": product.category,
+            "tax_rate": str(product.tax_rate),
+            "tax_inclusive": bool(product.tax_inclusive),
+            "currency": product.currency
+        },
+        # Distinguishes rebuilt plans, so their calculations are audited again
+        "version": uuid.uuid4().hex,
+        "rules": [rule.to_dict() for rule in live.rules],
+        "expired": live.expired,
+        "not_started": live.not_started
+    }
+
+
+def evaluate_plan(
+    plan: Dict[str, Any],
     quantity: int,
     target_currency: Optional[str] = None,
     include_tax: Optional[bool] = None,
     rounding_strategy: str = "half_up",
-    enable_audit: bool = True,
-    user_id: Optional[str] = None,
-    ip_address: Optional[str] = None,
-    user_agent: Optional[str] = None,
-    request_id: Optional[str] = None
-) -> Optional[Dict[str, Any]]:
+    now: Optional[datetime] = None,
+    detail: str = DETAIL_FULL
+) -> Dict[str, Any]:
+    """Price a quantity of a product from its rule plan (see evaluate_price)"""
+    data = plan["product"]
+    product = PlanProduct(
+        id=data["id"],
+        base_price=Decimal(data["base_price"]),
+        max_discount_cap=Decimal(data["max_discount_cap"]) if data["max_discount_cap"] is not None else None,
+        category=data["category"],
+        tax_rate=Decimal(data["tax_rate"]),
+        tax_inclusive=data["tax_inclusive"],
+        currency=data["currency"]
+    )
+    return evaluate_price(
+        product,
+        [CompiledRule.from_dict(rule) for rule in plan["rules"]],
+        quantity,
+        target_currency,
+        include_tax,
+        rounding_strategy,
+        now=now,
+        skipped_expired=plan["expired"],
+        skipped_not_started=plan["not_started"],
+        detail=detail
+    )
+
+
+def load_products_and_promotions(
+    db: Session,
+    product_ids: Iterable[int],
+    now: Optional[datetime] = None,
+    include_upcoming: bool = False
+) -> tuple[Dict[int, Product], Dict[int, LiveRules]]:
     """
-    Calculate price with promotions, caching, currency conversion, and tax handling.
-    Implements rule precedence, promotion stacking, and maximum discount caps.
-    
+    Load products with a fixed number of queries and look up the candidate
+    rules live at `now` in the compiled promotion index.
+
     Args:
         db: Database session
-        product_id: Product ID
+        product_ids: Product IDs to load (duplicates are ignored)
+        now: Evaluation time (defaults to current UTC time)
+        include_upcoming: Also return rules that have not started yet
+
+    Returns:
+        Tuple of (product_id -> Product, product_id -> live rules)
+    """
+    now = now or datetime.utcnow()
+    ids = sorted(set(product_ids))
+
+    products: Dict[int, Product] = {}
+    for chunk in _chunked(ids):
+        for product in db.query(Product).filter(Product.id.in_(chunk)).all():
+            products[product.id] = product
+
+    promotions = {
+        product_id: promotion_index.live_rules_for(db, product_id, product.category, now, include_upcoming)
+        for product_id, product in products.items()
+    }
+
+    return products, promotions
+
+
+async def load_products_and_promotions_async(
+    db: AsyncSession,
+    product_ids: Iterable[int],
+    now: Optional[datetime] = None,
+    include_upcoming: bool = False
+) -> tuple[Dict[int, Product], Dict[int, LiveRules]]:
+    """load_products_and_promotions through an async session"""
+    now = now or datetime.utcnow()
+    ids = sorted(set(product_ids))
+
+    products: Dict[int, Product] = {}
+    for chunk in _chunked(ids):
+        result = await db.execute(select(Product).where(Product.id.in_(chunk)))
+        for product in result.scalars():
+            products[product.id] = product
+
+    await promotion_index.ensure_loaded_async(db)
+    promotions = {
+        product_id: promotion_index.live_rules(product_id, product.category, now, include_upcoming)
+        for product_id, product in products.items()
+    }
+
+    return products, promotions
+
+
+def evaluate_price(
+    product: Product,
+    promos: List[CompiledRule],
+    quantity: int,
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up",
+    now: Optional[datetime] = None,
+    category_quantity: Optional[int] = None,
+    category_amount: Optional[Decimal] = None,
+    skipped_expired: int = 0,
+    skipped_not_started: int = 0,
+    detail: str = DETAIL_FULL
+) -> Dict[str, Any]:
+    """
+    Evaluate promotions, discount caps, tax and currency for an already loaded product.
+    Performs no database or cache access.
+
+    Args:
+        product: Product to price
+        promos: Candidate compiled rules, sorted by priority
         quantity: Quantity to purchase
         target_currency: Target currency for conversion (ISO code)
         include_tax: Override product tax_inclusive setting
         rounding_strategy: Rounding strategy for final price
-    
+        now: Evaluation time (defaults to current UTC time)
+        category_quantity: Quantity across the whole order in the product's
+            category, used for category promotion thresholds
+        category_amount: Base amount across the whole order in the product's
+            category, used for category promotion thresholds
+        skipped_expired: Number of expired rules already filtered out by the
+            promotion index, reported as one explanation line
+        skipped_not_started: Number of not-yet-started rules already filtered
+            out by the promotion index, reported as one explanation line
+        detail: "full" (default) adds the explanation strings; other levels
+            skip them (see response_view for what each level returns)
+
     Returns:
-        Dictionary with pricing details and explanation
+        Dictionary with pricing details, applied promotions and, for the
+        full level, the explanation
     """
-    cache_key = CacheService._get_key(
-        "price",
-        product_id,
-        quantity,
-        target_currency or "default",
-        include_tax if include_tax is not None else "default",
-        rounding_strategy
-    )
-
-    cached_result = CacheService.get(cache_key)
-    if cached_result is not None:
-        cached_result["cached"] = True
-        return cached_result
-    
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        return None
+    explain = detail not in (DETAIL_FINAL_ONLY, DETAIL_SUMMARY)
 
     base_price_per_unit = Decimal(str(product.base_price))
     base_price = base_price_per_unit * quantity
@@ -60,92 +263,91 @@ def calculate_price_with_explanation(
     max_discount_cap = None
     if product.max_discount_cap is not None:
         max_discount_cap = Decimal(str(product.max_discount_cap)) * quantity
-    
-    promos = db.query(Promotion).filter(
-        Promotion.is_active == True
-    ).filter(
-        (Promotion.product_id == product_id) | (Promotion.applies_to_category == True)
-    ).order_by(Promotion.priority.asc()).all()
 
     explanation = []
-    applied_promotions: List[Dict[str, Any]] = []
+    if explain and skipped_expired:
+        explanation.append(f"Rules Skipped: {skipped_expired} promotion(s) expired")
+    if explain and skipped_not_started:
+        explanation.append(f"Rules Skipped: {skipped_not_started} promotion(s) not started yet")
+    applied: List[Tuple[CompiledRule, Decimal]] = []
     total_discount = Decimal(0)
     current_price = base_price
 
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
 
     for promo in promos:
         discount = Decimal(0)
-        reason = ""
 
         if promo.start_date and promo.start_date > now:
-            explanation.append(f"Rule Skipped: {promo.name} - not started yet")
+            if explain:
+                explanation.append(f"Rule Skipped: {promo.name} - not started yet")
             continue
         if promo.end_date and promo.end_date < now:
-            explanation.append(f"Rule Skipped: {promo.name} - expired")
+            if explain:
+                explanation.append(f"Rule Skipped: {promo.name} - expired")
             continue
 
         if promo.applies_to_category:
             if not promo.category_filter or promo.category_filter != product.category:
-                explanation.append(f"Rule Skipped: {promo.name} - category mismatch")
+                if explain:
+                    explanation.append(f"Rule Skipped: {promo.name} - category mismatch")
                 continue
 
-        if promo.min_quantity and quantity < promo.min_quantity:
-            explanation.append(f"Rule Skipped: {promo.name} - minimum quantity {promo.min_quantity} required")
+        threshold_quantity = quantity
+        threshold_amount = base_price
+        if promo.applies_to_category:
+            if category_quantity is not None:
+                threshold_quantity = category_quantity
+            if category_amount is not None:
+                threshold_amount = category_amount
+
+        if promo.min_quantity and threshold_quantity < promo.min_quantity:
+            if explain:
+                explanation.append(f"Rule Skipped: {promo.name} - minimum quantity {promo.min_quantity} required")
             continue
 
-        if promo.min_amount and float(base_price) < promo.min_amount:
-            explanation.append(f"Rule Skipped: {promo.name} - minimum amount {promo.min_amount} required")
+        if promo.min_amount and float(threshold_amount) < promo.min_amount:
+            if explain:
+                explanation.append(f"Rule Skipped: {promo.name} - minimum amount {promo.min_amount} required")
             continue
 
         if promo.discount_type == "percentage":
             if promo.stacking_enabled:
-                discount = (current_price * Decimal(promo.discount_value / 100))
+                discount = current_price * promo.percentage_rate
             else:
-                discount = (base_price * Decimal(promo.discount_value / 100))
-            reason = f"Applied {promo.discount_value}% discount"
+                discount = base_price * promo.percentage_rate
 
         elif promo.discount_type == "flat":
-            discount = Decimal(promo.discount_value) * quantity
-            reason = f"Applied flat discount of {promo.discount_value} per item"
+            discount = promo.discount_decimal * quantity
 
         elif promo.discount_type == "bogo":
-            if promo.buy_quantity and promo.get_quantity:
-                bundle_size = promo.buy_quantity + promo.get_quantity
-                complete_bundles = quantity // bundle_size
+            if promo.bundle_size:
+                complete_bundles = quantity // promo.bundle_size
                 free_items = complete_bundles * promo.get_quantity
                 discount = base_price_per_unit * free_items
-                reason = f"Applied BOGO: buy {promo.buy_quantity} get {promo.get_quantity} free"
 
         if discount > 0:
             if promo.stacking_enabled:
                 total_discount += discount
                 current_price = base_price - total_discount
-                applied_promotions.append({
-                    "name": promo.name,
-                    "discount": float(discount),
-                    "reason": reason,
-                    "priority": promo.priority
-                })
-                explanation.append(f"Rule Applied (Stacked): {promo.name} - {reason} (Priority: {promo.priority})")
+                applied.append((promo, discount))
+                if explain:
+                    explanation.append(f"Rule Applied (Stacked): {promo.name} - {_promotion_reason(promo)} (Priority: {promo.priority})")
             else:
                 if discount > total_discount:
                     total_discount = discount
                     current_price = base_price - total_discount
-                    applied_promotions = [{
-                        "name": promo.name,
-                        "discount": float(discount),
-                        "reason": reason,
-                        "priority": promo.priority
-                    }]
-                    explanation.append(f"Rule Applied: {promo.name} - {reason} (Priority: {promo.priority})")
-                else:
+                    applied = [(promo, discount)]
+                    if explain:
+                        explanation.append(f"Rule Applied: {promo.name} - {_promotion_reason(promo)} (Priority: {promo.priority})")
+                elif explain:
                     explanation.append(f"Rule Skipped: {promo.name} - lower discount than current best (Priority: {promo.priority})")
     
     if max_discount_cap is not None and total_discount > max_discount_cap:
         original_discount = total_discount
         total_discount = max_discount_cap
-        explanation.append(f"Discount capped: Original discount {float(original_discount)} capped to {float(max_discount_cap)}")
+        if explain:
+            explanation.append(f"Discount capped: Original discount {float(original_discount)} capped to {float(max_discount_cap)}")
         current_price = base_price - total_discount
 
     price_after_discount = base_price - total_discount
@@ -173,7 +375,7 @@ def calculate_price_with_explanation(
 
     final_price = round_price(total_amount_converted, rounding_strategy)
 
-    primary_promotion = applied_promotions[0]["name"] if applied_promotions else None
+    primary_promotion = applied[0][0].name if applied else None
 
     result = {
         "original_price": float(round_price(original_converted, rounding_strategy)),
@@ -182,29 +384,412 @@ def calculate_price_with_explanation(
         "final_price": float(final_price),
         "discount_amount": float(round_price(discount_converted, rounding_strategy)),
         "applied_promotion": primary_promotion,
-        "applied_promotions": applied_promotions,
         "currency": display_currency,
         "tax_rate": float(tax_rate),
         "tax_inclusive": tax_inclusive,
-        "explanation": explanation,
         "cached": False
     }
 
-    CacheService.set(cache_key, result, ttl=3600)
+    result["applied_promotions"] = [
+        {
+            "name": promo.name,
+            "discount": float(discount),
+            "reason": _promotion_reason(promo),
+            "priority": promo.priority
+        }
+        for promo, discount in applied
+    ]
+    if explain:
+        result["explanation"] = explanation
+
+    return result
+
 
-    if enable_audit and not cached_result:
+def response_view(result: Dict[str, Any], detail: str) -> Dict[str, Any]:
+    """
+    Trim a pricing result from evaluate_price to a response detail level.
+
+    The untrimmed result is what gets audited, so every level records the
+    same amounts and applied promotions.
+    """
+    if detail == DETAIL_FINAL_ONLY:
+        return {"final_price": result["final_price"], "currency": result["currency"], "cached": result["cached"]}
+    if detail == DETAIL_SUMMARY:
+        return {key: value for key, value in result.items() if key != "applied_promotions"}
+    return result
+
+
+def calculate_price_with_explanation(
+    db: Session,
+    product_id: int,
+    quantity: int,
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up",
+    enable_audit: bool = True,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None,
+    detail: str = DETAIL_FULL
+) -> Optional[Dict[str, Any]]:
+    """
+    Calculate price with promotions, caching, currency conversion, and tax handling.
+    Implements rule precedence, promotion stacking, and maximum discount caps.
+    
+    Args:
+        db: Database session
+        product_id: Product ID
+        quantity: Quantity to purchase
+        target_currency: Target currency for conversion (ISO code)
+        include_tax: Override product tax_inclusive setting
+        rounding_strategy: Rounding strategy for final price
+        detail: Response detail level (full, summary, final_only)
+    
+    The product's rule plan is cached rather than the response, so every
+    quantity, currency, tax, rounding and detail combination is served from
+    one cache entry and only priced arithmetically per request.
+
+    Returns:
+        Dictionary with pricing details and explanation; "cached" tells
+        whether the product's plan, not this result, came from the cache
+    """
+    plan_key = _plan_cache_key(product_id)
+
+    def compute() -> Optional[Dict[str, Any]]:
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            CacheService.set(plan_key, MISSING_PLAN, ttl=CACHE_NEGATIVE_TTL)
+            return None
+
+        depends_on = _category_dependencies([product.category])
+        live = promotion_index.live_rules_for(db, product.id, product.category, include_upcoming=True)
+        plan = build_rule_plan(product, live)
+        CacheService.set(plan_key, plan, depends_on=depends_on)
+        return plan
+
+    # Concurrent misses on the same plan share one computation
+    plan, computed = CacheService.get_or_compute(
+        plan_key, compute, stale_key=_plan_cache_key(product_id, "stale")
+    )
+    if _is_missing(plan):
+        return None
+
+    result = evaluate_plan(plan, quantity, target_currency, include_tax, rounding_strategy, detail=detail)
+    result["cached"] = not computed
+
+    marker = _audit_marker_key(plan, product_id, quantity, detail, target_currency, include_tax, rounding_strategy)
+    if enable_audit and _needs_audit([marker]):
         try:
-            AuditService.log_price_calculation(
-                db=db,
-                product_id=product_id,
-                quantity=quantity,
-                pricing_result=result,
+            record_price_calculations(
+                db,
+                [_audit_record(product_id, quantity, result, detail)],
                 user_id=user_id,
                 ip_address=ip_address,
                 user_agent=user_agent,
                 request_id=request_id
             )
+            _mark_audited([marker])
         except Exception:
-            pass
+            db.rollback()
 
-    return result
+    return response_view(result, detail)
+
+
+async def calculate_price_with_explanation_async(
+    db: AsyncSession,
+    product_id: int,
+    quantity: int,
+    target_currency: Optional[str] = None,
+    include_tax: Optional[bool] = None,
+    rounding_strategy: str = "half_up",
+    enable_audit: bool = True,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None,
+    detail: str = DETAIL_FULL
+) -> Optional[Dict[str, Any]]:
+    """
+    calculate_price_with_explanation for the event loop: the same cached
+    rule plans, read with AsyncCacheService and built through an async session.
+    """
+    plan_key = _plan_cache_key(product_id, await AsyncCacheService.generation_tag(product_id))
+
+    async def compute() -> Optional[Dict[str, Any]]:
+        result = await db.execute(select(Product).where(Product.id == product_id))
+        product = result.scalar_one_or_none()
+        if not product:
+            await AsyncCacheService.set(plan_key, MISSING_PLAN, ttl=CACHE_NEGATIVE_TTL)
+            return None
+
+        depends_on = await AsyncCacheService.generations(
+            f"category:{category}" for category in [product.category] if category
+        )
+        await promotion_index.ensure_loaded_async(db)
+        live = promotion_index.live_rules(product.id, product.category, include_upcoming=True)
+        plan = build_rule_plan(product, live)
+        await AsyncCacheService.set(plan_key, plan, depends_on=depends_on)
+        return plan
+
+    plan, computed = await AsyncCacheService.get_or_compute(
+        plan_key, compute, stale_key=_plan_cache_key(product_id, "stale")
+    )
+    if _is_missing(plan):
+        return None
+
+    result = evaluate_plan(plan, quantity, target_currency, include_tax, rounding_strategy, detail=detail)
+    result["cached"] = not computed
+
+    marker = _audit_marker_key(plan, product_id, quantity, detail, target_currency, include_tax, rounding_strategy)
+    if enable_audit and _needs_audit([marker]):
+        try:
+            await record_price_calculations_async(
+                db,
+                [_audit_record(product_id, quantity, result, detail)],
+                user_id=user_id,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                request_id=request_id
+            )
+            _mark_audited([marker])
+        except Exception:
+            await db.rollback()
+
+    return response_view(result, detail)
+
+
+def _build_plans(
+    products: Dict[int, Product],
+    promotions: Dict[int, LiveRules],
+    plan_keys: Dict[int, str],
+    category_generations: Dict[str, int]
+) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, Dict[str, int]]]:
+    """Rule plans of freshly loaded products and the category generations each depends on"""
+    plans = {}
+    depends_on = {}
+    for product_id, product in products.items():
+        plans[product_id] = build_rule_plan(product, promotions[product_id])
+        if product.category:
+            category_key = f"category:{product.category}"
+            depends_on[plan_keys[product_id]] = {category_key: category_generations[category_key]}
+    return plans, depends_on
+
+
+def _audit_record(product_id: int, quantity: int, result: Dict[str, Any], detail: str) -> Dict[str, Any]:
+    """Audit record of one priced line, as taken by record_price_calculations"""
+    return {
+        "product_id": product_id,
+        "quantity": quantity,
+        "pricing_result": result,
+        "extra_data": None if detail == DETAIL_FULL else {"detail": detail}
+    }
+
+
+def _audit_marker_key(plan: Dict[str, Any], product_id: int, quantity: int, detail: str, *options: Any) -> str:
+    """Key of the marker set once a calculation from this plan has been audited"""
+    return CacheService._get_key(product_id, plan.get("version"), quantity, detail, *options)
+
+
+def _needs_audit(markers: Iterable[str]) -> List[str]:
+    """Markers of the calculations to audit under AUDIT_DEDUP"""
+    markers = list(markers)
+    if AUDIT_DEDUP == AUDIT_DEDUP_OFF:
+        return markers
+    audited = _audited.get_many(markers)
+    return [marker for marker in markers if marker not in audited]
+
+
+def _mark_audited(markers: Iterable[str]) -> None:
+    if AUDIT_DEDUP == AUDIT_DEDUP_PLAN:
+        _audited.set_many(dict.fromkeys(markers, True), ttl=CACHE_TTL)
+
+
+def _price_lines(
+    lines: List[Dict[str, Any]],
+    plans: Dict[int, Dict[str, Any]],
+    computed_ids: set
+) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """
+    Evaluate every distinct line from its plan, returning results and the
+    audit record of each distinct line keyed by its audit marker
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(lines)
+    now = datetime.utcnow()
+    priced: Dict[tuple, Dict[str, Any]] = {}
+    audit_records: Dict[str, Dict[str, Any]] = {}
+
+    for index, line in enumerate(lines):
+        plan = plans.get(line["product_id"])
+        if plan is None:
+            continue
+
+        quantity = line.get("quantity", 1)
+        detail = line.get("detail", DETAIL_FULL)
+        options = (
+            line.get("target_currency"),
+            line.get("include_tax"),
+            line.get("rounding_strategy", "half_up")
+        )
+        identity = (line["product_id"], quantity, detail) + options
+        if identity in priced:
+            results[index] = priced[identity]
+            continue
+
+        result = evaluate_plan(plan, quantity, *options, now=now, detail=detail)
+        result["cached"] = line["product_id"] not in computed_ids
+        marker = _audit_marker_key(plan, line["product_id"], quantity, detail, *options)
+        audit_records[marker] = _audit_record(line["product_id"], quantity, result, detail)
+
+        priced[identity] = results[index] = response_view(result, detail)
+
+    return results, audit_records
+
+
+def load_rule_plans(db: Session, product_ids: Iterable[int]) -> Tuple[Dict[int, Dict[str, Any]], set]:
+    """
+    Rule plans of many products: one cache lookup, then a fixed number of
+    queries to build and cache the missing ones.
+
+    Args:
+        db: Database session
+        product_ids: Product IDs (duplicates are ignored)
+
+    Returns:
+        (product_id -> plan, IDs whose plans were built by this call); unknown
+        products are left out
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    generations = CacheService.generation_tags(product_ids)
+
+    plan_keys = {product_id: _plan_cache_key(product_id, generations[product_id]) for product_id in product_ids}
+    cached_plans = CacheService.get_many(plan_keys.values())
+    plans: Dict[int, Dict[str, Any]] = {
+        product_id: cached_plans[key] for product_id, key in plan_keys.items() if key in cached_plans
+    }
+
+    missing = [product_id for product_id in product_ids if product_id not in plans]
+    new_plans: Dict[int, Dict[str, Any]] = {}
+    if missing:
+        products, promotions = load_products_and_promotions(db, missing, include_upcoming=True)
+        category_generations = _category_dependencies({product.category for product in products.values()})
+        new_plans, depends_on = _build_plans(products, promotions, plan_keys, category_generations)
+        CacheService.set_many(
+            {plan_keys[product_id]: plan for product_id, plan in new_plans.items()},
+            depends_on=depends_on
+        )
+        unknown = {plan_keys[product_id]: MISSING_PLAN for product_id in missing if product_id not in products}
+        CacheService.set_many(unknown, ttl=CACHE_NEGATIVE_TTL)
+        plans.update(new_plans)
+
+    return {product_id: plan for product_id, plan in plans.items() if not _is_missing(plan)}, set(new_plans)
+
+
+async def load_rule_plans_async(db: AsyncSession, product_ids: Iterable[int]) -> Tuple[Dict[int, Dict[str, Any]], set]:
+    """load_rule_plans for the event loop"""
+    product_ids = list(dict.fromkeys(product_ids))
+    generations = await AsyncCacheService.generation_tags(product_ids)
+
+    plan_keys = {product_id: _plan_cache_key(product_id, generations[product_id]) for product_id in product_ids}
+    cached_plans = await AsyncCacheService.get_many(plan_keys.values())
+    plans: Dict[int, Dict[str, Any]] = {
+        product_id: cached_plans[key] for product_id, key in plan_keys.items() if key in cached_plans
+    }
+
+    missing = [product_id for product_id in product_ids if product_id not in plans]
+    new_plans: Dict[int, Dict[str, Any]] = {}
+    if missing:
+        products, promotions = await load_products_and_promotions_async(db, missing, include_upcoming=True)
+        category_generations = await AsyncCacheService.generations(
+            f"category:{product.category}" for product in products.values() if product.category
+        )
+        new_plans, depends_on = _build_plans(products, promotions, plan_keys, category_generations)
+        await AsyncCacheService.set_many(
+            {plan_keys[product_id]: plan for product_id, plan in new_plans.items()},
+            depends_on=depends_on
+        )
+        unknown = {plan_keys[product_id]: MISSING_PLAN for product_id in missing if product_id not in products}
+        await AsyncCacheService.set_many(unknown, ttl=CACHE_NEGATIVE_TTL)
+        plans.update(new_plans)
+
+    return {product_id: plan for product_id, plan in plans.items() if not _is_missing(plan)}, set(new_plans)
+
+
+def calculate_prices_batch(
+    db: Session,
+    lines: List[Dict[str, Any]],
+    enable_audit: bool = True,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Price many (product, quantity) lines in one call.
+
+    Rule plans missing from the cache are built with a fixed number of
+    queries, every distinct line is evaluated from its product's plan and the
+    audit rows are written with a single bulk insert.
+
+    Args:
+        db: Database session
+        lines: Dicts with product_id, quantity and optional target_currency,
+            include_tax, rounding_strategy and detail
+        enable_audit: Write an audit row per distinct line, deduplicated
+            as set by AUDIT_DEDUP
+
+    Returns:
+        One pricing result per line, in input order (None for unknown products)
+    """
+    plans, computed_ids = load_rule_plans(db, (line["product_id"] for line in lines))
+    results, audit_records = _price_lines(lines, plans, computed_ids)
+
+    if enable_audit and audit_records:
+        pending = {marker: audit_records[marker] for marker in _needs_audit(audit_records)}
+        if pending:
+            try:
+                record_price_calculations(
+                    db,
+                    list(pending.values()),
+                    user_id=user_id,
+                    ip_address=ip_address,
+                    user_agent=user_agent,
+                    request_id=request_id
+                )
+                _mark_audited(pending)
+            except Exception:
+                db.rollback()
+
+    return results
+
+
+async def calculate_prices_batch_async(
+    db: AsyncSession,
+    lines: List[Dict[str, Any]],
+    enable_audit: bool = True,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """calculate_prices_batch for the event loop (see calculate_price_with_explanation_async)"""
+    plans, computed_ids = await load_rule_plans_async(db, (line["product_id"] for line in lines))
+    results, audit_records = _price_lines(lines, plans, computed_ids)
+
+    if enable_audit and audit_records:
+        pending = {marker: audit_records[marker] for marker in _needs_audit(audit_records)}
+        if pending:
+            try:
+                await record_price_calculations_async(
+                    db,
+                    list(pending.values()),
+                    user_id=user_id,
+                    ip_address=ip_address,
+                    user_agent=user_agent,
+                    request_id=request_id
+                )
+                _mark_audited(pending)
+            except Exception:
+                await db.rollback()
+
+    return results
@@ -8,6 +8,8 @@ def create_product(db: Session, data: ProductCreate):
     db.add(product)
     db.commit()
     db.refresh(product)
+    # Drops any negative entry cached while the ID did not exist
+    CacheService.invalidate_product(product.id)
     return product
 
 def update_product(db: Session, product_id: int, data: ProductUpdate):
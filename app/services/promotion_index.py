@@ -0,0 +1,427 @@
+"""
+Process-local compiled index of active promotions.
+
+Rules are compiled once (Decimal values, bundle sizes) and bucketed by
+category (category promotions) or by product_id (all others), each bucket
+sorted by (priority, id), so the engine can fetch the candidate rules for
+a product without querying or hydrating Promotion rows. Each bucket also
+keeps sorted start/expiry boundaries and caches the rules live between
+two consecutive boundaries, so expired and not-yet-started rules are
+never walked.
+
+The promotion service keeps the index up to date incrementally; a full
+rebuild happens on first use, when another worker broadcasts a
+promotion change, and after PROMOTION_INDEX_TTL seconds as a backstop.
+Incremental changes bump a version counter; a rebuild whose query
+overlapped one of them is discarded and queried again, so it never
+reinstates rules older than the change.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import add_invalidation_listener
+from app.models.promotion import Promotion
+from dataclasses import dataclass
+from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import bisect
+import heapq
+import os
+import threading
+import time
+
+PROMOTION_INDEX_TTL = float(os.getenv("PROMOTION_INDEX_TTL", "60"))
+# Cache bus event sent when promotions change, so other workers rebuild
+PROMOTIONS_CHANGED = "promotions_changed"
+
+# Rebuilds that keep overlapping promotion writes before installing anyway
+_LOAD_ATTEMPTS = 3
+
+# Smallest datetime step; a rule ending at `end_date` expires one tick later
+_TICK = timedelta(microseconds=1)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    """Immutable, pre-parsed snapshot of a Promotion row"""
+    id: int
+    name: str
+    discount_type: str
+    discount_value: Optional[float]
+    buy_quantity: Optional[int]
+    get_quantity: Optional[int]
+    min_quantity: Optional[int]
+    min_amount: Optional[float]
+    category_filter: Optional[str]
+    applies_to_category: bool
+    priority: int
+    stacking_enabled: bool
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+    product_id: Optional[int]
+    discount_decimal: Decimal
+    percentage_rate: Decimal
+    bundle_size: int
+
+    @property
+    def sort_key(self) -> tuple:
+        return (self.priority, self.id)
+
+    @classmethod
+    def compile(cls, **fields: Any) -> "CompiledRule":
+        """Build a rule from its source fields, deriving the parsed values"""
+        discount_value = fields["discount_value"]
+        discount_decimal = Decimal(str(discount_value)) if discount_value is not None else Decimal(0)
+        bundle_size = 0
+        if fields["discount_type"] == "bogo" and fields["buy_quantity"] and fields["get_quantity"]:
+            bundle_size = fields["buy_quantity"] + fields["get_quantity"]
+
+        return cls(
+            **{
+                **fields,
+                "applies_to_category": bool(fields["applies_to_category"]),
+                "priority": fields["priority"] or 0,
+                "stacking_enabled": bool(fields["stacking_enabled"])
+            },
+            discount_decimal=discount_decimal,
+            percentage_rate=discount_decimal / 100,
+            bundle_size=bundle_size
+        )
+
+    @classmethod
+    def from_promotion(cls, promo: Promotion) -> "CompiledRule":
+        return cls.compile(**{name: getattr(promo, name) for name in _SOURCE_FIELDS})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable source fields, the inverse of from_dict"""
+        data = {name: getattr(self, name) for name in _SOURCE_FIELDS}
+        for name in ("start_date", "end_date"):
+            if data[name] is not None:
+                data[name] = data[name].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompiledRule":
+        fields = dict(data)
+        for name in ("start_date", "end_date"):
+            if fields[name] is not None:
+                fields[name] = datetime.fromisoformat(fields[name])
+        return cls.compile(**fields)
+
+
+# Fields copied from a Promotion row; the remaining ones are derived from them
+_SOURCE_FIELDS = (
+    "id", "name", "discount_type", "discount_value", "buy_quantity", "get_quantity",
+    "min_quantity", "min_amount", "category_filter", "applies_to_category", "priority",
+    "stacking_enabled", "start_date", "end_date", "product_id"
+)
+
+
+class LiveRules(NamedTuple):
+    """Rules live at a point in time plus counts of the ones filtered out"""
+    rules: List[CompiledRule]
+    expired: int
+    not_started: int
+
+
+class RuleBucket:
+    """
+    Rules sorted by (priority, id) with an interval index over their dates.
+
+    A rule is live at `now` when start_date <= now <= end_date. The live set
+    only changes at a start_date or one tick after an end_date, so the
+    snapshot computed for `now` is reused until `now` leaves the window
+    between the surrounding boundaries.
+    """
+    __slots__ = ("rules", "_starts", "_expiries", "_snapshot")
+
+    def __init__(self, rules: List[CompiledRule]):
+        self.rules = rules
+        self._starts = sorted(rule.start_date or datetime.min for rule in rules)
+        self._expiries = sorted(rule.end_date + _TICK if rule.end_date else datetime.max for rule in rules)
+        self._snapshot: Optional[Tuple[datetime, datetime, LiveRules]] = None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def live_at(self, now: datetime) -> LiveRules:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] <= now < snapshot[1]:
+            return snapshot[2]
+
+        started = bisect.bisect_right(self._starts, now)
+        expired = bisect.bisect_right(self._expiries, now)
+
+        boundaries_before = []
+        if started:
+            boundaries_before.append(self._starts[started - 1])
+        if expired:
+            boundaries_before.append(self._expiries[expired - 1])
+        boundaries_after = []
+        if started < len(self._starts):
+            boundaries_after.append(self._starts[started])
+        if expired < len(self._expiries):
+            boundaries_after.append(self._expiries[expired])
+
+        live = LiveRules(
+            rules=[
+                rule for rule in self.rules
+                if (rule.start_date is None or rule.start_date <= now)
+                and (rule.end_date is None or rule.end_date >= now)
+            ],
+            expired=expired,
+            not_started=len(self._starts) - started
+        )
+        self._snapshot = (
+            max(boundaries_before, default=datetime.min),
+            min(boundaries_after, default=datetime.max),
+            live
+        )
+        return live
+
+    def unexpired_at(self, now: datetime) -> LiveRules:
+        """Rules live at `now` or starting later, for callers that outlive `now`"""
+        return LiveRules(
+            rules=[rule for rule in self.rules if rule.end_date is None or rule.end_date >= now],
+            expired=bisect.bisect_right(self._expiries, now),
+            not_started=0
+        )
+
+    def with_rule(self, rule: CompiledRule) -> "RuleBucket":
+        updated = list(self.rules)
+        bisect.insort(updated, rule, key=lambda r: r.sort_key)
+        return RuleBucket(updated)
+
+    def without_rule(self, rule_id: int) -> "RuleBucket":
+        return RuleBucket([r for r in self.rules if r.id != rule_id])
+
+
+_EMPTY_BUCKET = RuleBucket([])
+
+
+def _merge(first: List[CompiledRule], second: List[CompiledRule]) -> List[CompiledRule]:
+    if not second:
+        return first
+    if not first:
+        return second
+
+    merged = []
+    seen = set()
+    for rule in heapq.merge(first, second, key=lambda r: r.sort_key):
+        if rule.id not in seen:
+            seen.add(rule.id)
+            merged.append(rule)
+    return merged
+
+
+class PromotionIndex:
+    """Active promotion rules keyed by product_id and by category"""
+
+    def __init__(self, max_age: float = PROMOTION_INDEX_TTL):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._rules: Dict[int, CompiledRule] = {}
+        self._by_product: Dict[int, RuleBucket] = {}
+        self._by_category: Dict[str, RuleBucket] = {}
+        self._loaded_at: Optional[float] = None
+        # Bumped by every change applied outside a rebuild, so a rebuild whose
+        # query raced one of them does not install an older snapshot over it
+        self._version = 0
+
+    def clear(self) -> None:
+        """Drop all rules; the next lookup rebuilds from the database"""
+        with self._lock:
+            self._version += 1
+            self._rules = {}
+            self._by_product = {}
+            self._by_category = {}
+            self._loaded_at = None
+
+    def _install(self, promos: List[Promotion], version: int, force: bool = False) -> bool:
+        """
+        Install a rebuild queried after the index was at `version`.
+
+        Returns False without installing if a change was applied since then,
+        unless `force`: the snapshot is then installed but left stale, so the
+        next lookup rebuilds again.
+        """
+        rules = [CompiledRule.from_promotion(promo) for promo in promos]
+        rules.sort(key=lambda r: r.sort_key)
+
+        by_product: Dict[int, List[CompiledRule]] = {}
+        by_category: Dict[str, List[CompiledRule]] = {}
+        for rule in rules:
+            if rule.applies_to_category:
+                if rule.category_filter:
+                    by_category.setdefault(rule.category_filter, []).append(rule)
+            elif rule.product_id is not None:
+                by_product.setdefault(rule.product_id, []).append(rule)
+
+        with self._lock:
+            current = self._version == version
+            if not current and not force:
+                return False
+            self._rules = {rule.id: rule for rule in rules}
+            self._by_product = {key: RuleBucket(bucket) for key, bucket in by_product.items()}
+            self._by_category = {key: RuleBucket(bucket) for key, bucket in by_category.items()}
+            self._loaded_at = time.monotonic() if current else None
+            return True
+
+    def load(self, db: Session) -> None:
+        """Rebuild the whole index from the active promotions in the database"""
+        for attempt in range(_LOAD_ATTEMPTS):
+            version = self._version
+            promos = db.query(Promotion).filter(Promotion.is_active == True).all()
+            if self._install(promos, version, force=attempt == _LOAD_ATTEMPTS - 1):
+                return
+
+    async def load_async(self, db: AsyncSession) -> None:
+        """load() through an async session"""
+        for attempt in range(_LOAD_ATTEMPTS):
+            version = self._version
+            result = await db.execute(select(Promotion).where(Promotion.is_active == True))
+            if self._install(list(result.scalars()), version, force=attempt == _LOAD_ATTEMPTS - 1):
+                return
+
+    def _is_stale(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.max_age
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self._is_stale():
+            self.load(db)
+
+    async def ensure_loaded_async(self, db: AsyncSession) -> None:
+        if self._is_stale():
+            await self.load_async(db)
+
+    def _discard(self, rule: CompiledRule) -> None:
+        if rule.product_id is not None and rule.product_id in self._by_product:
+            bucket = self._by_product[rule.product_id].without_rule(rule.id)
+            if bucket:
+                self._by_product[rule.product_id] = bucket
+            else:
+                del self._by_product[rule.product_id]
+        if rule.category_filter and rule.category_filter in self._by_category:
+            bucket = self._by_category[rule.category_filter].without_rule(rule.id)
+            if bucket:
+                self._by_category[rule.category_filter] = bucket
+            else:
+                del self._by_category[rule.category_filter]
+
+    def upsert(self, promo: Promotion) -> None:
+        """Add, replace or (for inactive promotions) drop a single rule"""
+        with self._lock:
+            self._version += 1
+            if self._loaded_at is None:
+                return
+
+            previous = self._rules.pop(promo.id, None)
+            if previous is not None:
+                self._discard(previous)
+
+            if not promo.is_active:
+                return
+
+            rule = CompiledRule.from_promotion(promo)
+            self._rules[rule.id] = rule
+            if rule.applies_to_category:
+                if rule.category_filter:
+                    self._by_category[rule.category_filter] = self._by_category.get(
+                        rule.category_filter, _EMPTY_BUCKET
+                    ).with_rule(rule)
+            elif rule.product_id is not None:
+                self._by_product[rule.product_id] = self._by_product.get(
+                    rule.product_id, _EMPTY_BUCKET
+                ).with_rule(rule)
+
+    def remove(self, promo_id: int) -> None:
+        with self._lock:
+            self._version += 1
+            previous = self._rules.pop(promo_id, None)
+            if previous is not None:
+                self._discard(previous)
+
+    def rules_for(self, db: Session, product_id: int, category: Optional[str]) -> List[CompiledRule]:
+        """
+        Candidate rules for a product, sorted by (priority, id).
+
+        Args:
+            db: Database session, used only when the index must be (re)built
+            product_id: Product ID
+            category: Product category (None for uncategorised products)
+
+        Returns:
+            Product rules and rules of the product's category, merged by priority
+        """
+        self.ensure_loaded(db)
+
+        product_bucket = self._by_product.get(product_id, _EMPTY_BUCKET)
+        category_bucket = self._by_category.get(category, _EMPTY_BUCKET) if category else _EMPTY_BUCKET
+        return _merge(product_bucket.rules, category_bucket.rules)
+
+    def live_rules_for(
+        self,
+        db: Session,
+        product_id: int,
+        category: Optional[str],
+        now: Optional[datetime] = None,
+        include_upcoming: bool = False
+    ) -> LiveRules:
+        """
+        Candidate rules for a product that are live at `now`.
+
+        Args:
+            db: Database session, used only when the index must be (re)built
+            product_id: Product ID
+            category: Product category (None for uncategorised products)
+            now: Evaluation time (defaults to current UTC time)
+            include_upcoming: Also return rules that have not started yet
+                (not counted as not_started), for results cached past `now`
+
+        Returns:
+            Live rules sorted by (priority, id) and the number of expired and
+            not-yet-started rules that were left out
+        """
+        self.ensure_loaded(db)
+        return self.live_rules(product_id, category, now, include_upcoming)
+
+    def live_rules(
+        self,
+        product_id: int,
+        category: Optional[str],
+        now: Optional[datetime] = None,
+        include_upcoming: bool = False
+    ) -> LiveRules:
+        """live_rules_for on an index already loaded with ensure_loaded(_async)"""
+        now = now or datetime.utcnow()
+
+        def rules_of(bucket: RuleBucket) -> LiveRules:
+            return bucket.unexpired_at(now) if include_upcoming else bucket.live_at(now)
+
+        product_live = rules_of(self._by_product.get(product_id, _EMPTY_BUCKET))
+        if not category or category not in self._by_category:
+            return product_live
+
+        category_live = rules_of(self._by_category[category])
+        return LiveRules(
+            rules=_merge(product_live.rules, category_live.rules),
+            expired=product_live.expired + category_live.expired,
+            not_started=product_live.not_started + category_live.not_started
+        )
+
+    def live_category_rules(self, category: str, now: Optional[datetime] = None) -> LiveRules:
+        """Category promotions of `category` live at `now`, without any product's own rules"""
+        return self._by_category.get(category, _EMPTY_BUCKET).live_at(now or datetime.utcnow())
+
+
+promotion_index = PromotionIndex()
+
+
+def _on_peer_message(message: dict) -> None:
+    if message.get("op") == PROMOTIONS_CHANGED:
+        promotion_index.clear()
+
+
+add_invalidation_listener(_on_peer_message)
@@ -1,6 +1,7 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.promotion import Promotion
+from app.services.promotion_index import promotion_index
 
 def update_promotion_status(db: Session):
     now = datetime.now()
@@ -13,3 +14,4 @@ def update_promotion_status(db: Session):
             promo.is_active = False
 
     db.commit()
+    promotion_index.clear()
@@ -4,6 +4,29 @@ from app.models.product import Product
 from app.schemas.promotion import PromotionCreate, PromotionUpdate
 from app.core.cache import CacheService
 from app.services.validation_service import PromotionValidator
+from app.services.promotion_index import PROMOTIONS_CHANGED, promotion_index
+
+
+def _invalidate_prices(*scopes):
+    """
+    Invalidate cached prices affected by promotions with the given scopes.
+
+    Args:
+        scopes: (product_id, applies_to_category, category_filter) tuples
+    """
+    # Peers drop their rule index before the generations move on, so nothing
+    # they compute under the new generations uses the old rules
+    CacheService.notify(PROMOTIONS_CHANGED)
+    for product_id, applies_to_category, category_filter in set(scopes):
+        if applies_to_category and category_filter:
+            CacheService.invalidate_category(category_filter)
+        if product_id:
+            CacheService.invalidate_product(product_id)
+
+
+def _scope(promo: Promotion):
+    return promo.product_id, promo.applies_to_category, promo.category_filter
+
 
 def create_promotion(db: Session, data: PromotionCreate):
     validation_result = PromotionValidator.validate_promotion(db, data)
@@ -20,8 +43,8 @@ def create_promotion(db: Session, data: PromotionCreate):
     db.add(promo)
     db.commit()
     db.refresh(promo)
-    if promo.product_id:
-        CacheService.invalidate_product(promo.product_id)
+    promotion_index.upsert(promo)
+    _invalidate_prices(_scope(promo))
     return promo
 
 def update_promotion(db: Session, promo_id: int, data: PromotionUpdate):
@@ -34,24 +57,24 @@ def update_promotion(db: Session, promo_id: int, data: PromotionUpdate):
     if not validation_result["valid"]:
         raise ValueError("; ".join(validation_result["errors"]))
 
-    product_id = promo.product_id
+    previous_scope = _scope(promo)
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(promo, key, value)
     db.commit()
     db.refresh(promo)
-    if product_id:
-        CacheService.invalidate_product(product_id)
+    promotion_index.upsert(promo)
+    _invalidate_prices(previous_scope, _scope(promo))
     return promo
 
 def delete_promotion(db: Session, promo_id: int):
     promo = db.query(Promotion).filter(Promotion.id == promo_id).first()
     if not promo:
         return False
-    product_id = promo.product_id
+    scope = _scope(promo)
     db.delete(promo)
     db.commit()
-    if product_id:
-        CacheService.invalidate_product(product_id)
+    promotion_index.remove(promo_id)
+    _invalidate_prices(scope)
     return True
 
 def get_all_promotions(db: Session):
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from app.models.product import Product
 from app.models.promotion import Promotion
 from app.schemas.promotion import PromotionCreate
-from app.services.engine_service import calculate_price_with_explanation
+from app.services.engine_service import calculate_price_with_explanation, calculate_prices_batch
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
 from datetime import datetime
@@ -40,7 +40,7 @@ def simulate_promotion(
 
     # Get current price without the test promotion
     current_result = calculate_price_with_explanation(
-        db, product_id, quantity, target_currency, include_tax
+        db, product_id, quantity, target_currency, include_tax, enable_audit=False
     )
 
     # Create temporary promotion object (not saved to DB)
@@ -70,8 +70,9 @@ def simulate_promotion(
     db.flush()  # Make it available in session without committing
 
     # Get new price with test promotion
+    # Not audited: the audit commit would persist the flushed test promotion
     simulated_result = calculate_price_with_explanation(
-        db, product_id, quantity, target_currency, include_tax
+        db, product_id, quantity, target_currency, include_tax, enable_audit=False
     )
 
     # Rollback to remove the temporary promotion
@@ -186,16 +187,22 @@ def compare_scenarios(
     if not product:
         return None
 
+    # One plan lookup and one bulk audit insert for all scenarios
+    price_results = calculate_prices_batch(db, [
+        {
+            "product_id": product_id,
+            "quantity": scenario.get("quantity", 1),
+            "target_currency": scenario.get("currency"),
+            "include_tax": scenario.get("include_tax")
+        }
+        for scenario in scenarios
+    ])
+
     results = []
 
-    for idx, scenario in enumerate(scenarios):
+    for idx, (scenario, price_result) in enumerate(zip(scenarios, price_results)):
         quantity = scenario.get("quantity", 1)
         currency = scenario.get("currency")
-        include_tax = scenario.get("include_tax")
-
-        price_result = calculate_price_with_explanation(
-            db, product_id, quantity, currency, include_tax
-        )
 
         results.append({
             "scenario_number": idx + 1,
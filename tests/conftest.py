@@ -1,23 +1,62 @@
+import os
+import shutil
+import tempfile
+
+# Databases of the test run live in a temporary directory removed at the end.
+# Importing app.main creates the tables of the application database, so its
+# URL is pointed there too before anything from the app is imported.
+DATABASE_DIR = tempfile.mkdtemp(prefix="promotions-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(DATABASE_DIR, "app.db")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
-from app.db.database import Base, get_db
+from app.db.database import Base, engine as app_engine, get_async_db, get_db, to_async_url
 from app.main import app
+from app.services.audit_retention import audit_retention
+from app.services.audit_rollup import audit_compactor
+from app.services.audit_writer import audit_writer
+from app.services.cache_warmup import cache_warmer
 from decimal import Decimal
 
 # Create test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_promotions.db"
+SQLALCHEMY_DATABASE_URL = "sqlite:///" + os.path.join(DATABASE_DIR, "test_promotions.db")
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The warmer reads the application database, not the test one; tests that
+# exercise it use their own CacheWarmer
+cache_warmer.enabled = False
+# Likewise the audit writer; with it stopped, audit rows are written in the request session
+audit_writer.enabled = False
+audit_compactor.enabled = False
+audit_retention.enabled = False
+# Same database for the async endpoints; no pooling, as each TestClient runs its own event loop
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_dir():
+    """Remove the test databases after the run"""
+    yield DATABASE_DIR
+    engine.dispose()
+    app_engine.dispose()
+    shutil.rmtree(DATABASE_DIR, ignore_errors=True)
+
 
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database for each test"""
     from app.core.cache import CacheService
-    # Clear cache before each test
+    from app.services.promotion_index import promotion_index
+    # Clear cache and compiled promotion rules before each test
     CacheService.clear_all()
+    promotion_index.clear()
 
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
@@ -28,6 +67,43 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
         # Clear cache after each test
         CacheService.clear_all()
+        promotion_index.clear()
+
+
+@pytest.fixture
+def session_factory(db_session):
+    """Session factory on the test database, for code that opens its own sessions"""
+    return sessionmaker(bind=db_session.get_bind(), autoflush=False)
+
+
+@pytest.fixture
+def audit_rows(db_session):
+    """
+    Factory of price audit rows.
+
+    audit_rows(created_at=..., records=..., count=..., insert=True, **build_kwargs)
+    builds one row per record, by default `count` (or one per created_at)
+    rows for product 1 with quantities 1, 2, ... and a final price of 10.
+    created_at backdates the rows in order; build_kwargs go to
+    AuditService.build_rows. The rows are inserted unless insert=False, and
+    returned either way.
+    """
+    from app.services.audit_service import AuditService
+
+    def make(created_at=(), records=None, count=None, insert=True, **build_kwargs):
+        if records is None:
+            records = [
+                {"product_id": 1, "quantity": quantity, "pricing_result": {"final_price": 10.0}}
+                for quantity in range(1, (count or len(created_at)) + 1)
+            ]
+        rows = AuditService.build_rows(records, **build_kwargs)
+        for row, stamp in zip(rows, created_at):
+            row["created_at"] = stamp
+        if insert:
+            AuditService.insert_rows(db_session, rows)
+        return rows
+
+    return make
 
 
 @pytest.fixture(scope="function")
@@ -39,7 +115,12 @@ def client(db_session):
         finally:
             pass
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
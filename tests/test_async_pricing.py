@@ -0,0 +1,185 @@
+"""
+Tests for the Async Pricing Path
+Test the asyncio cache service, coroutine coalescing and that the async
+endpoints price exactly like the synchronous services.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import AsyncCacheService, CacheService
+from app.core.single_flight import AsyncSingleFlight
+from app.db.database import to_async_url
+from app.services.cart_service import calculate_cart_price
+from app.services.engine_service import calculate_price_with_explanation, calculate_prices_batch
+
+
+class TestAsyncSingleFlight:
+    """Test coalescing of concurrent coroutines"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_run_once(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        results = await asyncio.gather(*(flights.do("key", slow) for _ in range(5)))
+
+        assert len(calls) == 1
+        assert [value for value, _ in results] == ["value"] * 5
+        assert sum(1 for _, leader in results if leader) == 1
+        assert not flights.in_flight("key")
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared(self):
+        flights = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flights.do("key", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+
+class TestAsyncCacheService:
+    """Test the asyncio cache API against the shared tiers"""
+
+    @pytest.mark.asyncio
+    async def test_shares_entries_with_sync_service(self):
+        await AsyncCacheService.set("async:key", {"value": 1})
+        assert CacheService.get("async:key") == {"value": 1}
+
+        CacheService.set("sync:key", [1, 2])
+        assert await AsyncCacheService.get_many(["sync:key", "async:key", "missing"]) == {
+            "sync:key": (1, 2),
+            "async:key": {"value": 1}
+        }
+
+    @pytest.mark.asyncio
+    async def test_depends_on_generation(self):
+        depends_on = await AsyncCacheService.generations(["category:async"])
+        await AsyncCacheService.set("async:dependent", "value", depends_on=depends_on)
+        assert await AsyncCacheService.get("async:dependent") == "value"
+
+        CacheService.invalidate_category("async")
+        assert await AsyncCacheService.get("async:dependent") is None
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_coalesces(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            await AsyncCacheService.set("async:computed", "fresh")
+            return "fresh"
+
+        results = await asyncio.gather(
+            *(AsyncCacheService.get_or_compute("async:computed", compute) for _ in range(5))
+        )
+
+        assert len(calls) == 1
+        assert [value for value, _ in results] == ["fresh"] * 5
+        assert sum(1 for _, computed in results if computed) == 1
+
+
+class TestAsyncDatabaseUrl:
+    """Test deriving the async driver URL"""
+
+    def test_to_async_url(self):
+        assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+        assert to_async_url("postgresql://u:p@db/prices") == "postgresql+asyncpg://u:p@db/prices"
+        assert to_async_url("postgresql+psycopg://u:p@db/prices") == "postgresql+psycopg://u:p@db/prices"
+
+    def test_missing_driver_fails_with_clear_error(self, monkeypatch):
+        import builtins
+        from app.db.database import check_async_driver
+
+        check_async_driver("sqlite+aiosqlite:///./test.db")
+
+        real_import = builtins.__import__
+
+        def without_asyncpg(name, *args, **kwargs):
+            if name == "asyncpg":
+                raise ImportError("No module named 'asyncpg'", name="asyncpg")
+            return real_import(name, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, "__import__", without_asyncpg)
+        with pytest.raises(RuntimeError, match="asyncpg"):
+            check_async_driver("postgresql+asyncpg://u:p@db/prices")
+
+
+class TestAsyncEndpoints:
+    """Test that the async endpoints match the synchronous services"""
+
+    def _create_catalog(self, client: TestClient):
+        laptop = client.post("/products/", json={
+            "sku": "ASYNC-001",
+            "title": "Laptop",
+            "base_price": 1000.0,
+            "category": "Electronics",
+            "stock": 10,
+            "tax_rate": 18.0
+        }).json()
+        mouse = client.post("/products/", json={
+            "sku": "ASYNC-002",
+            "title": "Mouse",
+            "base_price": 50.0,
+            "category": "Electronics",
+            "stock": 10,
+            "tax_rate": 18.0
+        }).json()
+        client.post("/promotions/", json={
+            "name": "Electronics 5+",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "min_quantity": 5,
+            "applies_to_category": True,
+            "category_filter": "Electronics",
+            "start_date": (datetime.utcnow() - timedelta(hours=1)).isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True
+        })
+        return laptop["id"], mouse["id"]
+
+    def test_compute_matches_sync_service(self, client: TestClient, db_session):
+        laptop_id, _ = self._create_catalog(client)
+
+        response = client.post("/engine/compute", json={"product_id": laptop_id, "quantity": 5})
+        assert response.status_code == 200
+        expected = calculate_price_with_explanation(db_session, laptop_id, 5, enable_audit=False)
+
+        data = response.json()
+        assert data["cached"] is False
+        assert expected["cached"] is True
+        for field in ("final_price", "discount_amount", "applied_promotions", "explanation"):
+            assert data[field] == expected[field]
+
+    def test_batch_and_cart_match_sync_services(self, client: TestClient, db_session):
+        laptop_id, mouse_id = self._create_catalog(client)
+        lines = [
+            {"product_id": laptop_id, "quantity": 2},
+            {"product_id": mouse_id, "quantity": 6, "target_currency": "USD"}
+        ]
+
+        batch = client.post("/engine/compute/batch", json={"lines": lines}).json()
+        expected = calculate_prices_batch(db_session, lines, enable_audit=False)
+        assert [item["final_price"] for item in batch["results"]] == [line["final_price"] for line in expected]
+
+        cart = client.post("/engine/cart", json={"items": lines}).json()
+        expected_cart = calculate_cart_price(db_session, lines, enable_audit=False)
+        assert cart["final_price"] == expected_cart["final_price"]
+
+    def test_audit_rows_written(self, client: TestClient):
+        laptop_id, _ = self._create_catalog(client)
+        client.post("/engine/compute", json={"product_id": laptop_id, "quantity": 1})
+
+        logs = client.get(f"/audit/logs?product_id={laptop_id}").json()
+        assert len(logs) == 1
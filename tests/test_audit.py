@@ -99,6 +99,37 @@ class TestAuditLogging:
         assert all(log["product_id"] == product1_id for log in logs)
         assert len([log for log in logs if log["product_id"] == product1_id]) >= 2
 
+    def test_repeated_calculation_audited_once(self, client: TestClient, monkeypatch):
+        product_id = client.post("/products/", json={
+            "sku": "AUDIT-REPEAT",
+            "title": "Repeat Test",
+            "base_price": 500.0,
+            "stock": 10
+        }).json()["id"]
+
+        for _ in range(3):
+            client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+        assert len(client.get("/audit/logs", params={"product_id": product_id}).json()) == 1
+
+        monkeypatch.setattr("app.services.engine_service.AUDIT_DEDUP", "off")
+        client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+        assert len(client.get("/audit/logs", params={"product_id": product_id}).json()) == 2
+
+    def test_new_calculation_from_cached_plan_is_audited(self, client: TestClient):
+        product_id = client.post("/products/", json={
+            "sku": "AUDIT-PLAN",
+            "title": "Plan Test",
+            "base_price": 500.0,
+            "stock": 10
+        }).json()["id"]
+        client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+
+        # The plan is cached, so a quantity never priced before reports cached
+        response = client.post("/engine/compute", json={"product_id": product_id, "quantity": 2})
+        assert response.json()["cached"] is True
+        logs = client.get("/audit/logs", params={"product_id": product_id}).json()
+        assert sorted(log["quantity"] for log in logs) == [1, 2]
+
     def test_audit_log_contains_metadata(self, client: TestClient):
         product = client.post("/products/", json={
             "sku": "AUDIT-META",
@@ -212,6 +243,79 @@ class TestAuditStatistics:
 
         assert stats["unique_products"] >= 1
 
+    def test_statistics_totals_are_exact(self, client: TestClient):
+        product = client.post("/products/", json={
+            "sku": "STATS-EXACT",
+            "title": "Stats Exact Test",
+            "base_price": 100.0,
+            "stock": 50
+        })
+        product_id = product.json()["id"]
+
+        prices = [
+            client.post("/engine/compute", json={"product_id": product_id, "quantity": quantity}).json()
+            for quantity in (1, 3)
+        ]
+
+        stats = client.get("/audit/statistics", params={"product_id": product_id}).json()
+        assert stats["total_calculations"] == 2
+        assert stats["total_revenue"] == pytest.approx(sum(price["final_price"] for price in prices))
+        assert stats["unique_products"] == 1
+        assert "groups" not in stats
+
+    def test_statistics_grouped_by_product(self, client: TestClient):
+        product_ids = [
+            client.post("/products/", json={
+                "sku": f"STATS-GROUP-{index}",
+                "title": f"Stats Group {index}",
+                "base_price": 100.0 * (index + 1),
+                "stock": 50
+            }).json()["id"]
+            for index in range(2)
+        ]
+        for product_id, requests in zip(product_ids, (1, 2)):
+            # Distinct quantities: a repeated calculation is audited once per plan
+            for quantity in range(1, requests + 1):
+                client.post("/engine/compute", json={"product_id": product_id, "quantity": quantity})
+
+        stats = client.get("/audit/statistics", params={"group_by": "product"}).json()
+        groups = {group["key"]: group for group in stats["groups"]}
+        assert stats["group_by"] == "product"
+        assert groups[product_ids[0]]["total_calculations"] == 1
+        assert groups[product_ids[1]]["total_calculations"] == 2
+        assert groups[product_ids[1]]["unique_products"] == 1
+        assert sum(group["total_calculations"] for group in stats["groups"]) == stats["total_calculations"]
+
+    def test_statistics_grouped_by_currency_and_day(self, client: TestClient):
+        product = client.post("/products/", json={
+            "sku": "STATS-CURRENCY",
+            "title": "Stats Currency Test",
+            "base_price": 1000.0,
+            "stock": 50
+        })
+        product_id = product.json()["id"]
+        client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+        client.post("/engine/compute", json={"product_id": product_id, "quantity": 1, "target_currency": "USD"})
+
+        by_currency = client.get("/audit/statistics", params={
+            "product_id": product_id, "group_by": "currency"
+        }).json()
+        assert {group["key"] for group in by_currency["groups"]} == {"INR", "USD"}
+
+        by_day = client.get("/audit/statistics", params={
+            "product_id": product_id, "group_by": "day"
+        }).json()
+        assert by_day["groups"] == [{
+            "key": datetime.utcnow().date().isoformat(),
+            **{key: by_day[key] for key in (
+                "total_calculations", "total_revenue", "total_discount", "avg_discount", "unique_products"
+            )}
+        }]
+
+    def test_statistics_rejects_unknown_group(self, client: TestClient):
+        response = client.get("/audit/statistics", params={"group_by": "user"})
+        assert response.status_code == 422
+
 
 class TestAuditCleanup:
 
@@ -230,7 +334,7 @@ class TestAuditCleanup:
             "quantity": 1
         })
 
-        response = client.delete("/audit/cleanup", params={"days": 1})
+        response = client.delete("/audit/cleanup", params={"days": 1, "background": False})
         assert response.status_code == 200
         data = response.json()
         assert "deleted_count" in data
@@ -293,6 +397,40 @@ class TestAuditPagination:
         if len(first_page) > 0 and len(second_page) > 0:
             assert first_page[0]["id"] != second_page[0]["id"]
 
+    def test_cursor_pagination(self, client: TestClient):
+        product = client.post("/products/", json={
+            "sku": "PAGE-003",
+            "title": "Pagination Cursor Test",
+            "base_price": 500.0,
+            "stock": 50
+        })
+        product_id = product.json()["id"]
+
+        # One batch: every row shares created_at, so the id tie-break matters
+        client.post("/engine/compute/batch", json={"lines": [
+            {"product_id": product_id, "quantity": quantity} for quantity in range(1, 6)
+        ]})
+
+        seen = []
+        params = {"product_id": product_id, "limit": 2}
+        while True:
+            response = client.get("/audit/logs", params=params)
+            assert response.status_code == 200
+            seen.extend(log["id"] for log in response.json())
+            if "x-next-cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["x-next-cursor"]
+
+        offset_ids = [log["id"] for log in client.get("/audit/logs", params={
+            "product_id": product_id, "limit": 10
+        }).json()]
+        assert len(seen) == 5
+        assert seen == offset_ids
+
+    def test_invalid_cursor(self, client: TestClient):
+        response = client.get("/audit/logs", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
 
 class TestAuditDateFiltering:
 
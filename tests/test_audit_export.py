@@ -0,0 +1,127 @@
+"""
+Tests for Audit Export
+Test streaming NDJSON/CSV export and the daily Parquet/Arrow partitions.
+"""
+from datetime import date, datetime, timedelta
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import audit_export
+from app.services.audit_export import EXPORT_COLUMNS, encode_csv, export_partitions, iter_chunks
+
+BASE = datetime(2024, 3, 1, 12)
+
+
+@pytest.fixture
+def export_rows(audit_rows):
+    """Insert `count` summary-level rows with a promotion, six hours apart from BASE"""
+    def make(count: int):
+        records = [
+            {
+                "product_id": 1,
+                "quantity": index + 1,
+                "pricing_result": {
+                    "final_price": 10.0 * (index + 1),
+                    "currency": "INR",
+                    "applied_promotions": [{"name": "Spring", "discount": 1.5}]
+                },
+                "extra_data": {"detail": "summary"}
+            }
+            for index in range(count)
+        ]
+        created_at = [BASE + timedelta(hours=6) * index for index in range(count)]
+        return audit_rows(created_at, records, user_id="exporter", request_id="export-test")
+
+    return make
+
+
+class TestExportChunks:
+    """Test chunked reading of the audit log"""
+
+    def test_chunks_cover_all_rows_in_id_order(self, db_session, export_rows):
+        export_rows(7)
+        chunks = list(iter_chunks(db_session, chunk_size=3))
+
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        ids = [row["id"] for chunk in chunks for row in chunk]
+        assert ids == sorted(ids)
+        assert set(chunks[0][0]) == set(EXPORT_COLUMNS)
+
+    def test_filters(self, db_session, export_rows):
+        export_rows(8)
+        rows = [
+            row for chunk in iter_chunks(db_session, start_date=BASE + timedelta(days=1), chunk_size=100)
+            for row in chunk
+        ]
+        assert [row["quantity"] for row in rows] == [5, 6, 7, 8]
+        assert list(iter_chunks(db_session, user_id="nobody")) == []
+
+    def test_csv_encodes_json_columns(self, db_session, export_rows):
+        export_rows(2)
+        body = "".join(encode_csv(iter_chunks(db_session, chunk_size=1)))
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert len(rows) == 2
+        assert json.loads(rows[0]["applied_promotions"]) == [{"name": "Spring", "discount": 1.5}]
+        assert rows[1]["created_at"] == (BASE + timedelta(hours=6)).isoformat()
+
+
+class TestExportEndpoint:
+    """Test GET /audit/export"""
+
+    def test_ndjson(self, client: TestClient, export_rows):
+        export_rows(3)
+        response = client.get("/audit/export", params={"start_date": (BASE + timedelta(hours=1)).isoformat()})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["quantity"] for line in lines] == [2, 3]
+        assert lines[0]["extra_data"] == {"detail": "summary"}
+        assert lines[0]["created_at"] == (BASE + timedelta(hours=6)).isoformat()
+
+    def test_csv(self, client: TestClient, export_rows):
+        export_rows(3)
+        response = client.get("/audit/export", params={"format": "csv", "user_id": "exporter"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="audit_logs.csv"' in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["quantity"] for row in rows] == ["1", "2", "3"]
+
+    def test_rejects_unknown_format(self, client: TestClient):
+        assert client.get("/audit/export", params={"format": "xml"}).status_code == 422
+
+
+class TestPartitionExport:
+    """Test daily Parquet/Arrow files"""
+
+    def test_requires_pyarrow(self, db_session, tmp_path, monkeypatch):
+        monkeypatch.setattr(audit_export, "pyarrow", None)
+        with pytest.raises(RuntimeError):
+            export_partitions(db_session, date(2024, 3, 1), date(2024, 3, 2), str(tmp_path))
+
+    @pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+    def test_writes_one_file_per_day(self, db_session, tmp_path, file_format, export_rows):
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        export_rows(6)
+        written = export_partitions(
+            db_session, date(2024, 3, 1), date(2024, 3, 5), str(tmp_path), file_format, chunk_size=2
+        )
+
+        assert sorted(rows for rows in written.values()) == [2, 4]
+        path = str(tmp_path / "date=2024-03-02" / f"audit.{file_format}")
+        if file_format == "parquet":
+            table = pyarrow.parquet.read_table(path)
+        else:
+            table = pyarrow.ipc.open_file(path).read_all()
+        assert table.num_rows == 4
+        assert table.column_names == EXPORT_COLUMNS
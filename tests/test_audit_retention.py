@@ -0,0 +1,175 @@
+"""
+Tests for Audit Retention
+Test batched deletion of old audit logs, archiving and the background cleanup.
+"""
+from datetime import datetime, timedelta
+import gzip
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.audit_log import PriceAuditLog
+from app.services import audit_retention as retention_module
+from app.services.audit_retention import AuditRetention, CleanupInProgress
+from app.services.audit_service import AuditService
+
+
+def _days_ago(*ages):
+    now = datetime.utcnow()
+    return [now - timedelta(days=age) for age in ages]
+
+
+def _remaining(db_session):
+    db_session.expire_all()
+    return sorted(quantity for (quantity,) in db_session.query(PriceAuditLog.quantity))
+
+
+class TestBatchedCleanup:
+    """Test AuditService.cleanup_old_logs"""
+
+    def test_deletes_only_old_logs_in_batches(self, db_session, audit_rows):
+        # Quantities 1..7; all but the 4th and 7th are older than 90 days
+        audit_rows(created_at=_days_ago(100, 120, 95, 1, 200, 91, 0))
+        batches = []
+        deleted = AuditService.cleanup_old_logs(db_session, days=90, batch_size=2, archive=batches.append)
+
+        assert deleted == 5
+        assert _remaining(db_session) == [4, 7]
+        assert [[row["quantity"] for row in batch] for batch in batches] == [[1, 2], [3], [5, 6]]
+
+    def test_pauses_between_batches(self, db_session, monkeypatch, audit_rows):
+        audit_rows(created_at=_days_ago(100, 100, 100))
+        sleeps = []
+        monkeypatch.setattr("app.services.audit_service.time.sleep", sleeps.append)
+
+        assert AuditService.cleanup_old_logs(db_session, days=90, batch_size=1, pause=0.5) == 3
+        assert sleeps == [0.5, 0.5]
+
+    def test_nothing_to_delete(self, db_session, audit_rows):
+        audit_rows(created_at=_days_ago(1, 2))
+        assert AuditService.cleanup_old_logs(db_session, days=90) == 0
+        assert _remaining(db_session) == [1, 2]
+
+    def test_purge_removes_rollups_of_purged_days(self, db_session, audit_rows):
+        from app.models.audit_rollup import PriceAuditDailyRollup, PriceAuditHourlyRollup
+        from app.services.audit_rollup import compact
+
+        audit_rows(created_at=_days_ago(100, 95, 1))
+        compact(db_session, lag_seconds=0)
+        # Not compacted yet: purged along with its raw row, never rolled up
+        audit_rows(created_at=_days_ago(120))
+
+        assert AuditService.cleanup_old_logs(db_session, days=90) == 3
+        assert db_session.query(PriceAuditHourlyRollup).count() == 1
+        assert db_session.query(PriceAuditDailyRollup).count() == 1
+        assert AuditService.get_audit_statistics(db_session)["total_calculations"] == 1
+
+    def test_failed_archive_keeps_rows(self, db_session, audit_rows):
+        audit_rows(created_at=_days_ago(100, 100))
+
+        def fail(rows):
+            raise OSError("disk full")
+
+        with pytest.raises(OSError):
+            AuditService.cleanup_old_logs(db_session, days=90, archive=fail)
+        assert _remaining(db_session) == [1, 2]
+
+
+class TestAuditRetention:
+    """Test archiving and scheduling of the purge"""
+
+    def test_archives_deleted_rows(self, db_session, tmp_path, session_factory, audit_rows):
+        audit_rows(created_at=_days_ago(100, 1, 100), request_id="retention-test")
+        retention = AuditRetention(session_factory=session_factory, pause=0, days=90, batch_size=1, archive_dir=str(tmp_path))
+
+        result = retention.run_once()
+        assert result["deleted_count"] == 2
+        with gzip.open(result["archive"], "rt") as archive:
+            rows = [json.loads(line) for line in archive]
+        assert [row["quantity"] for row in rows] == [1, 3]
+        assert rows[0]["request_id"] == "retention-test"
+        assert _remaining(db_session) == [2]
+
+    def test_one_purge_at_a_time(self, db_session, session_factory):
+        retention = AuditRetention(session_factory=session_factory, pause=0)
+        retention._running.acquire()
+        try:
+            with pytest.raises(CleanupInProgress):
+                retention.purge(db_session)
+            assert retention.run_once() is None
+        finally:
+            retention._running.release()
+
+    def test_trigger_holds_the_lock_before_returning(self, session_factory):
+        release = threading.Event()
+        def blocked_session():
+            release.wait(5)
+            return session_factory()
+
+        retention = AuditRetention(session_factory=blocked_session, pause=0)
+        retention.trigger()
+        try:
+            assert retention.busy
+            with pytest.raises(CleanupInProgress):
+                retention.trigger()
+        finally:
+            release.set()
+        deadline = time.monotonic() + 5
+        while retention.busy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert retention.last_run["deleted_count"] == 0
+
+    def test_schedule_runs_purge(self, session_factory, audit_rows):
+        audit_rows(created_at=_days_ago(100, 1))
+        retention = AuditRetention(session_factory=session_factory, pause=0, days=90, interval=0.01, enabled=True)
+        retention.start()
+        try:
+            deadline = time.monotonic() + 5
+            while retention.last_run is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            retention.stop()
+        assert retention.last_run["deleted_count"] == 1
+
+    def test_disabled_schedule_does_not_start(self, session_factory):
+        retention = AuditRetention(session_factory=session_factory, pause=0, interval=0.01, enabled=False)
+        retention.start()
+        assert retention._thread is None
+
+
+class TestCleanupEndpoint:
+    """Test DELETE /audit/cleanup"""
+
+    def test_synchronous_cleanup(self, client: TestClient, audit_rows):
+        audit_rows(created_at=_days_ago(100, 1))
+        response = client.delete("/audit/cleanup", params={"days": 90, "background": False})
+
+        assert response.status_code == 200
+        assert response.json()["deleted_count"] == 1
+        assert response.json()["archive"] is None
+        assert client.get("/audit/cleanup").json()["last_run"]["deleted_count"] == 1
+
+    def test_background_cleanup(self, client: TestClient, db_session, monkeypatch, session_factory, audit_rows):
+        audit_rows(created_at=_days_ago(100, 1))
+        monkeypatch.setattr(retention_module.audit_retention, "session_factory", session_factory)
+        monkeypatch.setattr(retention_module.audit_retention, "pause", 0)
+
+        response = client.delete("/audit/cleanup", params={"days": 90})
+        assert response.status_code == 202
+
+        deadline = time.monotonic() + 5
+        while (retention_module.audit_retention.busy or _remaining(db_session) != [2]) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _remaining(db_session) == [2]
+
+    def test_conflict_while_running(self, client: TestClient):
+        retention_module.audit_retention._running.acquire()
+        try:
+            assert client.delete("/audit/cleanup").status_code == 409
+            assert client.delete("/audit/cleanup", params={"background": False}).status_code == 409
+            assert client.get("/audit/cleanup").json()["running"] is True
+        finally:
+            retention_module.audit_retention._running.release()
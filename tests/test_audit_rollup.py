@@ -0,0 +1,201 @@
+"""
+Tests for Audit Rollups
+Test compaction of the audit log into hourly/daily rollups and statistics served from them.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.audit_log import PriceAuditLog
+from app.models.audit_rollup import PriceAuditDailyRollup, PriceAuditHourlyRollup
+from app.services.audit_rollup import AuditRollupCompactor, compact, get_watermark, rollup_spans
+from app.services.audit_service import AuditService
+
+BASE = datetime(2024, 3, 1)
+
+
+HISTORY = [
+    (BASE + timedelta(hours=1, minutes=5), 1, "INR", 100.0, "Spring"),
+    (BASE + timedelta(hours=1, minutes=40), 2, "INR", 50.0, None),
+    (BASE + timedelta(hours=13), 1, "USD", 5.0, "Spring"),
+    (BASE + timedelta(days=1, hours=2), 3, "INR", 70.0, "Flash"),
+    (BASE + timedelta(days=1, hours=2, minutes=30), 1, "INR", 100.0, None),
+    (BASE + timedelta(days=2, minutes=15), 2, "USD", 3.0, "Flash"),
+    (BASE + timedelta(days=2, hours=3, minutes=59), 3, "INR", 80.0, None),
+]
+
+
+@pytest.fixture
+def priced_rows(audit_rows):
+    """Insert audit rows given as (created_at, product_id, currency, final_price, promotion)"""
+    def make(rows):
+        records = [
+            {
+                "product_id": product_id,
+                "quantity": 1,
+                "pricing_result": {
+                    "original_price": final_price + 10,
+                    "final_price": final_price,
+                    "discount_amount": 10.0,
+                    "currency": currency,
+                    "applied_promotions": [{"name": promotion}] if promotion else []
+                }
+            }
+            for _, product_id, currency, final_price, promotion in rows
+        ]
+        return audit_rows([row[0] for row in rows], records)
+
+    return make
+
+
+def _assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if key == "groups":
+            assert [group["key"] for group in actual[key]] == [group["key"] for group in value]
+            for actual_group, expected_group in zip(actual[key], value):
+                _assert_same(actual_group, expected_group)
+        elif isinstance(value, float):
+            assert actual[key] == pytest.approx(value)
+        else:
+            assert actual[key] == value
+
+
+RANGES = [
+    (None, None),
+    (BASE, None),
+    (None, BASE + timedelta(days=2)),
+    (BASE + timedelta(hours=1, minutes=30), BASE + timedelta(days=2, hours=1)),
+    (BASE + timedelta(hours=1, minutes=10), BASE + timedelta(hours=1, minutes=50)),
+    (BASE + timedelta(hours=12), BASE + timedelta(days=1, hours=3)),
+]
+
+
+class TestRollupSpans:
+    """Test splitting a range into rollup buckets"""
+
+    def test_days_and_edge_hours(self):
+        rolled, spans = rollup_spans(datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 3, 5, 15))
+        assert rolled == (datetime(2024, 1, 1, 11), datetime(2024, 1, 3, 5))
+        assert spans == [
+            (PriceAuditDailyRollup, datetime(2024, 1, 2), datetime(2024, 1, 3)),
+            (PriceAuditHourlyRollup, datetime(2024, 1, 1, 11), datetime(2024, 1, 2)),
+            (PriceAuditHourlyRollup, datetime(2024, 1, 3), datetime(2024, 1, 3, 5)),
+        ]
+
+    def test_hours_within_a_day(self):
+        rolled, spans = rollup_spans(datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 14, 1))
+        assert spans == [(PriceAuditHourlyRollup, datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 14))]
+
+    def test_less_than_an_hour(self):
+        assert rollup_spans(datetime(2024, 1, 1, 10, 5), datetime(2024, 1, 1, 10, 55)) == (None, [])
+
+    def test_open_range(self):
+        rolled, spans = rollup_spans(None, None)
+        assert rolled == (None, None)
+        assert spans == [(PriceAuditDailyRollup, None, None)]
+
+
+class TestCompaction:
+    """Test rolling audit rows up above the watermark"""
+
+    def test_builds_hourly_and_daily_rollups(self, db_session, priced_rows):
+        priced_rows(HISTORY)
+        assert compact(db_session, batch_size=3) == 7
+        assert get_watermark(db_session) == 7
+
+        hourly = db_session.query(PriceAuditHourlyRollup).filter(
+            PriceAuditHourlyRollup.bucket_start == BASE + timedelta(hours=1)
+        ).all()
+        assert {(rollup.product_id, rollup.promotion, rollup.total_calculations) for rollup in hourly} == {
+            (1, "Spring", 1), (2, "", 1)
+        }
+
+        daily = db_session.query(PriceAuditDailyRollup).filter(PriceAuditDailyRollup.bucket_start == BASE).all()
+        assert sum(rollup.total_calculations for rollup in daily) == 3
+        assert sum(rollup.total_revenue for rollup in daily) == pytest.approx(155.0)
+
+    def test_is_incremental(self, db_session, priced_rows):
+        priced_rows(HISTORY)
+        compact(db_session)
+        priced_rows([(BASE + timedelta(hours=1, minutes=50), 1, "INR", 100.0, "Spring")])
+
+        assert compact(db_session) == 1
+        assert compact(db_session) == 0
+        rollup = db_session.query(PriceAuditHourlyRollup).filter(
+            PriceAuditHourlyRollup.bucket_start == BASE + timedelta(hours=1),
+            PriceAuditHourlyRollup.product_id == 1
+        ).one()
+        assert rollup.total_calculations == 2
+        assert rollup.total_revenue == pytest.approx(200.0)
+
+    def test_recent_rows_wait_for_lag(self, db_session, priced_rows):
+        priced_rows(HISTORY)
+        priced_rows([(datetime.utcnow(), 1, "INR", 100.0, None)])
+
+        assert compact(db_session, lag_seconds=60) == 7
+        assert compact(db_session, lag_seconds=0) == 1
+
+    def test_compactor_run_once(self, db_session, session_factory, priced_rows):
+        priced_rows(HISTORY)
+        compactor = AuditRollupCompactor(session_factory=session_factory, enabled=True)
+        assert compactor.run_once() == 7
+        assert get_watermark(db_session) == 7
+
+
+class TestStatisticsFromRollups:
+    """Test that rollups plus the tail give the same answers as the raw log"""
+
+    @pytest.mark.parametrize("start_date,end_date", RANGES)
+    @pytest.mark.parametrize("group_by", [None, "product", "currency", "day", "promotion"])
+    def test_matches_raw_aggregation(self, db_session, start_date, end_date, group_by, priced_rows):
+        priced_rows(HISTORY)
+        raw = AuditService.get_audit_statistics(db_session, None, start_date, end_date, group_by)
+
+        compact(db_session)
+        _assert_same(AuditService.get_audit_statistics(db_session, None, start_date, end_date, group_by), raw)
+
+    @pytest.mark.parametrize("start_date,end_date", RANGES)
+    def test_tail_above_watermark(self, db_session, start_date, end_date, priced_rows):
+        priced_rows(HISTORY)
+        compact(db_session)
+        priced_rows([(BASE + timedelta(days=1, hours=2, minutes=45), 2, "USD", 9.0, "Flash")])
+
+        with_tail = AuditService.get_audit_statistics(db_session, None, start_date, end_date, "product")
+        compact(db_session)
+        _assert_same(AuditService.get_audit_statistics(db_session, None, start_date, end_date, "product"), with_tail)
+
+    def test_rollups_are_used(self, db_session, priced_rows):
+        priced_rows(HISTORY)
+        compact(db_session)
+        # Rollups outlive the rows they summarise
+        db_session.query(PriceAuditLog).delete()
+        db_session.commit()
+
+        stats = AuditService.get_audit_statistics(db_session, None, BASE, BASE + timedelta(days=3))
+        assert stats["total_calculations"] == 7
+        assert stats["unique_products"] == 3
+
+    def test_product_filter(self, db_session, priced_rows):
+        priced_rows(HISTORY)
+        raw = AuditService.get_audit_statistics(db_session, 1, BASE, None, "day")
+        compact(db_session)
+
+        stats = AuditService.get_audit_statistics(db_session, 1, BASE, None, "day")
+        _assert_same(stats, raw)
+        assert stats["total_calculations"] == 3
+        assert [group["key"] for group in stats["groups"]] == ["2024-03-01", "2024-03-02"]
+
+
+class TestPromotionGrouping:
+    """Test /audit/statistics?group_by=promotion"""
+
+    def test_groups_by_first_applied_promotion(self, client: TestClient, db_session, priced_rows):
+        priced_rows(HISTORY)
+        compact(db_session)
+
+        response = client.get("/audit/statistics", params={"group_by": "promotion"})
+        assert response.status_code == 200
+        groups = {group["key"]: group["total_calculations"] for group in response.json()["groups"]}
+        assert groups == {"Spring": 2, "Flash": 2, None: 3}
@@ -0,0 +1,127 @@
+"""
+Tests for the Audit Writer
+Test batching, queue policies and flushing of audit rows written off the request path.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.audit_log import PriceAuditLog
+from app.services import audit_writer as audit_writer_module
+from app.services.audit_writer import AuditWriter
+
+
+REQUEST_ID = "writer-test"
+
+
+def _wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def _logged(db_session) -> int:
+    db_session.expire_all()
+    return db_session.query(PriceAuditLog).filter(PriceAuditLog.request_id == REQUEST_ID).count()
+
+
+class TestAuditWriter:
+    """Test the background audit writer"""
+
+    def test_not_running_rejects_rows(self, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=False)
+        writer.start()
+        assert writer.submit(audit_rows(count=1, insert=False, request_id=REQUEST_ID)) is False
+        assert writer.stats()["queued"] == 0
+
+    def test_flushes_full_batches(self, db_session, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, flush_rows=5, flush_interval=60)
+        writer.start()
+        try:
+            assert writer.submit(audit_rows(count=10, insert=False, request_id=REQUEST_ID)) is True
+            assert _wait_for(lambda: writer.stats()["written"] == 10)
+            assert writer.stats()["flushes"] == 2
+        finally:
+            writer.stop()
+        assert _logged(db_session) == 10
+
+    def test_flushes_partial_batch_after_interval(self, db_session, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, flush_rows=100, flush_interval=0.05)
+        writer.start()
+        try:
+            writer.submit(audit_rows(count=3, insert=False, request_id=REQUEST_ID))
+            assert _wait_for(lambda: writer.stats()["written"] == 3)
+        finally:
+            writer.stop()
+        assert _logged(db_session) == 3
+
+    def test_stop_flushes_queued_rows(self, db_session, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, flush_rows=100, flush_interval=60)
+        writer.start()
+        writer.submit(audit_rows(count=7, insert=False, request_id=REQUEST_ID))
+        writer.stop()
+
+        assert writer.stats()["queued"] == 0
+        assert writer.stats()["running"] is False
+        assert _logged(db_session) == 7
+
+    def test_drop_newest_when_full(self, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, max_queue=3, policy="drop_newest")
+        # Mark as running without a worker so the queue only fills up
+        writer._thread = object()
+        writer.submit(audit_rows(count=5, insert=False, request_id=REQUEST_ID))
+
+        assert writer.stats()["dropped"] == 2
+        assert [row["quantity"] for row in writer._drain(10)] == [1, 2, 3]
+
+    def test_drop_oldest_when_full(self, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, max_queue=3, policy="drop_oldest")
+        writer._thread = object()
+        writer.submit(audit_rows(count=5, insert=False, request_id=REQUEST_ID))
+
+        assert writer.stats()["dropped"] == 2
+        assert [row["quantity"] for row in writer._drain(10)] == [3, 4, 5]
+
+    def test_block_times_out_then_drops(self, session_factory, audit_rows):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, max_queue=1, policy="block", enqueue_timeout=0.01)
+        writer._thread = object()
+        writer.submit(audit_rows(count=2, insert=False, request_id=REQUEST_ID))
+
+        assert writer.stats()["dropped"] == 1
+        assert writer.stats()["queued"] == 1
+
+    def test_unknown_policy(self, session_factory):
+        with pytest.raises(ValueError):
+            AuditWriter(session_factory=session_factory, enabled=True, policy="spill")
+
+
+class TestQueuedPricingAudit:
+    """Test that pricing endpoints hand audit rows to the writer"""
+
+    def test_compute_audit_row_is_written_by_writer(self, client: TestClient, db_session, monkeypatch, session_factory):
+        writer = AuditWriter(session_factory=session_factory, enabled=True, flush_rows=100, flush_interval=60)
+        monkeypatch.setattr(audit_writer_module, "audit_writer", writer)
+        product = client.post("/products/", json={
+            "sku": "WRITER-001",
+            "title": "Writer Product",
+            "base_price": 50.0,
+            "stock": 5
+        }).json()
+
+        writer.start()
+        try:
+            response = client.post("/engine/compute", json={"product_id": product["id"], "quantity": 2})
+            assert response.status_code == 200
+            db_session.expire_all()
+            assert db_session.query(PriceAuditLog).filter(PriceAuditLog.product_id == product["id"]).count() == 0
+        finally:
+            writer.stop()
+
+        assert writer.stats()["written"] == 1
+        logs = db_session.query(PriceAuditLog).filter(PriceAuditLog.product_id == product["id"]).all()
+        assert len(logs) == 1
+        assert logs[0].quantity == 2
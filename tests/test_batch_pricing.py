@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+
+class TestBatchPricing:
+    """Test the batch pricing endpoint"""
+
+    def _create_catalog(self, client: TestClient):
+        laptop = client.post("/products/", json={
+            "sku": "BATCH-001",
+            "title": "Laptop",
+            "base_price": 1000.0,
+            "category": "Electronics",
+            "stock": 10,
+            "tax_rate": 18.0
+        }).json()
+        book = client.post("/products/", json={
+            "sku": "BATCH-002",
+            "title": "Book",
+            "base_price": 250.0,
+            "category": "Books",
+            "stock": 10,
+            "tax_rate": 5.0
+        }).json()
+
+        client.post("/promotions/", json={
+            "name": "Laptop 10% Off",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "product_id": laptop["id"],
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True
+        })
+        client.post("/promotions/", json={
+            "name": "Books BOGO",
+            "discount_type": "bogo",
+            "buy_quantity": 1,
+            "get_quantity": 1,
+            "applies_to_category": True,
+            "category_filter": "Books",
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True
+        })
+        return laptop["id"], book["id"]
+
+    def test_batch_matches_single_compute(self, client: TestClient):
+        laptop_id, book_id = self._create_catalog(client)
+        lines = [
+            {"product_id": laptop_id, "quantity": 2},
+            {"product_id": book_id, "quantity": 4, "target_currency": "USD"},
+            {"product_id": book_id, "quantity": 3, "include_tax": True, "rounding_strategy": "down"},
+        ]
+
+        response = client.post("/engine/compute/batch", json={"lines": lines})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 3
+        assert data["errors"] == 0
+
+        client.delete("/engine/cache/all")
+        for line, item in zip(lines, data["results"]):
+            single = client.post("/engine/compute", json=line).json()
+            assert item["product_id"] == line["product_id"]
+            assert item["quantity"] == line["quantity"]
+            for field in ("original_price", "final_price", "discount_amount", "tax_amount", "currency"):
+                assert item[field] == single[field]
+            assert item["explanation"] == single["explanation"]
+
+    def test_batch_reports_unknown_products(self, client: TestClient):
+        laptop_id, _ = self._create_catalog(client)
+
+        response = client.post("/engine/compute/batch", json={"lines": [
+            {"product_id": 99999, "quantity": 1},
+            {"product_id": laptop_id, "quantity": 1}
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["errors"] == 1
+        assert data["results"][0]["error"] == "Product not found"
+        assert data["results"][1]["final_price"] > 0
+
+    def test_batch_uses_cache(self, client: TestClient):
+        laptop_id, _ = self._create_catalog(client)
+        line = {"product_id": laptop_id, "quantity": 1}
+
+        first = client.post("/engine/compute/batch", json={"lines": [line]}).json()
+        second = client.post("/engine/compute/batch", json={"lines": [line]}).json()
+        assert first["results"][0]["cached"] is False
+        assert second["results"][0]["cached"] is True
+        assert client.post("/engine/compute", json=line).json()["cached"] is True
+
+    def test_batch_writes_audit_rows_in_bulk(self, client: TestClient):
+        laptop_id, book_id = self._create_catalog(client)
+
+        response = client.post("/engine/compute/batch", json={"lines": [
+            {"product_id": laptop_id, "quantity": 1},
+            {"product_id": book_id, "quantity": 2},
+            {"product_id": book_id, "quantity": 2}
+        ]})
+        request_id = response.json()["request_id"]
+
+        logs = client.get("/audit/logs").json()
+        batch_logs = [log for log in logs if log["request_id"] == request_id]
+        assert sorted((log["product_id"], log["quantity"]) for log in batch_logs) == [
+            (laptop_id, 1), (book_id, 2)
+        ]
@@ -0,0 +1,105 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.models.product import Product
+from app.models.promotion import Promotion
+from app.services.bulk_pricing_service import reprice_catalog
+from app.services.engine_service import evaluate_price
+from app.services.promotion_index import promotion_index
+
+MONEY_FIELDS = ("original_price", "base_price_after_discount", "tax_amount", "final_price", "discount_amount")
+
+
+def _seed_catalog(db_session, count: int = 60, seed: int = 7):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    categories = ["Electronics", "Books", "Kitchen", None]
+
+    for i in range(count):
+        db_session.add(Product(
+            sku=f"BULK-{i:04d}",
+            title=f"Bulk {i}",
+            base_price=Decimal(rng.randint(1, 500000)) / 100,
+            currency=rng.choice(["INR", "INR", "INR", "USD", "EUR"]),
+            tax_rate=Decimal(rng.choice([0, 500, 1200, 1800, 2800, 1250])) / 100,
+            tax_inclusive=rng.random() < 0.4,
+            max_discount_cap=Decimal(rng.randint(100, 50000)) / 100 if rng.random() < 0.3 else None,
+            category=rng.choice(categories),
+            stock=10
+        ))
+    db_session.commit()
+    product_ids = [p.id for p in db_session.query(Product).all()]
+
+    for i in range(count * 2):
+        discount_type = rng.choice(["percentage", "percentage", "flat", "bogo"])
+        is_category = rng.random() < 0.3
+        db_session.add(Promotion(
+            name=f"Bulk Promo {i}",
+            discount_type=discount_type,
+            discount_value={
+                "percentage": rng.choice([5.0, 10.0, 12.5, 33.33, 0.5, 7.75]),
+                "flat": rng.choice([10.0, 25.5, 99.99, 0.01]),
+                "bogo": None
+            }[discount_type],
+            buy_quantity=rng.randint(1, 3) if discount_type == "bogo" else None,
+            get_quantity=rng.randint(1, 2) if discount_type == "bogo" else None,
+            min_quantity=rng.choice([None, None, 2, 5]),
+            min_amount=rng.choice([None, None, 500.0, 2500.0]),
+            applies_to_category=is_category,
+            category_filter=rng.choice(categories[:3]) if is_category else None,
+            priority=rng.randint(0, 5),
+            stacking_enabled=rng.random() < 0.4,
+            start_date=now - timedelta(days=rng.choice([1, 30])),
+            end_date=now + timedelta(days=rng.choice([-2, 7, 30])),
+            is_active=True,
+            product_id=None if is_category else rng.choice(product_ids)
+        ))
+    db_session.commit()
+    promotion_index.clear()
+
+
+class TestBulkRepricing:
+    """Test the vectorized bulk pricing kernel against the Decimal engine"""
+
+    @pytest.mark.parametrize("target_currency,include_tax,rounding_strategy", [
+        (None, None, "half_up"),
+        ("INR", True, "down"),
+        ("USD", False, "up"),
+        ("EUR", None, "nearest"),
+        ("GBP", None, "half_down"),
+    ])
+    def test_kernel_matches_engine(self, db_session, target_currency, include_tax, rounding_strategy):
+        _seed_catalog(db_session)
+        quantities = [1, 2, 3, 5, 7, 12]
+        now = datetime.utcnow()
+
+        result = reprice_catalog(db_session, quantities, target_currency, include_tax, rounding_strategy, now=now)
+
+        products = db_session.query(Product).order_by(Product.id.asc()).all()
+        assert len(result["final_price"]) == len(products) * len(quantities)
+
+        for row in range(len(result["final_price"])):
+            product = products[row // len(quantities)]
+            live = promotion_index.live_rules_for(db_session, product.id, product.category, now)
+            expected = evaluate_price(
+                product, live.rules, int(result["quantity"][row]),
+                target_currency, include_tax, rounding_strategy, now=now
+            )
+            assert result["product_id"][row] == product.id
+            for field in MONEY_FIELDS:
+                assert result[field][row] == expected[field], (field, row)
+            assert result["currency"][row] == expected["currency"]
+            applied = result["applied_promotion_id"][row]
+            names = {rule.id: rule.name for rule in live.rules}
+            assert names.get(applied) == expected["applied_promotion"]
+
+    def test_most_rows_take_the_vectorized_path(self, db_session):
+        _seed_catalog(db_session)
+
+        result = reprice_catalog(db_session, [1, 2, 3])
+        assert result["fallback_rows"] < len(result["final_price"]) // 10
+
+    def test_empty_catalog(self, db_session):
+        result = reprice_catalog(db_session, [1, 2])
+        assert len(result["final_price"]) == 0
@@ -153,26 +153,150 @@ class TestCacheService:
         response = client.post("/engine/compute", json=request_data)
         assert response.json()["cached"] is False
 
-    def test_different_quantities_cached_separately(self, client, sample_product_data):
-        """Test that different quantities are cached separately"""
+    def test_quantities_share_cached_plan(self, client, sample_product_data):
+        """Test that one cached rule plan serves every quantity of a product"""
         product_response = client.post("/products/", json=sample_product_data)
         product_id = product_response.json()["id"]
+        client.post("/promotions/", json={
+            "name": "Bulk Deal",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "min_quantity": 5,
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True,
+            "product_id": product_id
+        })
 
-        # Request for quantity 1
-        request1 = {"product_id": product_id, "quantity": 1}
-        response1 = client.post("/engine/compute", json=request1)
+        response1 = client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
         assert response1.json()["cached"] is False
+        assert response1.json()["discount_amount"] == 0
+
+        # Quantity 5 crosses the threshold, priced from the same plan
+        response2 = client.post("/engine/compute", json={"product_id": product_id, "quantity": 5})
+        assert response2.json()["cached"] is True
+        assert response2.json()["discount_amount"] == 500.0
+        assert response2.json()["original_price"] == 5000.0
+
+class TestCategoryCacheInvalidation:
+    """Test cache invalidation for category-wide promotions"""
+
+    def _category_promo(self, **overrides):
+        data = {
+            "name": "Electronics Sale",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "applies_to_category": True,
+            "category_filter": "electronics",
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True
+        }
+        data.update(overrides)
+        return data
+
+    def test_new_category_promotion_invalidates_category(self, client, sample_product_data):
+        """Test that creating a category promotion refreshes prices in that category only"""
+        electronics_id = client.post("/products/", json=sample_product_data).json()["id"]
+        fashion_id = client.post("/products/", json={
+            **sample_product_data, "sku": "TEST-002", "category": "fashion"
+        }).json()["id"]
+
+        for product_id in (electronics_id, fashion_id):
+            client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+
+        client.post("/promotions/", json=self._category_promo())
+
+        electronics = client.post("/engine/compute", json={"product_id": electronics_id, "quantity": 1}).json()
+        assert electronics["cached"] is False
+        assert electronics["discount_amount"] == 100.0
+
+        fashion = client.post("/engine/compute", json={"product_id": fashion_id, "quantity": 1}).json()
+        assert fashion["cached"] is True
 
-        # Request for quantity 5
-        request2 = {"product_id": product_id, "quantity": 5}
-        response2 = client.post("/engine/compute", json=request2)
-        assert response2.json()["cached"] is False
+    def test_category_promotion_update_and_delete(self, client, sample_product_data):
+        """Test that updating or deleting a category promotion refreshes cached prices"""
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        promo_id = client.post("/promotions/", json=self._category_promo()).json()["id"]
+        request_data = {"product_id": product_id, "quantity": 1}
 
-        # Both should be cached independently
-        response1_cached = client.post("/engine/compute", json=request1)
-        response2_cached = client.post("/engine/compute", json=request2)
-        assert response1_cached.json()["cached"] is True
-        assert response2_cached.json()["cached"] is True
+        assert client.post("/engine/compute", json=request_data).json()["discount_amount"] == 100.0
+
+        client.put(f"/promotions/{promo_id}", json={"discount_value": 20.0})
+        assert client.post("/engine/compute", json=request_data).json()["discount_amount"] == 200.0
+
+        client.delete(f"/promotions/{promo_id}")
+        response = client.post("/engine/compute", json=request_data).json()
+        assert response["cached"] is False
+        assert response["discount_amount"] == 0
+
+    def test_moving_promotion_to_another_category(self, client, sample_product_data):
+        """Test that both the old and the new category are invalidated"""
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        promo_id = client.post("/promotions/", json=self._category_promo()).json()["id"]
+        request_data = {"product_id": product_id, "quantity": 1}
+        assert client.post("/engine/compute", json=request_data).json()["discount_amount"] == 100.0
+
+        client.put(f"/promotions/{promo_id}", json={"category_filter": "fashion"})
+
+        response = client.post("/engine/compute", json=request_data).json()
+        assert response["cached"] is False
+        assert response["discount_amount"] == 0
+
+
+class TestNegativeCaching:
+    """Test that unknown product IDs are cached as misses"""
+
+    @staticmethod
+    def _count_product_queries(db_session):
+        from sqlalchemy import event
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "FROM products" in statement:
+                statements.append(statement)
+
+        event.listen(db_session.get_bind(), "before_cursor_execute", before_cursor_execute)
+        return statements, lambda: event.remove(db_session.get_bind(), "before_cursor_execute", before_cursor_execute)
+
+    def test_unknown_product_queries_database_once(self, db_session):
+        from app.services.engine_service import calculate_price_with_explanation
+
+        statements, stop = self._count_product_queries(db_session)
+        try:
+            for _ in range(3):
+                assert calculate_price_with_explanation(db_session, 9999, 1, enable_audit=False) is None
+        finally:
+            stop()
+        assert len(statements) == 1
+
+    def test_unknown_products_in_batch_are_cached(self, db_session):
+        from app.services.engine_service import calculate_prices_batch
+
+        statements, stop = self._count_product_queries(db_session)
+        try:
+            lines = [{"product_id": 9998, "quantity": 1}, {"product_id": 9999, "quantity": 2}]
+            assert calculate_prices_batch(db_session, lines, enable_audit=False) == [None, None]
+            assert calculate_prices_batch(db_session, lines, enable_audit=False) == [None, None]
+        finally:
+            stop()
+        assert len(statements) == 1
+
+    def test_created_product_replaces_negative_entry(self, client):
+        assert client.post("/engine/compute", json={"product_id": 1, "quantity": 1}).status_code == 404
+
+        product = client.post("/products/", json={
+            "sku": "NEG-001",
+            "title": "Late Product",
+            "base_price": 100.0,
+            "stock": 1
+        }).json()
+        assert product["id"] == 1
+
+        response = client.post("/engine/compute", json={"product_id": 1, "quantity": 1})
+        assert response.status_code == 200
+        assert response.json()["original_price"] == 100.0
 
 
 class TestCurrencyConversion:
@@ -0,0 +1,123 @@
+"""
+Tests for Cache Miss Coalescing
+Test single-flight computation and stale-while-revalidate serving.
+"""
+import threading
+import time
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import CacheService
+from app.core.single_flight import SingleFlight
+
+
+def _run_concurrently(target, count):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight:
+    """Test in-process request coalescing"""
+
+    def test_concurrent_calls_run_once(self):
+        """Test that concurrent callers for a key share one execution"""
+        flights = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = _run_concurrently(lambda: flights.do("key", slow), 8)
+
+        assert len(calls) == 1
+        assert all(value == "value" for value, _ in results)
+        assert sum(1 for _, leader in results if leader) == 1
+
+    def test_error_shared_with_waiters(self):
+        """Test that waiting callers see the leader's exception"""
+        flights = SingleFlight()
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("boom")
+
+        leader = threading.Thread(target=lambda: pytest.raises(RuntimeError, flights.do, "key", failing))
+        leader.start()
+        started.wait()
+
+        with pytest.raises(RuntimeError):
+            flights.do("key", lambda: "unused")
+        leader.join()
+
+
+class TestGetOrCompute:
+    """Test CacheService.get_or_compute"""
+
+    def test_concurrent_misses_compute_once(self):
+        """Test that a thundering herd on one key runs a single computation"""
+        CacheService.clear_all()
+        key = CacheService._get_key("price", 1, CacheService.generation_tag(1), 1)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            CacheService.set(key, {"final_price": 10.0})
+            return {"final_price": 10.0}
+
+        results = _run_concurrently(lambda: CacheService.get_or_compute(key, compute), 10)
+
+        assert len(calls) == 1
+        assert sum(1 for _, computed in results if computed) == 1
+        assert all(value == {"final_price": 10.0} for value, _ in results)
+
+    def test_stale_value_served_during_recompute(self):
+        """Test that the previous value is served while a key is recomputed"""
+        CacheService.clear_all()
+        key = CacheService._get_key("price", 2, CacheService.generation_tag(2), 1)
+        stale_key = "price:2:stale:1"
+        cache_module._memory_cache.set(stale_key, {"final_price": 5.0})
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            CacheService.set(key, {"final_price": 6.0})
+            return {"final_price": 6.0}
+
+        leader = threading.Thread(target=CacheService.get_or_compute, args=(key, compute, stale_key))
+        leader.start()
+        started.wait(5)
+
+        value, computed = CacheService.get_or_compute(key, compute, stale_key)
+        release.set()
+        leader.join()
+
+        assert value == {"final_price": 5.0}
+        assert computed is False
+        assert cache_module._memory_cache.get(stale_key) == {"final_price": 6.0}
+
+    def test_nothing_cached_when_compute_returns_none(self):
+        """Test that a None result is not stored as the stale value"""
+        value, computed = CacheService.get_or_compute("price:404:x", lambda: None, "price:404:stale")
+
+        assert value is None
+        assert computed is True
+        assert cache_module._memory_cache.get("price:404:stale") is None
@@ -0,0 +1,101 @@
+"""
+Tests for Cache Observability
+Test hit/miss counters, latency histograms and the stats and metrics endpoints.
+"""
+from fastapi.testclient import TestClient
+
+from app.core import cache as cache_module
+from app.core.cache import CacheService
+from app.core.cache_metrics import CacheMetrics, Histogram, key_prefix
+
+
+class TestCacheMetrics:
+    """Test the metric primitives"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+        for value in (0.0005, 0.005, 0.005, 0.5):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == [(0.001, 1), (0.01, 3), (0.1, 3)]
+        assert snapshot["count"] == 4
+        assert abs(snapshot["sum"] - 0.5105) < 1e-9
+
+    def test_hit_ratio_by_prefix(self):
+        metrics = CacheMetrics()
+        metrics.record_hits(["plan:1:g0.0", "plan:2:g0.0"], "memory")
+        metrics.record_hits(["plan:3:g0.0"], "redis")
+        metrics.record_misses(["plan:4:g0.0", "other"])
+
+        snapshot = metrics.snapshot()
+        assert snapshot["prefixes"]["plan"] == {"hits": {"memory": 2, "redis": 1}, "misses": 1, "hit_ratio": 0.75}
+        assert snapshot["prefixes"]["other"]["hit_ratio"] == 0.0
+        assert snapshot["hit_ratio"] == 0.6
+
+    def test_key_prefix(self):
+        assert key_prefix("plan:42:g1.0") == "plan"
+        assert key_prefix("plain") == "plain"
+
+
+class TestCacheServiceInstrumentation:
+    """Test that cache operations are counted"""
+
+    def setup_method(self):
+        cache_module._metrics.reset()
+
+    def test_get_and_get_many_are_counted(self):
+        CacheService.set("metric:a", 1)
+        CacheService.get("metric:a")
+        CacheService.get("metric:missing")
+        CacheService.get_many(["metric:a", "metric:b"])
+
+        stats = CacheService.stats()
+        assert stats["metrics"]["prefixes"]["metric"]["hits"] == {"memory": 2}
+        assert stats["metrics"]["prefixes"]["metric"]["misses"] == 2
+        assert stats["metrics"]["latency"]["get"]["count"] == 2
+        assert stats["metrics"]["latency"]["get_many"]["count"] == 1
+        assert stats["metrics"]["latency"]["set"]["count"] == 1
+        assert stats["memory"]["keys_by_prefix"]["metric"] == 1
+
+    def test_stale_dependency_counts_as_miss(self):
+        CacheService.set("metric:dependent", 1, depends_on=CacheService.generations(["category:metrics"]))
+        CacheService.invalidate_category("metrics")
+        assert CacheService.get("metric:dependent") is None
+
+        assert CacheService.stats()["metrics"]["prefixes"]["metric"]["misses"] == 1
+
+
+class TestCacheStatsEndpoints:
+    """Test /engine/cache/stats and /metrics"""
+
+    def test_stats_reflect_plan_cache(self, client: TestClient):
+        cache_module._metrics.reset()
+        product = client.post("/products/", json={
+            "sku": "METRIC-001",
+            "title": "Metric Product",
+            "base_price": 100.0,
+            "stock": 5
+        }).json()
+        for quantity in (1, 2, 3):
+            client.post("/engine/compute", json={"product_id": product["id"], "quantity": quantity})
+
+        response = client.get("/engine/cache/stats")
+        assert response.status_code == 200
+        plan = response.json()["metrics"]["prefixes"]["plan"]
+        assert plan["misses"] >= 1
+        assert sum(plan["hits"].values()) >= 2
+        assert "breaker_state" in response.json()["redis"]
+
+    def test_prometheus_format(self, client: TestClient):
+        CacheService.set("metric:a", 1)
+        CacheService.get("metric:a")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "# TYPE price_cache_hits_total counter" in body
+        assert 'price_cache_hits_total{prefix="metric",tier="memory"}' in body
+        assert 'price_cache_operation_seconds_bucket{operation="get",le="+Inf"}' in body
+        assert "price_cache_memory_entries " in body
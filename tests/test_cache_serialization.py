@@ -0,0 +1,95 @@
+"""
+Tests for Cache Serialization
+Test the pluggable serializers and the read-only snapshots of the memory tier.
+"""
+import pytest
+
+from app.core.cache import CacheService
+from app.core.memory_cache import MemoryCache, freeze
+from app.core.serialization import JsonSerializer, decode, get_serializer, msgpack, orjson
+
+SAMPLE = {
+    "final_price": 1062.0,
+    "currency": "INR",
+    "cached": False,
+    "applied_promotion": None,
+    "explanation": ["Rule Applied: Sale - Applied 10.0% discount (Priority: 1)"] * 3,
+    "applied_promotions": [{"name": "Sale", "discount": 100.0, "priority": 1}]
+}
+
+
+class TestSerializers:
+    """Test the serializer implementations"""
+
+    @pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+    def test_round_trip(self, name):
+        """Test that every available serializer round-trips a pricing result"""
+        if name == "orjson" and orjson is None or name == "msgpack" and msgpack is None:
+            pytest.skip(f"{name} not installed")
+        serializer = get_serializer(name)
+        assert serializer.name == name
+
+        assert decode(serializer.dumps(SAMPLE)) == SAMPLE
+
+    def test_unknown_name_falls_back_to_json(self):
+        """Test that an unavailable serializer falls back to JSON"""
+        assert isinstance(get_serializer("does-not-exist"), JsonSerializer)
+
+    def test_decodes_untagged_json(self):
+        """Test that entries written before payloads were tagged are still readable"""
+        assert decode('{"final_price": 10.0}') == {"final_price": 10.0}
+
+    def test_auto_prefers_binary_library(self):
+        """Test that auto picks a faster library when one is installed"""
+        serializer = get_serializer("auto")
+        if orjson is not None:
+            assert serializer.name == "orjson"
+        elif msgpack is not None:
+            assert serializer.name == "msgpack"
+        else:
+            assert serializer.name == "json"
+
+
+class TestSnapshots:
+    """Test read-only snapshots in the memory tier"""
+
+    def test_freeze_is_read_only(self):
+        """Test that frozen values cannot be modified"""
+        frozen = freeze(SAMPLE)
+
+        with pytest.raises(TypeError):
+            frozen["cached"] = True
+        with pytest.raises(AttributeError):
+            frozen["explanation"].append("x")
+        assert frozen == freeze(SAMPLE)
+
+    def test_memory_tier_returns_shared_snapshot(self):
+        """Test that hits return the stored snapshot without copying"""
+        cache = MemoryCache()
+        cache.set("key", SAMPLE)
+
+        first = cache.get("key")
+        assert first is cache.get("key")
+        assert first["final_price"] == 1062.0
+
+    def test_caller_mutation_does_not_leak(self):
+        """Test that mutating the value after set does not change the cached entry"""
+        value = {"final_price": 10.0, "explanation": ["a"]}
+        CacheService.set("snapshot:test", value)
+        value["explanation"].append("b")
+
+        assert CacheService.get("snapshot:test")["explanation"] == ("a",)
+        CacheService.delete("snapshot:test")
+
+    def test_cached_response_flag_not_shared(self, client, sample_product_data):
+        """Test that serving a cached price does not modify the cached entry"""
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        request_data = {"product_id": product_id, "quantity": 1}
+
+        first = client.post("/engine/compute", json=request_data).json()
+        second = client.post("/engine/compute", json=request_data).json()
+        third = client.post("/engine/compute", json=request_data).json()
+
+        assert first["cached"] is False
+        assert second["cached"] is True and third["cached"] is True
+        assert first["final_price"] == second["final_price"] == third["final_price"]
@@ -0,0 +1,91 @@
+"""
+Tests for Cache Warm-up
+Test learning hot products from the audit log and precomputing their plans.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import cache as cache_module
+from app.core.cache import CacheService
+from app.services.cache_warmup import CacheWarmer
+
+
+def _create_products(client: TestClient, count: int):
+    return [
+        client.post("/products/", json={
+            "sku": f"WARM-{index:03d}",
+            "title": f"Product {index}",
+            "base_price": 100.0 + index,
+            "category": "Warm",
+            "stock": 10
+        }).json()["id"]
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def make_warmer(session_factory):
+    """CacheWarmer on the test database, hooked to invalidations until the test ends"""
+    warmers = []
+
+    def make(**kwargs) -> CacheWarmer:
+        warmer = CacheWarmer(session_factory=session_factory, enabled=True, **kwargs)
+        cache_module.add_generation_hook(warmer.on_generation_bump)
+        warmers.append(warmer)
+        return warmer
+
+    yield make
+    for warmer in warmers:
+        cache_module._generation_hooks.remove(warmer.on_generation_bump)
+        warmer.stop()
+
+
+class TestCacheWarmup:
+    """Test background precomputation of rule plans"""
+
+    def test_learns_most_requested_products(self, client: TestClient, make_warmer):
+        first, second, third = _create_products(client, 3)
+        for product_id, requests in ((first, 1), (second, 3), (third, 2)):
+            # Distinct quantities: a repeated calculation is audited once per plan
+            for quantity in range(1, requests + 1):
+                client.post("/engine/compute", json={"product_id": product_id, "quantity": quantity})
+
+        warmer = make_warmer(top_n=2)
+        assert warmer.learn() == [second, third]
+
+    def test_start_warms_plans_so_first_request_is_cached(self, client: TestClient, make_warmer):
+        product_ids = _create_products(client, 3)
+        warmer = make_warmer(products=product_ids, batch_size=2)
+        warmer.start()
+        warmer.wait(timeout=10)
+
+        response = client.post("/engine/compute", json={"product_id": product_ids[2], "quantity": 4})
+        assert response.json()["cached"] is True
+        assert warmer.warm(product_ids) == 0
+
+    def test_rewarms_after_invalidation(self, client: TestClient, make_warmer):
+        product_ids = _create_products(client, 2)
+        warmer = make_warmer(products=product_ids)
+        warmer.learn()
+        assert warmer.warm(product_ids) == 2
+
+        CacheService.invalidate_product(product_ids[0])
+        warmer.wait(timeout=10)
+        response = client.post("/engine/compute", json={"product_id": product_ids[0], "quantity": 1})
+        assert response.json()["cached"] is True
+
+        CacheService.clear_all()
+        warmer.wait(timeout=10)
+        response = client.post("/engine/compute", json={"product_id": product_ids[1], "quantity": 1})
+        assert response.json()["cached"] is True
+
+    def test_disabled_warmer_does_nothing(self, client: TestClient, make_warmer):
+        product_ids = _create_products(client, 1)
+        warmer = make_warmer(products=product_ids)
+        warmer.enabled = False
+        warmer.start()
+        warmer.schedule(product_ids)
+        warmer.wait(timeout=10)
+
+        response = client.post("/engine/compute", json={"product_id": product_ids[0], "quantity": 1})
+        assert response.json()["cached"] is False
@@ -0,0 +1,148 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+
+class TestCartPricing:
+    """Test whole-cart pricing"""
+
+    def _create_products(self, client: TestClient):
+        phone = client.post("/products/", json={
+            "sku": "CART-001",
+            "title": "Phone",
+            "base_price": 3000.0,
+            "category": "Electronics",
+            "stock": 10,
+            "tax_rate": 0.0
+        }).json()
+        charger = client.post("/products/", json={
+            "sku": "CART-002",
+            "title": "Charger",
+            "base_price": 2500.0,
+            "category": "Electronics",
+            "stock": 10,
+            "tax_rate": 0.0
+        }).json()
+        mug = client.post("/products/", json={
+            "sku": "CART-003",
+            "title": "Mug",
+            "base_price": 200.0,
+            "category": "Kitchen",
+            "stock": 10,
+            "tax_rate": 0.0
+        }).json()
+        return phone["id"], charger["id"], mug["id"]
+
+    def _create_category_spend_promo(self, client: TestClient):
+        client.post("/promotions/", json={
+            "name": "Spend 5000 on Electronics",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "min_amount": 5000.0,
+            "applies_to_category": True,
+            "category_filter": "Electronics",
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True
+        })
+
+    def test_category_threshold_across_lines(self, client: TestClient):
+        phone_id, charger_id, mug_id = self._create_products(client)
+        self._create_category_spend_promo(client)
+
+        single = client.post("/engine/compute", json={"product_id": phone_id, "quantity": 1}).json()
+        assert single["discount_amount"] == 0
+
+        response = client.post("/engine/cart", json={"items": [
+            {"product_id": phone_id, "quantity": 1},
+            {"product_id": charger_id, "quantity": 1},
+            {"product_id": mug_id, "quantity": 1}
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+
+        lines = {line["product_id"]: line for line in data["items"]}
+        assert lines[phone_id]["discount_amount"] == 300.0
+        assert lines[charger_id]["discount_amount"] == 250.0
+        assert lines[mug_id]["discount_amount"] == 0
+        assert data["category_totals"]["Electronics"] == {"quantity": 2, "amount": 5500.0}
+        assert data["discount_amount"] == 550.0
+        assert data["final_price"] == 5700.0 - 550.0
+
+    def test_category_threshold_not_met(self, client: TestClient):
+        phone_id, _, mug_id = self._create_products(client)
+        self._create_category_spend_promo(client)
+
+        data = client.post("/engine/cart", json={"items": [
+            {"product_id": phone_id, "quantity": 1},
+            {"product_id": mug_id, "quantity": 5}
+        ]}).json()
+        assert data["discount_amount"] == 0
+
+    def test_duplicate_lines_are_merged(self, client: TestClient):
+        phone_id, _, _ = self._create_products(client)
+        client.post("/promotions/", json={
+            "name": "Phone BOGO",
+            "discount_type": "bogo",
+            "buy_quantity": 1,
+            "get_quantity": 1,
+            "product_id": phone_id,
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True
+        })
+
+        data = client.post("/engine/cart", json={"items": [
+            {"product_id": phone_id, "quantity": 1},
+            {"product_id": phone_id, "quantity": 1}
+        ]}).json()
+        assert len(data["items"]) == 1
+        assert data["items"][0]["quantity"] == 2
+        assert data["discount_amount"] == 3000.0
+
+    def test_cart_uses_single_currency(self, client: TestClient):
+        phone_id, charger_id, _ = self._create_products(client)
+
+        data = client.post("/engine/cart", json={
+            "items": [
+                {"product_id": phone_id, "quantity": 1},
+                {"product_id": charger_id, "quantity": 1}
+            ],
+            "target_currency": "USD"
+        }).json()
+        assert data["currency"] == "USD"
+        assert all(line["currency"] == "USD" for line in data["items"])
+        assert data["final_price"] == sum(line["final_price"] for line in data["items"])
+
+    def test_category_total_converts_mixed_currencies(self, client: TestClient):
+        phone_id, _, _ = self._create_products(client)
+        # 30 USD is 2500 INR, so with the 3000 INR phone the category passes 5000 INR
+        case = client.post("/products/", json={
+            "sku": "CART-004",
+            "title": "Case",
+            "base_price": 30.0,
+            "currency": "USD",
+            "category": "Electronics",
+            "stock": 10,
+            "tax_rate": 0.0
+        }).json()
+        self._create_category_spend_promo(client)
+
+        data = client.post("/engine/cart", json={"items": [
+            {"product_id": phone_id, "quantity": 1},
+            {"product_id": case["id"], "quantity": 1}
+        ]}).json()
+        assert data["currency"] == "INR"
+        assert data["category_totals"]["Electronics"] == {"quantity": 2, "amount": 5500.0}
+        lines = {line["product_id"]: line for line in data["items"]}
+        assert lines[phone_id]["discount_amount"] == 300.0
+        assert lines[case["id"]]["discount_amount"] == 250.0
+
+    def test_cart_with_unknown_product(self, client: TestClient):
+        phone_id, _, _ = self._create_products(client)
+
+        response = client.post("/engine/cart", json={"items": [
+            {"product_id": phone_id, "quantity": 1},
+            {"product_id": 99999, "quantity": 1}
+        ]})
+        assert response.status_code == 404
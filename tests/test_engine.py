@@ -549,3 +549,153 @@ class TestExplanationAPI:
         explanation_text = " ".join(data["explanation"]).lower()
         assert "skipped" in explanation_text
         assert "minimum quantity" in explanation_text
+
+
+class TestDetailLevels:
+    """Test response detail levels of the price engine"""
+
+    def _create_promoted_product(self, client, sample_product_data):
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        client.post("/promotions/", json={
+            "name": "Detail Sale",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "priority": 1,
+            "start_date": datetime.utcnow().isoformat(),
+            "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+            "is_active": True,
+            "product_id": product_id
+        })
+        return product_id
+
+    def test_final_only(self, client, sample_product_data):
+        """Test that final_only returns just the final price and currency"""
+        product_id = self._create_promoted_product(client, sample_product_data)
+
+        full = client.post("/engine/compute", json={"product_id": product_id, "quantity": 2}).json()
+        data = client.post("/engine/compute", json={
+            "product_id": product_id, "quantity": 2, "detail": "final_only"
+        }).json()
+
+        assert set(data) == {"final_price", "currency", "cached"}
+        assert data["final_price"] == full["final_price"]
+
+    def test_summary(self, client, sample_product_data):
+        """Test that summary omits explanation and per-promotion breakdown"""
+        product_id = self._create_promoted_product(client, sample_product_data)
+
+        full = client.post("/engine/compute", json={
+            "product_id": product_id, "quantity": 2, "target_currency": "USD"
+        }).json()
+        data = client.post("/engine/compute", json={
+            "product_id": product_id, "quantity": 2, "target_currency": "USD", "detail": "summary"
+        }).json()
+
+        assert "explanation" not in data
+        assert "applied_promotions" not in data
+        assert data["applied_promotion"] == "Detail Sale"
+        for field in ("original_price", "discount_amount", "tax_amount", "final_price", "currency"):
+            assert data[field] == full[field]
+
+    def test_reduced_levels_audit_full_amounts(self, client, db_session, sample_product_data):
+        """Test that trimmed responses still write complete audit rows"""
+        from app.models.audit_log import PriceAuditLog
+
+        product_id = self._create_promoted_product(client, sample_product_data)
+        full = client.post("/engine/compute", json={"product_id": product_id, "quantity": 2}).json()
+        for detail in ("summary", "final_only"):
+            client.post("/engine/compute", json={"product_id": product_id, "quantity": 2, "detail": detail})
+
+        db_session.expire_all()
+        logs = db_session.query(PriceAuditLog).order_by(PriceAuditLog.id).all()
+        assert [log.extra_data for log in logs[1:]] == [{"detail": "summary"}, {"detail": "final_only"}]
+        for log in logs:
+            assert log.original_price == full["original_price"]
+            assert log.discount_amount == full["discount_amount"]
+            assert log.tax_amount == full["tax_amount"]
+            assert [promo["name"] for promo in log.applied_promotions] == ["Detail Sale"]
+
+    def test_levels_share_cached_plan(self, client, sample_product_data):
+        """Test that every detail level is served from the product's cached rule plan"""
+        product_id = self._create_promoted_product(client, sample_product_data)
+        request_data = {"product_id": product_id, "quantity": 1}
+
+        assert client.post("/engine/compute", json={**request_data, "detail": "final_only"}).json()["cached"] is False
+        full = client.post("/engine/compute", json=request_data).json()
+        assert full["cached"] is True
+        assert "explanation" in full
+
+    def test_levels_invalidated_together(self, client, sample_product_data):
+        """Test that product invalidation clears every detail level"""
+        product_id = self._create_promoted_product(client, sample_product_data)
+        request_data = {"product_id": product_id, "quantity": 1, "detail": "summary"}
+
+        client.post("/engine/compute", json=request_data)
+        client.put(f"/products/{product_id}", json={"base_price": 2000.0})
+
+        data = client.post("/engine/compute", json=request_data).json()
+        assert data["cached"] is False
+        assert data["original_price"] == 2000.0
+
+
+class TestRulePlan:
+    """Test pricing from cached rule plans"""
+
+    def test_plan_survives_json_round_trip(self, client, db_session, sample_product_data):
+        """Test that a plan read back from JSON prices exactly like the live rules"""
+        import json
+        from app.models.product import Product
+        from app.services.engine_service import build_rule_plan, evaluate_plan, evaluate_price
+        from app.services.promotion_index import promotion_index
+
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        for promo in (
+            {"name": "Stacked 5%", "discount_type": "percentage", "discount_value": 5.5, "stacking_enabled": True},
+            {"name": "Flat", "discount_type": "flat", "discount_value": 12.25, "stacking_enabled": True, "min_quantity": 3},
+            {"name": "BOGO", "discount_type": "bogo", "buy_quantity": 2, "get_quantity": 1, "priority": 2}
+        ):
+            client.post("/promotions/", json={
+                "priority": 1,
+                "start_date": datetime.utcnow().isoformat(),
+                "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+                "is_active": True,
+                "product_id": product_id,
+                **promo
+            })
+
+        product = db_session.query(Product).filter(Product.id == product_id).first()
+        live = promotion_index.live_rules_for(db_session, product.id, product.category)
+        plan = json.loads(json.dumps(build_rule_plan(product, live)))
+
+        now = datetime.utcnow()
+        for quantity in (1, 2, 3, 7, 30):
+            for currency in (None, "USD"):
+                expected = evaluate_price(product, live.rules, quantity, currency, now=now)
+                assert evaluate_plan(plan, quantity, currency, now=now) == expected
+
+    def test_plan_applies_rules_starting_after_it_was_built(self, client, db_session, sample_product_data):
+        """Test that a cached plan picks up a promotion once its start date passes"""
+        from app.models.product import Product
+        from app.services.engine_service import build_rule_plan, evaluate_plan
+        from app.services.promotion_index import promotion_index
+
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        start = datetime.utcnow() + timedelta(hours=1)
+        client.post("/promotions/", json={
+            "name": "Starts Later",
+            "discount_type": "percentage",
+            "discount_value": 10.0,
+            "priority": 1,
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=1)).isoformat(),
+            "is_active": True,
+            "product_id": product_id
+        })
+
+        product = db_session.query(Product).filter(Product.id == product_id).first()
+        plan = build_rule_plan(
+            product, promotion_index.live_rules_for(db_session, product.id, product.category, include_upcoming=True)
+        )
+
+        assert evaluate_plan(plan, 1, now=start - timedelta(minutes=1))["applied_promotion"] is None
+        assert evaluate_plan(plan, 1, now=start + timedelta(minutes=1))["applied_promotion"] == "Starts Later"
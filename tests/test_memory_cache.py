@@ -0,0 +1,279 @@
+"""
+Tests for the in-memory cache tier
+Test LRU eviction, size bounds, per-entry TTL and the hit/miss counters.
+"""
+import time
+
+from app.core.generations import GenerationCounters
+from app.core.memory_cache import MemoryCache
+
+
+class TestMemoryCache:
+    """Test the bounded LRU + TTL memory cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the entry bound evicts the least recently used key"""
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_bound(self):
+        """Test that entries are evicted once the byte budget is exceeded"""
+        cache = MemoryCache(max_entries=1000, max_bytes=200)
+        for i in range(20):
+            cache.set(f"price:{i}", {"final_price": 100.0 + i})
+
+        stats = cache.stats()
+        assert stats["bytes"] <= 200
+        assert stats["entries"] < 20
+        assert cache.get("price:19") is not None
+
+    def test_oversized_value_not_stored(self):
+        """Test that a value larger than the whole budget is skipped"""
+        cache = MemoryCache(max_bytes=50)
+        cache.set("big", "x" * 100)
+        assert cache.get("big") is None
+        assert len(cache) == 0
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after their TTL"""
+        cache = MemoryCache()
+        cache.set("short", 1, ttl=0.01)
+        cache.set("long", 2, ttl=60)
+        time.sleep(0.02)
+
+        assert cache.get("short") is None
+        assert cache.get("long") == 2
+        assert cache.stats()["expirations"] == 1
+
+    def test_hit_miss_counters(self):
+        """Test that hits and misses are counted"""
+        cache = MemoryCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+
+    def test_delete_prefix(self):
+        """Test prefix deletion used by product invalidation"""
+        cache = MemoryCache()
+        cache.set("price:1:1", 1)
+        cache.set("price:1:2", 2)
+        cache.set("price:10:1", 3)
+
+        assert cache.delete_prefix("price:1:") == 2
+        assert cache.get("price:10:1") == 3
+        assert cache.stats()["bytes"] > 0
+
+
+class TestCacheServiceMemoryTier:
+    """Test CacheService against the bounded memory tier"""
+
+    def test_crawler_quantities_share_one_entry(self, client, sample_product_data):
+        """Test that walking many quantities caches a single plan for the product"""
+        from app.core import cache as cache_module
+
+        original = cache_module._memory_cache
+        cache_module._memory_cache = MemoryCache(max_entries=25)
+        try:
+            product_id = client.post("/products/", json=sample_product_data).json()["id"]
+            for quantity in range(1, 61):
+                response = client.post("/engine/compute", json={
+                    "product_id": product_id,
+                    "quantity": quantity
+                })
+                assert response.status_code == 200
+
+            stats = cache_module.CacheService.memory_stats()
+            # The plan plus its stale copy
+            assert stats["entries"] == 2
+            assert stats["evictions"] == 0
+        finally:
+            cache_module._memory_cache = original
+
+    def test_set_respects_bound(self):
+        """Test that CacheService.set cannot grow the memory tier past its bound"""
+        from app.core import cache as cache_module
+
+        original = cache_module._memory_cache
+        cache_module._memory_cache = MemoryCache(max_entries=25)
+        try:
+            for i in range(60):
+                cache_module.CacheService.set(f"price:{i}", {"final_price": float(i)})
+
+            stats = cache_module.CacheService.memory_stats()
+            assert stats["entries"] == 25
+            assert stats["evictions"] == 35
+        finally:
+            cache_module._memory_cache = original
+
+class TestCacheInvalidationBroadcast:
+    """Test that invalidations keep other workers' L1 tiers coherent"""
+
+    def test_invalidation_reaches_peer_worker(self):
+        """Test that invalidate_product advances a peer's generation for that product only"""
+        from app.core import cache as cache_module
+
+        peer_memory = MemoryCache()
+        peer_generations = GenerationCounters()
+        before = peer_generations.get_many(["product:7", "product:8"])
+
+        def peer_handler(message):
+            cache_module.apply_invalidation(peer_memory, peer_generations, message)
+
+        cache_module._bus.subscribe(peer_handler)
+        try:
+            cache_module.CacheService.invalidate_product(7)
+        finally:
+            cache_module._bus.unsubscribe(peer_handler)
+
+        after = peer_generations.get_many(["product:7", "product:8"])
+        assert after["product:7"] > before["product:7"]
+        assert after["product:8"] == before["product:8"]
+
+    def test_message_from_peer_invalidates_local_keys(self):
+        """Test that a generation broadcast from another worker changes this worker's keys"""
+        from app.core import cache as cache_module
+
+        tag = cache_module.CacheService.generation_tag(9)
+        current = cache_module._generations.get("all")
+        cache_module._bus.publish({
+            "op": "generation", "name": "all", "value": current + 5, "origin": "other-worker"
+        })
+
+        assert cache_module.CacheService.generation_tag(9) != tag
+
+    def test_own_messages_are_ignored(self):
+        """Test that a worker does not re-apply its own broadcast"""
+        from app.core import cache as cache_module
+
+        cache_module.CacheService.set("price:9:g0.0:1", {"final_price": 1.0})
+        cache_module._bus.publish({"op": "key", "key": "price:9:g0.0:1", "origin": cache_module.INSTANCE_ID})
+
+        assert cache_module.CacheService.get("price:9:g0.0:1") is not None
+        cache_module.CacheService.delete("price:9:g0.0:1")
+
+
+class TestGenerationInvalidation:
+    """Test generation-counter based invalidation"""
+
+    def test_bump_changes_only_that_product(self):
+        """Test that invalidating one product leaves other products' keys intact"""
+        from app.core.cache import CacheService
+
+        tags = CacheService.generation_tags([1, 2])
+        CacheService.invalidate_product(1)
+        new_tags = CacheService.generation_tags([1, 2])
+
+        assert new_tags[1] != tags[1]
+        assert new_tags[2] == tags[2]
+
+    def test_clear_all_changes_every_tag(self):
+        """Test that clearing all advances the global generation"""
+        from app.core.cache import CacheService
+
+        tags = CacheService.generation_tags([1, 2])
+        CacheService.clear_all()
+        new_tags = CacheService.generation_tags([1, 2])
+
+        assert new_tags[1] != tags[1]
+        assert new_tags[2] != tags[2]
+
+    def test_lookups_of_unknown_products_stay_bounded(self):
+        """Test that probing random product IDs does not grow the generation table"""
+        from app.core import cache as cache_module
+        from app.core.cache import CacheService
+
+        for product_id in range(1_000_000, 1_020_000):
+            CacheService.generation_tags([product_id])
+        assert len(cache_module._generations) <= cache_module.CACHE_MAX_ENTRIES
+
+    def test_memory_only_counters_hold_bumped_names_only(self):
+        """Test that without Redis a never-bumped counter is 0 without being stored"""
+        generations = GenerationCounters()
+        names = [f"product:{product_id}" for product_id in range(20_000)]
+
+        assert set(generations.get_many(names).values()) == {0}
+        assert len(generations) == 0
+        generations.bump("product:7")
+        assert generations.get_many(["product:7", "product:8"]) == {"product:7": 1, "product:8": 0}
+        assert len(generations) == 1
+
+    def test_invalidation_does_not_scan_memory_tier(self, client, sample_product_data):
+        """Test that invalidation leaves old entries to expire instead of deleting them"""
+        from app.core import cache as cache_module
+
+        product_id = client.post("/products/", json=sample_product_data).json()["id"]
+        client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+        entries = cache_module.CacheService.memory_stats()["entries"]
+
+        response = client.delete(f"/engine/cache/product/{product_id}")
+        assert response.status_code == 200
+        assert "generation" in response.json()
+        assert cache_module.CacheService.memory_stats()["entries"] == entries
+
+        recomputed = client.post("/engine/compute", json={"product_id": product_id, "quantity": 1})
+        assert recomputed.json()["cached"] is False
+
+
+class TestBulkOperations:
+    """Test multi-key cache operations"""
+
+    def test_memory_tier_bulk_ops(self):
+        """Test get_many/set_many/delete_many on the memory tier"""
+        cache = MemoryCache()
+        cache.set_many({"a": 1, "b": 2, "c": 3}, ttl=60)
+
+        assert cache.get_many(["a", "b", "missing"]) == {"a": 1, "b": 2}
+        assert cache.delete_many(["a", "missing"]) == 1
+        assert cache.get_many(["a", "c"]) == {"c": 3}
+        assert cache.stats()["misses"] == 2
+
+    def test_cache_service_bulk_ops(self):
+        """Test CacheService bulk operations, including per-key dependencies"""
+        from app.core.cache import CacheService
+
+        CacheService.set_many(
+            {"bulk:1": {"v": 1}, "bulk:2": {"v": 2}},
+            depends_on={"bulk:2": CacheService.generations(["category:bulk-test"])}
+        )
+        assert CacheService.get_many(["bulk:1", "bulk:2", "bulk:3"]) == {"bulk:1": {"v": 1}, "bulk:2": {"v": 2}}
+
+        CacheService.invalidate_category("bulk-test")
+        assert CacheService.get_many(["bulk:1", "bulk:2"]) == {"bulk:1": {"v": 1}}
+
+        CacheService.delete_many(["bulk:1"])
+        assert CacheService.get_many(["bulk:1"]) == {}
+
+    def test_delete_many_reaches_peer_worker(self):
+        """Test that bulk deletes are broadcast as a single message"""
+        from app.core import cache as cache_module
+
+        peer_memory = MemoryCache()
+        peer_memory.set_many({"bulk:a": 1, "bulk:b": 2, "bulk:c": 3})
+        messages = []
+
+        def peer_handler(message):
+            messages.append(message)
+            cache_module.apply_invalidation(peer_memory, GenerationCounters(), message)
+
+        cache_module._bus.subscribe(peer_handler)
+        try:
+            cache_module.CacheService.delete_many(["bulk:a", "bulk:b"])
+        finally:
+            cache_module._bus.unsubscribe(peer_handler)
+
+        assert len(messages) == 1
+        assert peer_memory.get_many(["bulk:a", "bulk:b", "bulk:c"]) == {"bulk:c": 3}
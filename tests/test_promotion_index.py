@@ -0,0 +1,216 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.services.promotion_index import CompiledRule, RuleBucket, promotion_index
+
+
+def _promo(**overrides):
+    data = {
+        "name": "Index Promo",
+        "discount_type": "percentage",
+        "discount_value": 10.0,
+        "priority": 1,
+        "start_date": datetime.utcnow().isoformat(),
+        "end_date": (datetime.utcnow() + timedelta(days=7)).isoformat(),
+        "is_active": True
+    }
+    data.update(overrides)
+    return data
+
+
+class TestPromotionIndex:
+    """Test the compiled in-memory promotion rule index"""
+
+    def _create_product(self, client: TestClient, sku: str, category: str = "Electronics") -> int:
+        return client.post("/products/", json={
+            "sku": sku,
+            "title": sku,
+            "base_price": 1000.0,
+            "category": category,
+            "stock": 10,
+            "tax_rate": 0.0
+        }).json()["id"]
+
+    def test_rules_are_compiled(self, client: TestClient, db_session):
+        product_id = self._create_product(client, "IDX-001")
+        client.post("/promotions/", json=_promo(name="Bundle", discount_type="bogo", discount_value=None,
+                                                buy_quantity=2, get_quantity=1, product_id=product_id))
+
+        rules = promotion_index.rules_for(db_session, product_id, "Electronics")
+        assert len(rules) == 1
+        assert rules[0].bundle_size == 3
+
+        client.post("/promotions/", json=_promo(name="Tenth", discount_value=12.5, product_id=product_id))
+        rule = promotion_index.rules_for(db_session, product_id, "Electronics")[1]
+        assert rule.discount_decimal == Decimal("12.5")
+        assert rule.percentage_rate == Decimal("0.125")
+
+    def test_product_and_category_rules_merged_by_priority(self, client: TestClient, db_session):
+        product_id = self._create_product(client, "IDX-002")
+        client.post("/promotions/", json=_promo(name="Product P3", priority=3, product_id=product_id))
+        client.post("/promotions/", json=_promo(name="Category P1", priority=1,
+                                                applies_to_category=True, category_filter="Electronics"))
+        client.post("/promotions/", json=_promo(name="Product P2", priority=2, product_id=product_id))
+        client.post("/promotions/", json=_promo(name="Other Category", priority=0,
+                                                applies_to_category=True, category_filter="Books"))
+
+        rules = promotion_index.rules_for(db_session, product_id, "Electronics")
+        assert [rule.name for rule in rules] == ["Category P1", "Product P2", "Product P3"]
+
+    def test_index_follows_promotion_updates(self, client: TestClient, db_session):
+        first_id = self._create_product(client, "IDX-003")
+        second_id = self._create_product(client, "IDX-004")
+        promo_id = client.post("/promotions/", json=_promo(product_id=first_id)).json()["id"]
+
+        client.post("/engine/compute", json={"product_id": first_id, "quantity": 1})
+
+        client.put(f"/promotions/{promo_id}", json={"product_id": second_id, "discount_value": 20.0})
+        assert promotion_index.rules_for(db_session, first_id, "Electronics") == []
+        assert promotion_index.rules_for(db_session, second_id, "Electronics")[0].discount_value == 20.0
+
+        client.put(f"/promotions/{promo_id}", json={"is_active": False})
+        assert promotion_index.rules_for(db_session, second_id, "Electronics") == []
+
+        client.put(f"/promotions/{promo_id}", json={"is_active": True})
+        client.delete(f"/promotions/{promo_id}")
+        assert promotion_index.rules_for(db_session, second_id, "Electronics") == []
+
+    def test_engine_uses_updated_index(self, client: TestClient):
+        product_id = self._create_product(client, "IDX-005")
+        promo_id = client.post("/promotions/", json=_promo(product_id=product_id)).json()["id"]
+
+        first = client.post("/engine/compute", json={"product_id": product_id, "quantity": 1}).json()
+        assert first["discount_amount"] == 100.0
+
+        client.put(f"/promotions/{promo_id}", json={"discount_value": 25.0})
+        second = client.post("/engine/compute", json={"product_id": product_id, "quantity": 1}).json()
+        assert second["discount_amount"] == 250.0
+
+    def test_rebuild_older_than_a_write_is_discarded(self, client: TestClient, db_session):
+        """Test that a rebuild queried before an upsert/remove does not overwrite it"""
+        from app.models.promotion import Promotion
+        from app.services.promotion_index import PromotionIndex
+
+        product_id = self._create_product(client, "IDX-006")
+        promo_id = client.post("/promotions/", json=_promo(product_id=product_id)).json()["id"]
+        index = PromotionIndex()
+        index.load(db_session)
+
+        version = index._version
+        snapshot = db_session.query(Promotion).filter(Promotion.is_active == True).all()
+        index.remove(promo_id)
+
+        assert index._install(snapshot, version) is False
+        assert index.rules_for(db_session, product_id, "Electronics") == []
+
+    def test_rebuild_retries_after_a_racing_write(self, client: TestClient, db_session):
+        from sqlalchemy import event
+        from app.services.promotion_index import PromotionIndex
+
+        product_id = self._create_product(client, "IDX-007")
+        client.post("/promotions/", json=_promo(product_id=product_id))
+        index = PromotionIndex()
+        queries = []
+
+        def write_during_first_query(state):
+            queries.append(state)
+            if len(queries) == 1:
+                index.remove(-1)
+
+        event.listen(db_session, "do_orm_execute", write_during_first_query)
+        try:
+            index.load(db_session)
+        finally:
+            event.remove(db_session, "do_orm_execute", write_during_first_query)
+
+        assert len(queries) == 2
+        assert index._loaded_at is not None
+        assert len(index.rules_for(db_session, product_id, "Electronics")) == 1
+
+    def test_peer_promotion_change_drops_index(self, client: TestClient, db_session):
+        """Test that a promotion change broadcast by another worker forces a rebuild"""
+        from app.core import cache as cache_module
+        from app.services.promotion_index import PROMOTIONS_CHANGED
+
+        promotion_index.ensure_loaded(db_session)
+        assert promotion_index._loaded_at is not None
+
+        cache_module._bus.publish({"op": PROMOTIONS_CHANGED, "origin": "other-worker"})
+
+        assert promotion_index._loaded_at is None
+
+
+def _rule(rule_id: int, start: datetime, end: datetime, priority: int = 1) -> CompiledRule:
+    return CompiledRule(
+        id=rule_id, name=f"Rule {rule_id}", discount_type="percentage", discount_value=10.0,
+        buy_quantity=None, get_quantity=None, min_quantity=None, min_amount=None,
+        category_filter=None, applies_to_category=False, priority=priority,
+        stacking_enabled=False, start_date=start, end_date=end, product_id=1,
+        discount_decimal=Decimal("10"), percentage_rate=Decimal("0.1"), bundle_size=0
+    )
+
+
+class TestLiveRuleSnapshot:
+    """Test the interval index that filters rules by date"""
+
+    def test_live_rules_and_skip_counts(self):
+        now = datetime(2024, 6, 1)
+        bucket = RuleBucket([
+            _rule(1, now - timedelta(days=30), now - timedelta(days=1)),
+            _rule(2, now - timedelta(days=1), now + timedelta(days=1)),
+            _rule(3, now + timedelta(days=1), now + timedelta(days=30)),
+            _rule(4, now - timedelta(days=365), now - timedelta(days=200)),
+        ])
+
+        live = bucket.live_at(now)
+        assert [rule.id for rule in live.rules] == [2]
+        assert live.expired == 2
+        assert live.not_started == 1
+
+        unexpired = bucket.unexpired_at(now)
+        assert [rule.id for rule in unexpired.rules] == [2, 3]
+        assert unexpired.expired == 2
+        assert unexpired.not_started == 0
+
+    def test_snapshot_advances_at_boundaries(self):
+        start = datetime(2024, 6, 1)
+        end = datetime(2024, 6, 10)
+        bucket = RuleBucket([_rule(1, start, end)])
+
+        assert bucket.live_at(start - timedelta(microseconds=1)).rules == []
+        assert [rule.id for rule in bucket.live_at(start).rules] == [1]
+        assert [rule.id for rule in bucket.live_at(end).rules] == [1]
+        after = bucket.live_at(end + timedelta(microseconds=1))
+        assert after.rules == []
+        assert after.expired == 1
+        assert bucket.live_at(start + timedelta(days=1)).rules[0].id == 1
+
+    def test_snapshot_reused_within_window(self):
+        now = datetime(2024, 6, 1)
+        bucket = RuleBucket([_rule(1, now - timedelta(days=1), now + timedelta(days=1))])
+
+        first = bucket.live_at(now)
+        assert bucket.live_at(now + timedelta(hours=1)) is first
+
+    def test_engine_summarises_skipped_rules(self, client: TestClient):
+        product_id = client.post("/products/", json={
+            "sku": "IDX-LIVE-001",
+            "title": "Seasonal",
+            "base_price": 1000.0,
+            "stock": 10,
+            "tax_rate": 0.0
+        }).json()["id"]
+        for index in range(3):
+            client.post("/promotions/", json=_promo(
+                name=f"Old Season {index}",
+                product_id=product_id,
+                start_date=(datetime.utcnow() - timedelta(days=300)).isoformat(),
+                end_date=(datetime.utcnow() - timedelta(days=200 + index)).isoformat()
+            ))
+        client.post("/promotions/", json=_promo(name="Live", product_id=product_id))
+
+        data = client.post("/engine/compute", json={"product_id": product_id, "quantity": 1}).json()
+        assert data["applied_promotion"] == "Live"
+        assert "Rules Skipped: 3 promotion(s) expired" in data["explanation"]
+        assert not any("Old Season" in line for line in data["explanation"])
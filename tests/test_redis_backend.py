@@ -0,0 +1,125 @@
+"""
+Tests for the lazily connected Redis backend and its circuit breaker.
+"""
+import redis
+
+from app.core.cache import CacheService
+from app.core.generations import GenerationCounters
+from app.core.redis_backend import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RedisBackend
+
+
+class FailingClient:
+    """Stands in for a Redis client whose server is down"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def mget(self, keys):
+        self.calls += 1
+        raise redis.ConnectionError("connection refused")
+
+    def incr(self, key):
+        self.calls += 1
+        raise redis.ConnectionError("connection refused")
+
+
+def failing_backend(failure_threshold=2, retry_interval=60):
+    backend = RedisBackend(
+        url="redis://unreachable:6379/0",
+        breaker=CircuitBreaker(failure_threshold, retry_interval)
+    )
+    backend._client = FailingClient()
+    return backend
+
+
+class TestCircuitBreaker:
+    """Failover and recovery state machine"""
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, retry_interval=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow() is False
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, retry_interval=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_closes_or_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, retry_interval=0)
+        breaker.record_failure()
+        assert breaker.allow() is True
+        assert breaker.state == HALF_OPEN
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        assert breaker.allow() is True
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+
+class TestRedisBackend:
+    """Lazy client construction and fallback to the memory tier"""
+
+    def test_disabled_by_empty_or_memory_url(self):
+        for url in ("", "memory", None):
+            backend = RedisBackend(url=url)
+            assert backend.enabled is False
+            assert backend.client() is None
+
+    def test_client_is_built_lazily(self):
+        backend = RedisBackend(url="redis://unreachable:6379/0")
+        assert backend._client is None
+        client = backend.client()
+        assert client is not None
+        assert backend.client() is client
+
+    def test_open_breaker_skips_redis(self):
+        backend = failing_backend(failure_threshold=2)
+        generations = GenerationCounters(backend, refresh_after=0)
+
+        generations.get("all")
+        generations.get("all")
+        assert backend.breaker.state == OPEN
+        calls = backend._client.calls
+
+        # Served locally without touching Redis while the breaker is open
+        assert generations.bump("all") == 1
+        assert generations.get("all") == 1
+        assert backend._client.calls == calls
+        status = backend.status()
+        assert (status["enabled"], status["available"], status["breaker_state"]) == (True, False, OPEN)
+        assert status["errors"] == {"ConnectionError": 2}
+
+    def test_local_counters_are_bounded(self):
+        backend = failing_backend(failure_threshold=1000)
+        generations = GenerationCounters(backend, max_entries=100)
+
+        for product_id in range(1000):
+            generations.get(f"product:{product_id}")
+        assert len(generations) == 100
+
+    def test_recovery_runs_callbacks(self):
+        backend = failing_backend(failure_threshold=1, retry_interval=0)
+        recovered = []
+        backend.on_recovery(lambda: recovered.append(True))
+
+        backend.record_failure()
+        backend.record_success()
+        backend.record_success()
+        assert recovered == [True]
+
+
+class TestCacheServiceFallback:
+    """The cache keeps working while Redis is unreachable"""
+
+    def test_set_and_get_without_redis(self):
+        CacheService.set("fallback:key", {"value": 1})
+        assert CacheService.get("fallback:key") == {"value": 1}
+        assert "breaker_state" in CacheService.backend_status()